@@ -1,17 +1,39 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, Response, stream_with_context
 import requests
 from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+try:
+    import lxml.html as lxml_html
+    import lxml.etree as lxml_etree
+except ImportError:
+    lxml_html = None
+    lxml_etree = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 import json
 import os
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import schedule
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
 from urllib.parse import urljoin, urlparse
 import re
 import subprocess
 import hashlib
+import random
+import difflib
+import heapq
+import math
+import uuid
+import socket
+import zlib
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -20,6 +42,7 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 import io
 import tempfile
+from xml.etree import ElementTree
 
 app = Flask(__name__)
 
@@ -33,6 +56,14 @@ def init_db():
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     existing_tables = [row[0] for row in cursor.fetchall()]
     
+    # Incremental auto-vacuum so compaction can return space without a full VACUUM;
+    # existing databases need one VACUUM to switch modes
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        if existing_tables:
+            cursor.execute('VACUUM')
+    
     # Competitors table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS competitors (
@@ -46,6 +77,26 @@ def init_db():
         )
     ''')
     
+    # HTTP validators for conditional fetching
+    cursor.execute("PRAGMA table_info(competitors)")
+    competitor_columns = [row[1] for row in cursor.fetchall()]
+    for column in ('etag', 'last_modified', 'final_url'):
+        if column not in competitor_columns:
+            cursor.execute(f'ALTER TABLE competitors ADD COLUMN {column} TEXT')
+    
+    # Heartbeat counter: consecutive scans that found identical content
+    if 'unchanged_scans' not in competitor_columns:
+        cursor.execute('ALTER TABLE competitors ADD COLUMN unchanged_scans INTEGER DEFAULT 0')
+    
+    # Discovered RSS/Atom feed or sitemap, and what has been seen in it
+    for column in ('feed_url', 'feed_type', 'feed_state'):
+        if column not in competitor_columns:
+            cursor.execute(f'ALTER TABLE competitors ADD COLUMN {column} TEXT')
+    
+    # Adaptive scheduling
+    if 'next_scan_at' not in competitor_columns:
+        cursor.execute('ALTER TABLE competitors ADD COLUMN next_scan_at TEXT')
+    
     # Changes table - check if it needs migration
     if 'changes' in existing_tables:
         # Check current schema
@@ -59,6 +110,14 @@ def init_db():
             cursor.execute('ALTER TABLE changes ADD COLUMN news_excerpt TEXT')
         if 'source_links' not in columns:
             cursor.execute('ALTER TABLE changes ADD COLUMN source_links TEXT')
+        if 'analysis_status' not in columns:
+            cursor.execute("ALTER TABLE changes ADD COLUMN analysis_status TEXT DEFAULT 'done'")
+        if 'analysis_input' not in columns:
+            cursor.execute('ALTER TABLE changes ADD COLUMN analysis_input TEXT')
+        if 'analysis_owner' not in columns:
+            cursor.execute('ALTER TABLE changes ADD COLUMN analysis_owner TEXT')
+        if 'analysis_claimed_at' not in columns:
+            cursor.execute('ALTER TABLE changes ADD COLUMN analysis_claimed_at TEXT')
     else:
         # Create new table with all columns
         cursor.execute('''
@@ -78,6 +137,10 @@ def init_db():
                 news_title TEXT,
                 news_excerpt TEXT,
                 source_links TEXT,
+                analysis_status TEXT DEFAULT 'done',
+                analysis_input TEXT,
+                analysis_owner TEXT,
+                analysis_claimed_at TEXT,
                 FOREIGN KEY (competitor_id) REFERENCES competitors (id)
             )
         ''')
@@ -102,6 +165,138 @@ def init_db():
         )
     ''')
     
+    # Block fingerprints for section-level diffs
+    cursor.execute("PRAGMA table_info(content_snapshots)")
+    snapshot_columns = [row[1] for row in cursor.fetchall()]
+    if 'blocks' not in snapshot_columns:
+        cursor.execute('ALTER TABLE content_snapshots ADD COLUMN blocks TEXT')
+    if 'simhash' not in snapshot_columns:
+        cursor.execute('ALTER TABLE content_snapshots ADD COLUMN simhash TEXT')
+    
+    # Scan jobs claimed by out-of-process workers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scan_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            competitor_id INTEGER,
+            status TEXT DEFAULT 'queued',
+            source TEXT,
+            attempts INTEGER DEFAULT 0,
+            worker_id TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            FOREIGN KEY (competitor_id) REFERENCES competitors (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_jobs_status ON scan_jobs (status, id)')
+    
+    # Groups of scan jobs started together from the UI
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scan_batches (
+            id TEXT PRIMARY KEY,
+            job_ids TEXT,
+            created_at TEXT
+        )
+    ''')
+    
+    # Indexes for latest-snapshot lookups, retention and body references
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_competitor ON content_snapshots (competitor_id, scraped_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_hash ON content_snapshots (content_hash)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_changes_detected ON changes (detected_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_changes_hash ON changes (content_hash)')
+    
+    # Compressed page bodies, one row per unique content_hash
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_store (
+            hash TEXT PRIMARY KEY,
+            codec TEXT,
+            body BLOB,
+            size INTEGER,
+            created_at TEXT
+        )
+    ''')
+    
+    # Cached Ollama responses keyed by model + prompt fingerprint
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT,
+            created_at REAL,
+            expires_at REAL,
+            last_used REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_changes_analysis_status ON changes (analysis_status)')
+    
+    # Last known circuit breaker state per host / model, written by every process
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS circuits (
+            scope TEXT,
+            key TEXT,
+            state TEXT,
+            failures INTEGER,
+            last_error TEXT,
+            retry_at TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (scope, key)
+        )
+    ''')
+    
+    # Materialized digests: per-day, per-competitor rollups kept current as changes are stored,
+    # and the digest text built from them, section by section. Rollups first keyed by
+    # competitor name are rebuilt keyed by id.
+    rebuild_rollups = 'digest_rollups' not in existing_tables
+    if not rebuild_rollups:
+        cursor.execute("PRAGMA table_info(digest_rollups)")
+        if 'competitor_id' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('DROP TABLE digest_rollups')
+            rebuild_rollups = True
+    if rebuild_rollups:
+        cursor.execute('''
+            CREATE TABLE digest_rollups (
+                day TEXT,
+                competitor_id INTEGER,
+                competitor_name TEXT,
+                changes INTEGER DEFAULT 0,
+                high_priority INTEGER DEFAULT 0,
+                importance_total INTEGER DEFAULT 0,
+                updated_at REAL,
+                PRIMARY KEY (day, competitor_id)
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO digest_rollups (day, competitor_id, competitor_name, changes, high_priority,
+                                        importance_total, updated_at)
+            SELECT COALESCE(substr(detected_at, 1, 10), ''), COALESCE(competitor_id, 0),
+                MAX(COALESCE(competitor_name, 'Unknown')), COUNT(*),
+                SUM(COALESCE(importance_score, 0) >= 7), SUM(COALESCE(importance_score, 0)), ?
+            FROM changes GROUP BY 1, 2
+        ''', (time.time(),))
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS digest_sections (
+            period TEXT,
+            section TEXT,
+            fingerprint TEXT,
+            content TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (period, section)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS digests (
+            period TEXT PRIMARY KEY,
+            summary TEXT,
+            changes_count INTEGER,
+            window_start TEXT,
+            built_at REAL,
+            updated_at TEXT
+        )
+    ''')
+    
     # Company profile table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS company_profile (
@@ -151,6 +346,9 @@ def init_db():
     ''')
     
     conn.commit()
+    
+    # WAL lets the dashboard keep reading while scan workers write
+    cursor.execute('PRAGMA journal_mode=WAL')
     conn.close()
     print("✅ Database initialized and migrated successfully")
 
@@ -280,14 +478,518 @@ class PDFGenerator:
         elements.append(Spacer(1, 15))
         return elements
 
+# Tier-one change classification: weights for words a change adds (removed
+# words count half) and for the kind of section it touches
+CHANGE_KEYWORD_WEIGHTS = {
+    'acquisition': 3, 'acquires': 3, 'acquired': 3, 'merger': 3, 'funding': 3, 'raises': 2,
+    'investment': 2, 'launch': 2.5, 'launches': 2.5, 'launched': 2.5, 'introducing': 2,
+    'announce': 2, 'announces': 2, 'announced': 2, 'partnership': 2, 'partners': 1.5,
+    'pricing': 2.5, 'price': 2, 'prices': 2, 'discontinued': 2, 'deprecated': 1.5,
+    'expansion': 1.5, 'release': 1.5, 'released': 1.5, 'beta': 1, 'integration': 1,
+    'feature': 1, 'features': 1, 'plan': 1, 'plans': 1, 'new': 0.5, 'update': 0.5,
+    'product': 0.5, 'service': 0.5, 'customer': 0.5, 'customers': 0.5, 'market': 0.5
+}
+
+PRICE_PATTERN = re.compile(r'[$€£¥]\s?\d[\d,.]*')
+PRICE_CHANGE_WEIGHT = 3.5
+
+SECTION_TYPES = [
+    # (section type, heading word prefixes, weight); first match wins
+    ('boilerplate', ('cookie', 'privacy', 'terms', 'footer', 'copyright', 'newsletter', 'subscribe'), 0),
+    ('pricing', ('pricing', 'plans', 'price'), 3),
+    ('release_notes', ('changelog', 'release', "what's new", 'whats new', 'version', 'new', 'fixed', 'improved'), 3),
+    ('announcement', ('news', 'press', 'announc', 'blog'), 3),
+    ('product', ('product', 'feature', 'platform', 'integration', 'solution'), 1.5),
+    ('company', ('about', 'careers', 'jobs', 'team', 'leadership', 'customers'), 1)
+]
+
+class ChangeClassifier:
+    """Cheap local scoring of a page change, run before any LLM call.
+    
+    The score (0-10) adds up diff size, weighted business keywords and the
+    kind of sections touched. Changes scoring at or above the threshold are
+    escalated to the LLM; the rest keep the heuristic result.
+    """
+    
+    def __init__(self, threshold=4.0):
+        self.enabled = True
+        self.threshold = threshold
+    
+    def configure(self, settings):
+        self.enabled = str(settings.get('ai_pre_classifier', 'true')).lower() == 'true'
+        try:
+            self.threshold = float(settings.get('ai_escalation_threshold', self.threshold))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid ai_escalation_threshold setting, keeping {self.threshold}: {e}")
+    
+    def section_type(self, heading):
+        heading = (heading or '').lower()
+        for name, keywords, weight in SECTION_TYPES:
+            if any(re.search(r'\b' + re.escape(keyword), heading) for keyword in keywords):
+                return name, weight
+        return 'general', 1
+    
+    def score(self, old_content, new_content, block_changes=None):
+        """Score a change and report the signals behind it"""
+        old_words = set(re.findall(r"[a-z0-9']+", old_content.lower()))
+        new_words = set(re.findall(r"[a-z0-9']+", new_content.lower()))
+        added_words = new_words - old_words
+        removed_words = old_words - new_words
+        
+        changed = len(added_words) + len(removed_words)
+        size_points = min(4.0, math.log2(1 + changed) / 2)
+        
+        keywords = sorted(added_words.intersection(CHANGE_KEYWORD_WEIGHTS),
+                          key=lambda word: -CHANGE_KEYWORD_WEIGHTS[word])
+        keyword_points = sum(CHANGE_KEYWORD_WEIGHTS[word] for word in keywords)
+        keyword_points += sum(CHANGE_KEYWORD_WEIGHTS[word] for word in removed_words.intersection(CHANGE_KEYWORD_WEIGHTS)) / 2
+        # A changed price is news even when no pricing words changed around it
+        prices_changed = set(PRICE_PATTERN.findall(old_content)) != set(PRICE_PATTERN.findall(new_content))
+        if prices_changed:
+            keyword_points += PRICE_CHANGE_WEIGHT
+        keyword_points = min(5.0, keyword_points)
+        
+        sections = []
+        if block_changes:
+            for block in block_changes['added'] + block_changes['removed'] + block_changes['modified']:
+                sections.append(self.section_type(block['heading'])[0])
+        section_points = max((weight for name, _, weight in SECTION_TYPES if name in sections), default=0)
+        
+        score = size_points + keyword_points + section_points
+        if sections and set(sections) == {'boilerplate'}:
+            # Only cookie banners, footers and the like changed
+            score /= 2
+        
+        return {
+            'score': round(min(10.0, score), 1),
+            'added_words': len(added_words),
+            'removed_words': len(removed_words),
+            'keywords': keywords,
+            'prices_changed': prices_changed,
+            'sections': sorted(set(sections))
+        }
+    
+    def hunk_priority(self, old_text, new_text, heading=''):
+        """Rank one changed section for the prompt budget"""
+        return self.score(old_text, new_text)['score'] + self.section_type(heading)[1]
+    
+    def classify(self, old_content, new_content, competitor_name, website, block_changes=None):
+        """Heuristic analysis of a change plus whether it is worth an LLM call"""
+        signals = self.score(old_content, new_content, block_changes)
+        score = signals['score']
+        importance = max(1, min(10, round(score)))
+        where = f" ({', '.join(s.replace('_', ' ') for s in signals['sections'])} sections)" if signals['sections'] else ""
+        
+        if score >= 6:
+            result = {
+                'change_type': "major_announcement" if signals['keywords'] or signals['prices_changed'] else "major_update",
+                'importance_score': max(7, importance),
+                'analysis': f"{competitor_name} made significant website updates{where}, potentially indicating new business developments or product announcements",
+                'news_title': f"{competitor_name} Major Business Update Detected",
+                'news_excerpt': f"Significant changes detected on {competitor_name}'s website suggesting new announcements or product developments"
+            }
+        elif score >= 3:
+            result = {
+                'change_type': "content_update",
+                'importance_score': importance,
+                'analysis': f"{competitor_name} updated their website content{where}, possibly with new information about products or services",
+                'news_title': f"{competitor_name} Website Content Updated",
+                'news_excerpt': f"Moderate content changes detected on {competitor_name}'s website with potential business relevance"
+            }
+        else:
+            result = {
+                'change_type': "minor_update",
+                'importance_score': importance,
+                'analysis': f"{competitor_name} made minor website adjustments{where}, likely routine maintenance or small content updates",
+                'news_title': f"{competitor_name} Minor Website Updates",
+                'news_excerpt': f"Small routine updates detected on {competitor_name}'s website"
+            }
+        
+        result['source_links'] = website
+        result['heuristic_score'] = score
+        result['escalate'] = not self.enabled or score >= self.threshold
+        return result
+
+# JSON schema for structured analysis responses from the Ollama HTTP API
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'change_type': {'type': 'string'},
+        'importance': {'type': 'integer'},
+        'news_title': {'type': 'string'},
+        'news_excerpt': {'type': 'string'},
+        'analysis': {'type': 'string'}
+    },
+    'required': ['change_type', 'importance', 'news_title', 'news_excerpt', 'analysis']
+}
+
+# Structured response for several competitors analyzed in one call
+BATCH_ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'items': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': dict(ANALYSIS_SCHEMA['properties'], item={'type': 'integer'}),
+                'required': ['item'] + ANALYSIS_SCHEMA['required']
+            }
+        }
+    },
+    'required': ['items']
+}
+
+def estimate_tokens(text):
+    """Rough token count for prompt budgeting (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+# Prompt budgeting
+PROMPT_MIN_ENTRY_TOKENS = 40
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def truncate_to_tokens(text, tokens):
+    """Cut text so estimate_tokens() of the result stays within `tokens`"""
+    limit = max(0, (tokens - 1) * 4 - 1)
+    if len(text) <= limit:
+        return text
+    if limit <= 0:
+        return ''
+    return text[:limit - 1].rstrip() + '…'
+
+def pack_prompt_entries(entries, budget, separator='\n\n'):
+    """Fit the most important prompt entries into a token budget.
+    
+    entries is a list of (priority, text) in display order. Entries are
+    taken highest priority first while they fit; one that doesn't is cut
+    to the remaining budget when a useful amount is left. Returns the kept
+    texts in display order and how many entries were left out.
+    """
+    separator_cost = estimate_tokens(separator)
+    remaining = budget
+    kept = {}
+    for index in sorted(range(len(entries)), key=lambda i: -entries[i][0]):
+        text = entries[index][1]
+        cost = estimate_tokens(text) + separator_cost
+        if cost <= remaining:
+            kept[index] = text
+            remaining -= cost
+        elif remaining - separator_cost >= PROMPT_MIN_ENTRY_TOKENS:
+            kept[index] = truncate_to_tokens(text, remaining - separator_cost)
+            remaining = 0
+    return [kept[index] for index in sorted(kept)], len(entries) - len(kept)
+
+def diff_sentences(old_text, new_text):
+    """Sentence-level hunks between two texts, as added/removed/modified dicts"""
+    old_sentences = [s for s in SENTENCE_BOUNDARY.split(old_text or '') if s]
+    new_sentences = [s for s in SENTENCE_BOUNDARY.split(new_text or '') if s]
+    matcher = difflib.SequenceMatcher(None, old_sentences, new_sentences, autojunk=False)
+    kinds = {'replace': 'modified', 'delete': 'removed', 'insert': 'added'}
+    return [{'kind': kinds[tag], 'old_text': ' '.join(old_sentences[i1:i2]), 'new_text': ' '.join(new_sentences[j1:j2])}
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+class ChangeAnalysisBatcher:
+    """Groups change analyses submitted close together into batched LLM calls.
+    
+    The first caller to find the queue empty becomes the leader: it waits
+    up to window seconds (or until max_items arrive), then runs everything
+    queued in budget-sized batches while the other callers wait for their
+    own result.
+    """
+    
+    def __init__(self, ai, max_items=6, window=1.5, max_tokens=3000):
+        self.ai = ai
+        self.max_items = max_items
+        self.window = window
+        self.max_tokens = max_tokens
+        self._condition = threading.Condition()
+        self._pending = []
+    
+    def configure(self, settings):
+        """Refresh batch limits from the settings table"""
+        try:
+            self.max_items = max(1, int(settings.get('ai_batch_size', self.max_items)))
+            self.window = max(0.0, float(settings.get('ai_batch_window', self.window)))
+            self.max_tokens = max(500, int(settings.get('ai_batch_max_tokens', self.max_tokens)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid AI batch settings, keeping current limits: {e}")
+    
+    @property
+    def enabled(self):
+        return self.max_items > 1
+    
+    def submit(self, item):
+        """Analyze one change item, sharing an LLM call with concurrent submissions"""
+        slot = {'item': item, 'done': threading.Event(), 'result': None}
+        with self._condition:
+            leader = not self._pending
+            self._pending.append(slot)
+            self._condition.notify_all()
+            if leader:
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending
+                self._pending = []
+        
+        if leader:
+            try:
+                self._run(batch)
+            finally:
+                for queued in batch:
+                    queued['done'].set()
+        slot['done'].wait()
+        return slot['result']
+    
+    def _chunks(self, slots):
+        """Split slots into batches that fit max_items and the token budget"""
+        chunk, tokens = [], 0
+        for slot in slots:
+            cost = estimate_tokens(slot['item']['content_section'])
+            if chunk and (len(chunk) >= self.max_items or tokens + cost > self.max_tokens):
+                yield chunk
+                chunk, tokens = [], 0
+            chunk.append(slot)
+            tokens += cost
+        if chunk:
+            yield chunk
+    
+    def _run(self, slots):
+        for chunk in self._chunks(slots):
+            items = [slot['item'] for slot in chunk]
+            results = self.ai.analyze_change_batch(items) if len(items) > 1 else {}
+            for index, slot in enumerate(chunk):
+                result = results.get(index)
+                if result is None:
+                    # Missing from the batch answer (or a batch of one): ask on its own
+                    result = self.ai._analyze_change_item(slot['item'])
+                slot['result'] = result
+
+class LLMResponseCache:
+    """Two-tier cache of Ollama responses: an in-process LRU in front of a SQLite table.
+    
+    Entries are keyed on model, prompt and response schema, expire after
+    ttl seconds, and the table is trimmed to max_rows by last use.
+    """
+    
+    def __init__(self, memory_entries=256, ttl=24 * 60 * 60, max_rows=5000):
+        self.enabled = True
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+    
+    def configure(self, settings):
+        """Refresh cache limits from the settings table"""
+        self.enabled = settings.get('llm_cache_enabled', 'true') == 'true'
+        try:
+            self.ttl = max(1.0, float(settings.get('llm_cache_ttl_hours', self.ttl / 3600)) * 3600)
+            self.memory_entries = max(0, int(settings.get('llm_cache_memory_entries', self.memory_entries)))
+            self.max_rows = max(1, int(settings.get('llm_cache_max_rows', self.max_rows)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid LLM cache settings, keeping current limits: {e}")
+    
+    def key(self, model, prompt, schema=None):
+        fingerprint = json.dumps({'model': model, 'prompt': prompt, 'schema': schema}, sort_keys=True)
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Cached response for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return entry[0]
+                del self._memory[key]
+        
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?', (key, now))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+            conn.commit()
+        conn.close()
+        
+        with self._lock:
+            self.counters['db_hits' if row else 'misses'] += 1
+        if not row:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+    
+    def put(self, key, model, response):
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, response, expires_at)
+        
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, expires_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (key, model, response, now, expires_at, now))
+        with self._lock:
+            self.counters['stores'] += 1
+            self._puts += 1
+            evict = self._puts % 50 == 0
+        if evict:
+            self._evict(cursor, now)
+        conn.commit()
+        conn.close()
+    
+    def discard(self, key):
+        """Forget a cached response, e.g. one that turned out not to parse"""
+        with self._lock:
+            self._memory.pop(key, None)
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+        conn.commit()
+        conn.close()
+    
+    def _remember(self, key, response, expires_at):
+        with self._lock:
+            if not self.memory_entries:
+                return
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+    
+    def _evict(self, cursor, now):
+        """Drop expired rows, then the least recently used beyond max_rows"""
+        cursor.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (now,))
+        evicted = cursor.rowcount
+        cursor.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_rows,))
+        evicted += cursor.rowcount
+        with self._lock:
+            self.counters['evictions'] += evicted
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 3) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
+
+OLLAMA_CIRCUIT = 'ollama'
+
 class OllamaAI:
     """Enhanced AI analysis using Ollama"""
     
     def __init__(self):
         self.model = "llama3"
+        self.backend = 'http'
+        self.base_url = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
+        self.keep_alive = '30m'
+        self.timeout = 120
+        self.cache = LLMResponseCache()
+        self.batcher = ChangeAnalysisBatcher(self)
+        self.classifier = ChangeClassifier()
+        # Token budgets for the variable part of each prompt
+        self.change_prompt_tokens = 800
+        self.report_prompt_tokens = 2500
+        # Shared health state: while open every call goes straight to its fallback
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, scope='ollama')
+        self.probe_timeout = 3.0
+        self.last_probe_at = None
+        # One pooled keep-alive session for every call to the local Ollama server
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def configure(self, settings):
+        """Apply Ollama settings from the settings table"""
+        self.cache.configure(settings)
+        self.batcher.configure(settings)
+        self.classifier.configure(settings)
+        self.backend = settings.get('ollama_backend', self.backend)
+        self.base_url = settings.get('ollama_url', self.base_url).rstrip('/')
+        self.model = settings.get('ollama_model', self.model)
+        self.keep_alive = settings.get('ollama_keep_alive', self.keep_alive)
+        try:
+            self.timeout = max(1.0, float(settings.get('ollama_timeout', self.timeout)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid ollama_timeout setting, keeping {self.timeout}: {e}")
+        try:
+            self.breaker.failure_threshold = max(1, int(settings.get('ollama_breaker_threshold', self.breaker.failure_threshold)))
+            self.breaker.reset_timeout = max(1.0, float(settings.get('ollama_breaker_reset_seconds', self.breaker.reset_timeout)))
+            self.probe_timeout = max(0.5, float(settings.get('ollama_probe_timeout', self.probe_timeout)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid Ollama breaker settings, keeping current values: {e}")
+        try:
+            self.change_prompt_tokens = max(100, int(settings.get('ai_change_prompt_tokens', self.change_prompt_tokens)))
+            self.report_prompt_tokens = max(200, int(settings.get('ai_report_prompt_tokens', self.report_prompt_tokens)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid prompt budget settings, keeping current budgets: {e}")
+    
+    def warm_up(self):
+        """Load the model into memory so the first real prompt doesn't pay for it"""
+        if self.backend != 'http':
+            return False
+        try:
+            start = time.time()
+            response = self.session.post(f"{self.base_url}/api/generate", json={
+                'model': self.model, 'keep_alive': self.keep_alive
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            print(f"🔥 Ollama model {self.model} warmed up in {time.time() - start:.1f}s")
+            self.breaker.record_success(OLLAMA_CIRCUIT)
+            return True
+        except requests.RequestException as e:
+            print(f"⚠️ Ollama warm-up failed: {e}")
+            self.breaker.trip(OLLAMA_CIRCUIT, f"Warm-up failed: {e}")
+            return False
+    
+    def warm_up_async(self):
+        threading.Thread(target=self.warm_up, daemon=True).start()
+    
+    def available(self):
+        """False while the Ollama circuit is open and not yet due a probe call"""
+        return self.breaker.ready(OLLAMA_CIRCUIT)
     
-    def analyze_content_changes(self, old_content, new_content, competitor_name, website):
-        """Use Ollama to analyze content changes with news focus"""
+    def probe(self):
+        """Lightweight health check that opens or closes the Ollama circuit"""
+        self.last_probe_at = datetime.now().isoformat()
+        try:
+            if self.backend == 'cli':
+                subprocess.run(['ollama', 'list'], capture_output=True, timeout=self.probe_timeout, check=True)
+            else:
+                response = self.session.get(f"{self.base_url}/api/tags", timeout=self.probe_timeout)
+                response.raise_for_status()
+        except (requests.RequestException, subprocess.SubprocessError, OSError) as e:
+            self.breaker.trip(OLLAMA_CIRCUIT, f"Health probe failed: {e}")
+            return False
+        self.breaker.record_success(OLLAMA_CIRCUIT)
+        return True
+    
+    def health(self):
+        """Ollama circuit state for the dashboard"""
+        circuit = next((c for c in self.breaker.snapshot() if c['key'] == OLLAMA_CIRCUIT),
+                       {'state': 'closed', 'failures': 0, 'last_error': None, 'retry_at': None})
+        return dict(circuit, backend=self.backend, model=self.model, last_probe_at=self.last_probe_at)
+    
+    def analyze_content_changes(self, old_content, new_content, competitor_name, website, block_changes=None):
+        """Use Ollama to analyze content changes with news focus.
+        
+        block_changes (from diff_blocks) replaces the leading-800-chars
+        comparison with just the sections that were added, removed or edited.
+        """
         if not old_content or not new_content:
             return {
                 'analysis': f"Started monitoring {competitor_name} - baseline established for future news detection",
@@ -298,16 +1000,59 @@ class OllamaAI:
                 'source_links': website
             }
         
+        # Only changes the local classifier rates as significant go to the model
+        heuristic = self.classifier.classify(old_content, new_content, competitor_name, website, block_changes)
+        if not heuristic.pop('escalate'):
+            return heuristic
+        return self.analyze_change_item(
+            self.build_change_item(old_content, new_content, competitor_name, website, block_changes)
+        )
+    
+    def build_change_item(self, old_content, new_content, competitor_name, website, block_changes=None):
+        """Everything needed to analyze (or re-analyze later) one competitor's change"""
+        if block_changes and any(block_changes.values()):
+            content_section = f"""CHANGED SECTIONS:
+{self._format_block_changes(block_changes)}"""
+        else:
+            hunks = diff_sentences(old_content, new_content)
+            if hunks:
+                content_section = f"""CHANGED SENTENCES:
+{self._format_hunks(hunks)}"""
+            else:
+                # Nothing sentence-level changed (e.g. only spacing or case); show both versions
+                half = self.change_prompt_tokens // 2
+                content_section = f"""PREVIOUS CONTENT:
+{truncate_to_tokens(old_content, half)}
+
+NEW CONTENT:
+{truncate_to_tokens(new_content, half)}"""
+        
+        return {
+            'competitor_name': competitor_name,
+            'website': website,
+            'content_section': content_section,
+            'old_content': old_content,
+            'new_content': new_content
+        }
+    
+    def analyze_change_item(self, item):
+        """Analyze a prepared change item, batched with concurrent ones when enabled"""
+        if self.batcher.enabled:
+            return self.batcher.submit(item)
+        return self._analyze_change_item(item)
+    
+    def _analyze_change_item(self, item):
+        """Analyze one competitor's changes in its own LLM call"""
+        competitor_name = item['competitor_name']
+        website = item['website']
+        content_section = item['content_section']
+        
         # Create news-focused analysis prompt for Ollama
         prompt = f"""You are a business news analyst monitoring competitor {competitor_name} for market intelligence.
 
 WEBSITE: {website}
 
-PREVIOUS CONTENT (first 800 chars):
-{old_content[:800]}
-
-NEW CONTENT (first 800 chars):
-{new_content[:800]}
+{content_section}
 
 Analyze these changes as a business news story. Provide:
 
@@ -320,15 +1065,124 @@ ANALYSIS: [Business intelligence analysis focusing on competitive implications,
 Focus on business impact, market implications, and competitive intelligence rather than technical details."""
         
         try:
-            result = self._call_ollama(prompt)
-            return self._parse_enhanced_response(result, website)
+            return self._call_ollama(prompt, schema=ANALYSIS_SCHEMA,
+                                     parse=lambda response: self._parse_enhanced_response(response, website))
         except Exception as e:
             print(f"⚠️ Ollama analysis failed: {e}")
-            return self._fallback_news_analysis(old_content, new_content, competitor_name, website)
+            return dict(self._fallback_news_analysis(item['old_content'], item['new_content'], competitor_name, website),
+                        fallback=True)
+    
+    def analyze_change_batch(self, items):
+        """Analyze several competitors' changes in one LLM call.
+        
+        Returns {index: result} for the items that could be parsed out of
+        the answer; the caller analyzes any missing ones individually.
+        """
+        sections = []
+        for number, item in enumerate(items, start=1):
+            sections.append(f"""=== ITEM {number}: {item['competitor_name']} ({item['website']}) ===
+{item['content_section']}""")
+        
+        prompt = f"""You are a business news analyst monitoring several competitors for market intelligence.
+
+Each item below is a different competitor. Analyze each one separately as a business news story.
+
+{chr(10).join(sections)}
+
+For EACH item, answer in this format:
+
+=== ITEM [number] ===
+CHANGE_TYPE: [product_launch/feature_update/pricing_change/partnership/acquisition/content_update/press_release/blog_post]
+IMPORTANCE: [1-10 where 8-10=breaking news, 6-7=important updates, 4-5=routine news, 1-3=minor changes]
+NEWS_TITLE: [Write as a business news headline, max 70 chars]
+NEWS_EXCERPT: [Write as a news summary focusing on business impact, max 180 chars]
+ANALYSIS: [Business intelligence analysis focusing on competitive implications, max 250 chars]
+
+Focus on business impact, market implications, and competitive intelligence rather than technical details."""
+        
+        try:
+            results = self._call_ollama(prompt, schema=BATCH_ANALYSIS_SCHEMA,
+                                        parse=lambda response: self._parse_batch_response(response, items))
+        except Exception as e:
+            print(f"⚠️ Ollama batch analysis failed, analyzing {len(items)} items individually: {e}")
+            return {}
+        if len(results) < len(items):
+            print(f"⚠️ Batch answer covered {len(results)}/{len(items)} items, analyzing the rest individually")
+        return results
+    
+    def _parse_batch_response(self, response, items):
+        """Split a batch answer into per-item results keyed by item index"""
+        blocks = {}
+        if response.lstrip().startswith('{'):
+            for entry in json.loads(response).get('items', []):
+                if isinstance(entry, dict) and entry.get('change_type'):
+                    try:
+                        blocks[int(entry.get('item')) - 1] = json.dumps(entry)
+                    except (TypeError, ValueError):
+                        continue
+        else:
+            for match in re.finditer(r'=== ITEM (\d+)[^\n]*===\s*\n(.*?)(?=\n=== ITEM \d+|\Z)', response, re.S):
+                if 'CHANGE_TYPE:' in match.group(2):
+                    blocks[int(match.group(1)) - 1] = match.group(2)
+        
+        results = {}
+        for index, block in blocks.items():
+            if not 0 <= index < len(items):
+                continue
+            try:
+                results[index] = self._parse_enhanced_response(block, items[index]['website'])
+            except Exception as e:
+                print(f"⚠️ Could not parse batch item {index + 1}: {e}")
+        if not results:
+            raise Exception("No parseable items in batch answer")
+        return results
+    
+    def analyze_feed_entry(self, entry, competitor_name, website):
+        """Use Ollama to analyze a single new feed or sitemap entry"""
+        link = entry.get('link') or website
+        prompt = f"""You are a business news analyst monitoring competitor {competitor_name} for market intelligence.
+
+WEBSITE: {website}
+
+NEW POST PUBLISHED:
+TITLE: {entry.get('title', '')}
+DATE: {entry.get('published', '')}
+LINK: {link}
+SUMMARY: {entry.get('summary', '')[:1500]}
+
+Analyze this post as a business news story. Provide:
+
+CHANGE_TYPE: [product_launch/feature_update/pricing_change/partnership/acquisition/content_update/press_release/blog_post]
+IMPORTANCE: [1-10 where 8-10=breaking news, 6-7=important updates, 4-5=routine news, 1-3=minor changes]
+NEWS_TITLE: [Write as a business news headline, max 70 chars]
+NEWS_EXCERPT: [Write as a news summary focusing on business impact, max 180 chars]
+ANALYSIS: [Business intelligence analysis focusing on competitive implications, max 250 chars]
+
+Focus on business impact, market implications, and competitive intelligence rather than technical details."""
+        
+        try:
+            return self._call_ollama(prompt, schema=ANALYSIS_SCHEMA,
+                                     parse=lambda response: self._parse_enhanced_response(response, link))
+        except Exception as e:
+            print(f"⚠️ Ollama feed entry analysis failed: {e}")
+            return dict(self._fallback_feed_entry_analysis(entry, competitor_name, link), fallback=True)
     
     def generate_competitive_insights(self, company_data, competitor_changes, timeframe_days=30):
         """Generate competitive insights comparing company with competitors"""
-        
+        prompt = self._competitive_insights_prompt(company_data, competitor_changes, timeframe_days)
+        try:
+            return self._call_ollama(prompt)
+        except Exception as e:
+            print(f"⚠️ Competitive insights generation failed: {e}")
+            return self._fallback_competitive_insights_with_industry(competitor_changes, company_data.get('industry', 'Technology'))
+    
+    def stream_competitive_insights(self, company_data, competitor_changes, timeframe_days=30):
+        """generate_competitive_insights as ('token', text) events, then ('done', insights)"""
+        prompt = self._competitive_insights_prompt(company_data, competitor_changes, timeframe_days)
+        yield from self._stream_with_fallback(prompt, lambda: self._fallback_competitive_insights_with_industry(
+            competitor_changes, company_data.get('industry', 'Technology')))
+    
+    def _competitive_insights_prompt(self, company_data, competitor_changes, timeframe_days):
         # First, get industry-specific market data
         industry_context = self._get_industry_context(company_data.get('industry', 'Technology'))
         
@@ -369,11 +1223,7 @@ Provide analysis in this format:
 
 Keep analysis strategic, actionable, and focused on business impact with industry-specific context."""
         
-        try:
-            return self._call_ollama(prompt)
-        except Exception as e:
-            print(f"⚠️ Competitive insights generation failed: {e}")
-            return self._fallback_competitive_insights_with_industry(competitor_changes, company_data.get('industry', 'Technology'))
+        return prompt
     
     def _get_industry_context(self, industry):
         """Get industry-specific context and trends"""
@@ -486,184 +1336,248 @@ Based on recent competitor activity, we've detected {len(changes)} total updates
         
         return insights
     
+    def _format_block_changes(self, block_changes):
+        """Format section-level deltas for the analysis prompt, most relevant first within budget"""
+        entries = []
+        for block in block_changes['modified']:
+            heading = block['heading'] or 'Untitled section'
+            # Only the sentences that changed inside the section
+            hunks = diff_sentences(block['old_text'], block['new_text'])
+            if hunks:
+                before = ' '.join(hunk['old_text'] for hunk in hunks if hunk['old_text']) or '(not present)'
+                after = ' '.join(hunk['new_text'] for hunk in hunks if hunk['new_text']) or '(removed)'
+            else:
+                before, after = block['old_text'], block['new_text']
+            entries.append((self.classifier.hunk_priority(before, after, heading),
+                            f"[MODIFIED] {heading}\nBEFORE: {before}\nAFTER: {after}"))
+        for block in block_changes['added']:
+            heading = block['heading'] or 'Untitled section'
+            entries.append((self.classifier.hunk_priority('', block['text'], heading), f"[ADDED] {heading}\n{block['text']}"))
+        for block in block_changes['removed']:
+            heading = block['heading'] or 'Untitled section'
+            entries.append((self.classifier.hunk_priority(block['text'], '', heading), f"[REMOVED] {heading}\n{block['text']}"))
+        return self._pack_entries(entries, self.change_prompt_tokens, 'changed sections')
+    
+    def _format_hunks(self, hunks):
+        """Format sentence-level hunks for the analysis prompt, most relevant first within budget"""
+        entries = []
+        for hunk in hunks:
+            if hunk['kind'] == 'modified':
+                text = f"[MODIFIED]\nBEFORE: {hunk['old_text']}\nAFTER: {hunk['new_text']}"
+            elif hunk['kind'] == 'added':
+                text = f"[ADDED] {hunk['new_text']}"
+            else:
+                text = f"[REMOVED] {hunk['old_text']}"
+            entries.append((self.classifier.hunk_priority(hunk['old_text'], hunk['new_text']), text))
+        return self._pack_entries(entries, self.change_prompt_tokens, 'changes')
+    
+    def _pack_entries(self, entries, budget, label, separator='\n\n'):
+        kept, omitted = pack_prompt_entries(entries, budget, separator)
+        text = separator.join(kept)
+        if omitted > 0:
+            text += f"{separator}(+{omitted} more {label} not shown)"
+        return text
+    
     def _format_competitor_activity(self, changes):
-        """Format competitor changes for AI analysis"""
-        activity_text = ""
-        for change in changes[:10]:  # Limit to 10 most recent
-            activity_text += f"""
-• {change['competitor_name']} - {change['detected_at'][:10]}
-  Type: {change.get('change_type', 'update').replace('_', ' ').title()}
+        """Format competitor changes for AI analysis, most important first within budget"""
+        entries = []
+        for change in changes:
+            entries.append((change.get('importance_score') or 0, f"""• {change['competitor_name']} - {change['detected_at'][:10]}
+  Type: {(change.get('change_type') or 'update').replace('_', ' ').title()}
   Impact: {change.get('importance_score', 5)}/10
   News: {change.get('news_title', 'Update detected')}
-  Analysis: {change.get('analysis', 'No analysis')[:100]}...
-"""
-        return activity_text
+  Analysis: {truncate_to_tokens(change.get('analysis') or 'No analysis', 100)}"""))
+        return self._pack_entries(entries, self.report_prompt_tokens, 'competitor changes', separator='\n')
     
-    def _fallback_news_analysis(self, old_content, new_content, competitor_name, website):
-        """Fallback news-focused analysis when Ollama fails"""
-        old_words = set(old_content.lower().split())
-        new_words = set(new_content.lower().split())
-        
-        added_words = new_words - old_words
-        removed_words = old_words - new_words
+    def _fallback_news_analysis(self, old_content, new_content, competitor_name, website, block_changes=None):
+        """Heuristic news analysis, used when Ollama fails or the change isn't worth a call"""
+        result = self.classifier.classify(old_content, new_content, competitor_name, website, block_changes)
+        result.pop('escalate')
+        return result
+    
+    def _fallback_feed_entry_analysis(self, entry, competitor_name, link):
+        """Fallback analysis for a feed entry when Ollama fails"""
+        title = entry.get('title') or f"New post from {competitor_name}"
+        summary = entry.get('summary', '')
         
-        # Look for business-relevant keywords
         business_keywords = {
             'launch', 'release', 'announce', 'partnership', 'acquisition', 'merger',
-            'funding', 'investment', 'expansion', 'new', 'update', 'feature',
-            'product', 'service', 'pricing', 'price', 'customer', 'market'
+            'funding', 'investment', 'expansion', 'pricing', 'price'
         }
+        words = set(f"{title} {summary}".lower().split())
+        is_announcement = bool(words.intersection(business_keywords))
         
-        relevant_additions = added_words.intersection(business_keywords)
-        
-        if len(added_words) > 50 or len(removed_words) > 50 or relevant_additions:
-            return {
-                'change_type': "major_announcement" if relevant_additions else "major_update",
-                'importance_score': 8 if relevant_additions else 7,
-                'analysis': f"{competitor_name} made significant website updates, potentially indicating new business developments or product announcements",
-                'news_title': f"{competitor_name} Major Business Update Detected",
-                'news_excerpt': f"Significant changes detected on {competitor_name}'s website suggesting new announcements or product developments",
-                'source_links': website
-            }
-        elif len(added_words) > 10 or len(removed_words) > 10:
-            return {
-                'change_type': "content_update",
-                'importance_score': 5,
-                'analysis': f"{competitor_name} updated their website content, possibly with new information about products or services",
-                'news_title': f"{competitor_name} Website Content Updated",
-                'news_excerpt': f"Moderate content changes detected on {competitor_name}'s website with potential business relevance",
-                'source_links': website
-            }
-        else:
-            return {
-                'change_type': "minor_update",
-                'importance_score': 3,
-                'analysis': f"{competitor_name} made minor website adjustments, likely routine maintenance or small content updates",
-                'news_title': f"{competitor_name} Minor Website Updates",
-                'news_excerpt': f"Small routine updates detected on {competitor_name}'s website",
-                'source_links': website
-            }
+        return {
+            'change_type': "press_release" if is_announcement else "blog_post",
+            'importance_score': 7 if is_announcement else 5,
+            'analysis': f"{competitor_name} published \"{title}\"",
+            'news_title': title[:70],
+            'news_excerpt': (summary or f"New post published by {competitor_name}")[:180],
+            'source_links': link
+        }
+    
+    def narrate_digest_section(self, heading, facts, max_words=120):
+        """Body text for one digest section, written from its facts; raises if Ollama fails"""
+        prompt = f"""You are a business news analyst writing one section of a competitive intelligence newsletter.
+
+SECTION: {heading}
+
+FACTS:
+{truncate_to_tokens(facts, self.report_prompt_tokens)}
+
+Write only the body of this section, without a heading, in at most {max_words} words.
+Use short sentences or "• " bullets. Stick to the facts above; keep it professional and actionable."""
+        return self._call_ollama(prompt).strip()
     
-    def generate_weekly_summary(self, changes_data):
-        """Generate intelligent weekly summary focusing on news and updates"""
-        if not changes_data:
-            return "No significant competitor news or updates detected this week."
+    def _call_ollama(self, prompt, schema=None, parse=None):
+        """Call Ollama with the given prompt.
         
-        # Prepare news-focused data for analysis
-        news_items = []
-        high_priority_news = []
-        competitors_with_updates = set()
+        With a schema the HTTP backend returns JSON matching it; the CLI
+        backend ignores the schema and returns the cleaned text output.
+        With parse, the parsed response is returned and the raw text is
+        only cached once it parses, so a retry asks the model again.
+        """
+        key = self.cache.key(self.model, prompt, schema) if self.cache.enabled else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    return parse(cached) if parse else cached
+                except Exception as e:
+                    print(f"⚠️ Dropping unparseable cached Ollama response: {e}")
+                    self.cache.discard(key)
         
-        for change in changes_data[:15]:  # Limit to 15 most recent changes
-            competitors_with_updates.add(change['competitor_name'])
-            
-            news_item = {
-                'competitor': change['competitor_name'],
-                'title': change.get('news_title', f"{change['competitor_name']} Update"),
-                'excerpt': change.get('news_excerpt', change['analysis'][:100]),
-                'importance': change.get('importance_score', 5),
-                'type': change.get('change_type', 'update').replace('_', ' ').title(),
-                'date': change['detected_at'][:10]
-            }
-            
-            news_items.append(news_item)
-            
-            if change.get('importance_score', 5) >= 7:
-                high_priority_news.append(news_item)
+        if not self.breaker.allow(OLLAMA_CIRCUIT):
+            raise Exception("Ollama unavailable (circuit open)")
+        try:
+            if self.backend == 'cli':
+                result = self._call_ollama_cli(prompt)
+            else:
+                result = self._call_ollama_http(prompt, schema)
+        except Exception as e:
+            self.breaker.record_failure(OLLAMA_CIRCUIT, e)
+            raise
+        self.breaker.record_success(OLLAMA_CIRCUIT)
         
-        # Create news-focused prompt for Ollama
-        news_text = ""
-        for item in news_items:
-            news_text += f"""📰 {item['competitor']} - {item['date']}
-Headline: {item['title']}
-Summary: {item['excerpt']}
-Priority: {item['importance']}/10 | Type: {item['type']}
----
-"""
+        parsed = parse(result) if parse else result
+        if key and result:
+            self.cache.put(key, self.model, result)
+        return parsed
+    
+    def _stream_ollama(self, prompt):
+        """Yield response text as Ollama generates it, caching the full text once complete.
         
-        prompt = f"""You are a business news analyst creating a weekly competitive intelligence newsletter.
-
-COMPETITOR NEWS & UPDATES THIS WEEK:
-{news_text}
-
-OVERVIEW:
-- Total News Items: {len(news_items)}
-- High Priority Updates: {len(high_priority_news)}
-- Active Competitors: {len(competitors_with_updates)}
-
-Create a professional newsletter-style summary that includes:
-
-## 📰 Weekly Competitor News Digest
-
-### 🔥 Top Stories This Week
-[Highlight the most important news items as headlines with brief descriptions]
-
-### 📊 Market Intelligence Summary
-[Overall assessment of competitive landscape movements]
-
-### 🚨 Priority Alerts
-[Critical updates that require immediate attention]
-
-### 📈 Competitor Activity Breakdown
-[Brief overview of which competitors were most active]
-
-### 💡 Strategic Insights
-[Key takeaways and implications for our business]
-
-Write this as a news digest focusing on business updates, product launches, market moves, and strategic announcements. Keep it professional and actionable, under 400 words."""
+        A cached response is yielded in one piece; the CLI backend can't
+        stream, so its whole output arrives as a single piece too.
+        """
+        key = self.cache.key(self.model, prompt, None) if self.cache.enabled else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
         
+        if not self.breaker.allow(OLLAMA_CIRCUIT):
+            raise Exception("Ollama unavailable (circuit open)")
+        parts = []
+        failed = False
         try:
-            return self._call_ollama(prompt)
+            if self.backend == 'cli':
+                parts.append(self._call_ollama_cli(prompt))
+                yield parts[0]
+            else:
+                for piece in self._stream_ollama_http(prompt):
+                    parts.append(piece)
+                    yield piece
         except Exception as e:
-            print(f"⚠️ Ollama summary generation failed: {e}")
-            return self._fallback_news_summary(news_items, high_priority_news)
-    
-    def _fallback_news_summary(self, news_items, high_priority_news):
-        """Fallback news-focused summary when Ollama fails"""
-        summary = f"## 📰 Weekly Competitor News Digest\n\n"
-        
-        summary += f"### 🔥 Top Stories This Week\n"
-        if high_priority_news:
-            for item in high_priority_news[:3]:
-                summary += f"• **{item['competitor']}**: {item['title']}\n"
-                summary += f"  _{item['excerpt'][:80]}..._\n\n"
-        else:
-            summary += "• No high-priority news items this week\n\n"
-        
-        summary += f"### 📊 Market Intelligence Summary\n"
-        summary += f"This week we tracked {len(news_items)} news items and updates across "
-        summary += f"{len(set(item['competitor'] for item in news_items))} competitors. "
-        
-        if len(high_priority_news) > 3:
-            summary += f"We detected {len(high_priority_news)} high-priority developments requiring attention.\n\n"
-        elif len(high_priority_news) > 0:
-            summary += f"We identified {len(high_priority_news)} important updates worth monitoring.\n\n"
-        else:
-            summary += "Most activity was routine updates and minor changes.\n\n"
-        
-        summary += f"### 📈 Most Active Competitors\n"
-        competitor_activity = {}
-        for item in news_items:
-            competitor_activity[item['competitor']] = competitor_activity.get(item['competitor'], 0) + 1
+            failed = True
+            self.breaker.record_failure(OLLAMA_CIRCUIT, e)
+            raise
+        finally:
+            # Also runs when the client disconnects mid-stream (GeneratorExit): Ollama was
+            # answering, and a half-open probe slot must not stay taken
+            if not failed:
+                self.breaker.record_success(OLLAMA_CIRCUIT)
         
-        sorted_activity = sorted(competitor_activity.items(), key=lambda x: x[1], reverse=True)
-        for competitor, count in sorted_activity[:3]:
-            summary += f"• **{competitor}**: {count} news items\n"
-        
-        summary += f"\n### 💡 Strategic Insights\n"
-        if len(high_priority_news) > 2:
-            summary += "• High competitor activity suggests increased market competition\n"
-            summary += "• Monitor for potential market shifts and new opportunities\n"
-        else:
-            summary += "• Stable competitive environment with routine updates\n"
-            summary += "• Good opportunity to focus on internal product development\n"
+        # Only reached when the consumer read the whole response
+        result = ''.join(parts).strip()
+        if key and result:
+            self.cache.put(key, self.model, result)
+    
+    def _stream_with_fallback(self, prompt, fallback):
+        """('token', text) events as the model writes, then ('done', full_text).
         
-        summary += f"• Continue monitoring for emerging trends and strategic moves"
+        If Ollama fails, even part-way through, the fallback text is sent as
+        the final text and replaces whatever was streamed.
+        """
+        parts = []
+        try:
+            for piece in self._stream_ollama(prompt):
+                parts.append(piece)
+                yield 'token', piece
+        except Exception as e:
+            print(f"⚠️ Ollama streaming failed: {e}")
+            yield 'done', fallback()
+            return
+        yield 'done', ''.join(parts).strip()
+    
+    def _stream_ollama_http(self, prompt):
+        """Stream a generation from the Ollama HTTP API, one text piece per chunk"""
+        payload = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': True,
+            'keep_alive': self.keep_alive
+        }
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                         timeout=self.timeout, stream=True)
+        except requests.Timeout:
+            raise Exception("Ollama timeout")
+        except requests.ConnectionError:
+            raise Exception(f"Ollama not reachable at {self.base_url}. Is `ollama serve` running?")
         
-        return summary
+        # Closing the response returns the connection to the pool even if the
+        # consumer stops reading early
+        with response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama error: HTTP {response.status_code} {response.text[:200]}")
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(f"Ollama error: {chunk['error']}")
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        return
+            except requests.RequestException as e:
+                raise Exception(f"Ollama stream interrupted: {e}")
+    
+    def _call_ollama_http(self, prompt, schema=None):
+        """Call the Ollama HTTP API over the pooled session"""
+        payload = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': False,
+            'keep_alive': self.keep_alive
+        }
+        if schema:
+            payload['format'] = schema
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+        except requests.Timeout:
+            raise Exception("Ollama timeout")
+        except requests.ConnectionError:
+            raise Exception(f"Ollama not reachable at {self.base_url}. Is `ollama serve` running?")
+        if response.status_code != 200:
+            raise Exception(f"Ollama error: HTTP {response.status_code} {response.text[:200]}")
+        return response.json().get('response', '').strip()
     
-    def _call_ollama(self, prompt):
-        """Call Ollama with the given prompt"""
+    def _call_ollama_cli(self, prompt):
+        """Call Ollama through a one-off `ollama run` process"""
         try:
             process = subprocess.Popen(
                 ['ollama', 'run', self.model],
@@ -701,45 +1615,1077 @@ Write this as a news digest focusing on business updates, product launches, mark
         return '\n'.join(cleaned_lines)
     
     def _parse_enhanced_response(self, response, website):
-        """Parse structured Ollama response"""
+        """Parse structured Ollama response (JSON from the HTTP API or labelled lines from the CLI).
+        
+        Raises when the answer holds no analysis, so callers fall back
+        instead of storing (and caching) a placeholder.
+        """
+        result = {
+            'change_type': "content_update",
+            'importance_score': 5,
+            'analysis': "Content changes detected",
+            'news_title': "Website Update Detected",
+            'news_excerpt': "Changes identified in competitor website",
+            'source_links': website
+        }
+        
+        if response.lstrip().startswith('{'):
+            data = json.loads(response)
+            if not isinstance(data, dict):
+                raise Exception("Ollama answer is not a JSON object")
+            for key in ('change_type', 'news_title', 'news_excerpt', 'analysis'):
+                if data.get(key):
+                    result[key] = str(data[key]).strip()
+            try:
+                result['importance_score'] = int(data.get('importance', 5))
+            except (TypeError, ValueError):
+                result['importance_score'] = 5
+            return result
+        
+        found = False
+        for line in response.split('\n'):
+            if line.startswith('CHANGE_TYPE:'):
+                result['change_type'] = line.split(':', 1)[1].strip()
+            elif line.startswith('IMPORTANCE:'):
+                try:
+                    result['importance_score'] = int(line.split(':', 1)[1].strip())
+                except:
+                    result['importance_score'] = 5
+            elif line.startswith('NEWS_TITLE:'):
+                result['news_title'] = line.split(':', 1)[1].strip()
+            elif line.startswith('NEWS_EXCERPT:'):
+                result['news_excerpt'] = line.split(':', 1)[1].strip()
+            elif line.startswith('ANALYSIS:'):
+                result['analysis'] = line.split(':', 1)[1].strip()
+            else:
+                continue
+            found = True
+        
+        if not found:
+            raise Exception("No analysis fields in Ollama answer")
+        return result
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker tracked per key (e.g. domain).
+    
+    Decisions use this process's own view. With a scope, every state
+    change is also written to the circuits table, so snapshot() shows
+    what the web process and all scan workers last saw.
+    """
+    
+    def __init__(self, failure_threshold=3, reset_timeout=600, scope=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._circuits = {}
+    
+    def _persist(self, key, circuit):
+        if not self.scope:
+            return
         try:
-            lines = response.split('\n')
-            result = {
-                'change_type': "content_update",
-                'importance_score': 5,
-                'analysis': "Content changes detected",
-                'news_title': "Website Update Detected",
-                'news_excerpt': "Changes identified in competitor website",
-                'source_links': website
-            }
+            conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+            conn.execute('''
+                INSERT OR REPLACE INTO circuits (scope, key, state, failures, last_error, retry_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (self.scope, key, circuit['state'], circuit['failures'], circuit['last_error'],
+                  datetime.fromtimestamp(circuit['opened_at'] + self.reset_timeout).isoformat()
+                  if circuit['state'] == 'open' else None, datetime.now().isoformat()))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not record circuit state for {key}: {e}")
+    
+    def _circuit(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = {'state': 'closed', 'failures': 0, 'opened_at': None,
+                       'last_error': None, 'probe_in_flight': False}
+            self._circuits[key] = circuit
+        return circuit
+    
+    def allow(self, key):
+        """Whether a call may go through; lets a single probe out once the reset timeout passes"""
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit['state'] == 'closed':
+                return True
+            if circuit['state'] == 'open' and time.time() - circuit['opened_at'] >= self.reset_timeout:
+                circuit['state'] = 'half_open'
+            if circuit['state'] == 'half_open' and not circuit['probe_in_flight']:
+                circuit['probe_in_flight'] = True
+                return True
+            return False
+    
+    def ready(self, key):
+        """Whether allow() would let a call through, without taking the half-open probe slot"""
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit['state'] == 'open' and time.time() - circuit['opened_at'] >= self.reset_timeout:
+                circuit['state'] = 'half_open'
+            return circuit['state'] == 'closed' or (circuit['state'] == 'half_open' and not circuit['probe_in_flight'])
+    
+    def state(self, key):
+        with self._lock:
+            return self._circuit(key)['state']
+    
+    def trip(self, key, error):
+        """Open the circuit straight away, e.g. when a health probe fails"""
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit['failures'] += 1
+            circuit['last_error'] = str(error)[:200]
+            circuit['probe_in_flight'] = False
+            if circuit['state'] != 'open':
+                print(f"🔌 Circuit opened for {key}: {error}")
+                circuit['state'] = 'open'
+            circuit['opened_at'] = time.time()
+            state = dict(circuit)
+        self._persist(key, state)
+    
+    def record_success(self, key):
+        with self._lock:
+            circuit = self._circuit(key)
+            changed = circuit['state'] != 'closed' or circuit['failures']
+            if circuit['state'] != 'closed':
+                print(f"🔌 Circuit closed for {key}")
+            circuit.update(state='closed', failures=0, opened_at=None, last_error=None, probe_in_flight=False)
+            state = dict(circuit)
+        # Healthy hosts stay out of the database until they first fail
+        if changed:
+            self._persist(key, state)
+    
+    def record_failure(self, key, error):
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit['failures'] += 1
+            circuit['last_error'] = str(error)[:200]
+            circuit['probe_in_flight'] = False
+            if circuit['state'] == 'half_open' or circuit['failures'] >= self.failure_threshold:
+                if circuit['state'] != 'open':
+                    print(f"🔌 Circuit opened for {key} after {circuit['failures']} failures: {error}")
+                circuit['state'] = 'open'
+                circuit['opened_at'] = time.time()
+            state = dict(circuit)
+        self._persist(key, state)
+    
+    def snapshot(self):
+        """Current breaker states for display, worst first; across all processes when scoped"""
+        order = {'open': 0, 'half_open': 1, 'closed': 2}
+        if self.scope:
+            conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+            rows = conn.execute('''
+                SELECT key, state, failures, last_error, retry_at FROM circuits WHERE scope = ?
+            ''', (self.scope,)).fetchall()
+            conn.close()
+            states = [{'key': key, 'state': state, 'failures': failures, 'last_error': last_error,
+                       'retry_at': retry_at} for key, state, failures, last_error, retry_at in rows]
+            return sorted(states, key=lambda c: (order[c['state']], c['key']))
+        with self._lock:
+            states = [{
+                'key': key,
+                'state': circuit['state'],
+                'failures': circuit['failures'],
+                'last_error': circuit['last_error'],
+                'retry_at': (datetime.fromtimestamp(circuit['opened_at'] + self.reset_timeout).isoformat()
+                             if circuit['state'] == 'open' else None)
+            } for key, circuit in self._circuits.items()]
+        return sorted(states, key=lambda c: (order[c['state']], c['key']))
+
+# HTML extraction backends
+STRIPPED_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+MAIN_CONTENT_CLASS = re.compile(r'content|main')
+CHANGELOG_INDICATORS = [
+    'changelog', 'release notes', 'what\'s new', 'updates', 
+    'version', 'releases', 'news', 'announcements', 'blog'
+]
+# One alternation for all indicators; the group name carries the indicator's
+# priority. No indicator is a prefix of another, so at most one matches at a
+# given position and the lookahead scan finds every (overlapping) occurrence.
+CHANGELOG_INDICATOR_PATTERN = re.compile(
+    '|'.join(f'(?P<i{index}>{re.escape(indicator)})' for index, indicator in enumerate(CHANGELOG_INDICATORS)),
+    re.IGNORECASE
+)
+CHANGELOG_INDICATOR_SCAN = re.compile(f'(?=(?:{CHANGELOG_INDICATOR_PATTERN.pattern}))', re.IGNORECASE)
+CHANGELOG_BUDGET = 2000
+CHANGELOG_CONTEXT_BEFORE = 400
+CHANGELOG_CONTEXT_AFTER = 1000
+
+def clean_page_text(text):
+    """Collapse raw page text into a single whitespace-normalized line"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+def find_changelog_section(candidates):
+    """Pick the changelog section from (element, class string) pairs in one pass.
+    
+    Lower-priority indicators win, then document order - the same result as
+    searching the tree once per indicator.
+    """
+    best_section = None
+    best_priority = len(CHANGELOG_INDICATORS)
+    for element, class_string in candidates:
+        for match in CHANGELOG_INDICATOR_SCAN.finditer(class_string):
+            priority = int(match.lastgroup[1:])
+            if priority < best_priority:
+                best_section, best_priority = element, priority
+        if best_priority == 0:
+            break
+    return best_section
+
+def extract_changelog_from_text(text):
+    """Fallback changelog extraction by searching the cleaned text.
+    
+    Equivalent to running '.{0,400}<indicator>.{0,1000}' findall per
+    indicator on single-line text, but finds all indicators in one scan and
+    cuts the windows by index.
+    """
+    occurrences = [[] for _ in CHANGELOG_INDICATORS]
+    for match in CHANGELOG_INDICATOR_SCAN.finditer(text):
+        occurrences[int(match.lastgroup[1:])].append(match.start())
+    
+    changelog_content = ""
+    for indicator, positions in zip(CHANGELOG_INDICATORS, occurrences):
+        windows = []
+        windows_length = 0
+        search_from = 0
+        index = 0
+        while index < len(positions) and len(changelog_content) + windows_length < CHANGELOG_BUDGET:
+            if positions[index] < search_from:
+                index += 1
+                continue
+            # Leftmost window start, then the greedy prefix reaches the last
+            # occurrence that still fits within the leading context
+            start = max(search_from, positions[index] - CHANGELOG_CONTEXT_BEFORE)
+            while index + 1 < len(positions) and positions[index + 1] <= start + CHANGELOG_CONTEXT_BEFORE:
+                index += 1
+            end = min(len(text), positions[index] + len(indicator) + CHANGELOG_CONTEXT_AFTER)
+            windows.append(text[start:end])
+            windows_length += end - start + 1
+            search_from = end
+            index += 1
+        changelog_content += ' '.join(windows)
+        if len(changelog_content) >= CHANGELOG_BUDGET:
+            break
+    
+    return changelog_content[:CHANGELOG_BUDGET]
+
+class BeautifulSoupExtractor:
+    """Reference extractor using BeautifulSoup's pure-Python parser"""
+    
+    name = 'beautifulsoup'
+    
+    def extract(self, html):
+        """Return title, cleaned text and changelog content for an HTML page"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Remove unwanted elements
+        for element in soup(STRIPPED_TAGS):
+            element.decompose()
+        
+        # Extract main content
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=MAIN_CONTENT_CLASS)
+        if main_content:
+            text = main_content.get_text()
+        else:
+            text = soup.get_text()
+        
+        clean_text = clean_page_text(text)
+        headings = [clean_page_text(h.get_text()) for h in (main_content or soup).find_all(HEADING_TAGS)]
+        
+        return {
+            'title': soup.title.string if soup.title else 'No title',
+            'text': clean_text,
+            'headings': headings,
+            'changelog_content': self._extract_changelog_content(soup, clean_text)
+        }
+    
+    def _extract_changelog_content(self, soup, text):
+        """Enhanced changelog extraction"""
+        # Look for dedicated changelog sections
+        changelog_section = find_changelog_section(
+            (section, ' '.join(section['class'])) for section in soup.find_all(['div', 'section'], class_=True)
+        )
+        if changelog_section:
+            return changelog_section.get_text()[:CHANGELOG_BUDGET]
+        
+        return extract_changelog_from_text(text)
+
+class LxmlExtractor:
+    """Fast extractor on libxml2 that mirrors BeautifulSoupExtractor's output"""
+    
+    name = 'lxml'
+    
+    def extract(self, html):
+        """Return title, cleaned text and changelog content for an HTML page"""
+        # Decode the way BeautifulSoup does so both backends see the same text
+        markup = UnicodeDammit(html, is_html=True).unicode_markup if isinstance(html, bytes) else html
+        try:
+            doc = lxml_html.document_fromstring(
+                markup.encode('utf-8'), parser=lxml_html.HTMLParser(encoding='utf-8')
+            )
+        except lxml_etree.ParserError:
+            return {'title': 'No title', 'text': '', 'headings': [], 'changelog_content': ''}
+        
+        self._collapse_blank_strings(doc)
+        
+        # Remove unwanted elements; drop_tree keeps the tail text like decompose does
+        for element in list(doc.iter(*STRIPPED_TAGS)):
+            element.drop_tree()
+        
+        # Extract main content
+        main_content = next(doc.iter('main'), None)
+        if main_content is None:
+            main_content = next(doc.iter('article'), None)
+        if main_content is None:
+            main_content = next((div for div in doc.iter('div') if MAIN_CONTENT_CLASS.search(self._class_string(div))), None)
+        content_root = main_content if main_content is not None else doc
+        clean_text = clean_page_text(content_root.text_content())
+        headings = [clean_page_text(h.text_content()) for h in content_root.iter(*HEADING_TAGS)]
+        
+        title = next(doc.iter('title'), None)
+        
+        return {
+            'title': title.text if title is not None else 'No title',
+            'text': clean_text,
+            'headings': headings,
+            'changelog_content': self._extract_changelog_content(doc, clean_text)
+        }
+    
+    def _collapse_blank_strings(self, doc):
+        """Reduce whitespace-only strings to '\n' or ' ', as BeautifulSoup does outside <pre>/<textarea>"""
+        preserved = {el for container in doc.iter('pre', 'textarea') for el in container.iter()}
+        for element in doc.iter():
+            if isinstance(element.tag, str) and element not in preserved:
+                element.text = self._collapse_blank(element.text)
+            if element.getparent() not in preserved:
+                element.tail = self._collapse_blank(element.tail)
+    
+    def _collapse_blank(self, value):
+        if not value or value.strip(' \n\t\x0c\r'):
+            return value
+        return '\n' if '\n' in value else ' '
+    
+    def _class_string(self, element):
+        """Whitespace-normalized class attribute, matching BeautifulSoup's class_ search"""
+        return ' '.join(element.get('class', '').split())
+    
+    def _extract_changelog_content(self, doc, text):
+        """Changelog extraction with the same precedence as the BeautifulSoup backend"""
+        changelog_section = find_changelog_section(
+            (section, self._class_string(section)) for section in doc.iter('div', 'section') if section.get('class')
+        )
+        if changelog_section is not None:
+            return changelog_section.text_content()[:CHANGELOG_BUDGET]
+        
+        return extract_changelog_from_text(text)
+
+HTML_EXTRACTORS = {
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor
+}
+
+def get_extractor(name='auto'):
+    """Build an HTML extractor, falling back to BeautifulSoup when lxml is missing"""
+    if not name or name == 'auto':
+        name = LxmlExtractor.name if lxml_html is not None else BeautifulSoupExtractor.name
+    
+    if name == LxmlExtractor.name and lxml_html is None:
+        print("⚠️ lxml not installed. Falling back to BeautifulSoup extraction.")
+        name = BeautifulSoupExtractor.name
+    
+    extractor_class = HTML_EXTRACTORS.get(name)
+    if extractor_class is None:
+        print(f"⚠️ Unknown HTML extractor '{name}'. Falling back to BeautifulSoup extraction.")
+        extractor_class = BeautifulSoupExtractor
+    
+    return extractor_class()
+
+# Section fingerprinting
+BLOCK_TEXT_LIMIT = 1500
+BLOCK_SHINGLE_SIZE = 4
+BLOCK_MATCH_THRESHOLD = 0.5
+
+def split_into_blocks(text, headings):
+    """Split cleaned page text into heading-delimited blocks with fingerprints"""
+    boundaries = [(0, '')]
+    position = 0
+    for heading in headings:
+        if not heading:
+            continue
+        index = text.find(heading, position)
+        if index == -1:
+            continue
+        if index > boundaries[-1][0]:
+            boundaries.append((index, heading))
+        else:
+            boundaries[-1] = (index, heading)
+        position = index + len(heading)
+    
+    blocks = []
+    for i, (start, heading) in enumerate(boundaries):
+        end = boundaries[i + 1][0] if i + 1 < len(boundaries) else len(text)
+        block_text = text[start:end].strip()
+        if block_text:
+            blocks.append({
+                'heading': heading,
+                'hash': hashlib.md5(block_text.encode('utf-8')).hexdigest(),
+                'text': block_text[:BLOCK_TEXT_LIMIT]
+            })
+    return blocks
+
+def _block_shingles(text):
+    words = text.lower().split()
+    if len(words) <= BLOCK_SHINGLE_SIZE:
+        return {hash(' '.join(words))}
+    return {hash(' '.join(words[i:i + BLOCK_SHINGLE_SIZE])) for i in range(len(words) - BLOCK_SHINGLE_SIZE + 1)}
+
+def diff_blocks(old_blocks, new_blocks):
+    """Classify blocks as added, removed or modified between two snapshots.
+    
+    Blocks with identical fingerprints are unchanged. Remaining blocks are
+    paired as modified when they share a heading or their word shingles
+    overlap enough; the rest are added or removed.
+    """
+    old_hashes = {block['hash'] for block in old_blocks}
+    new_hashes = {block['hash'] for block in new_blocks}
+    removed = [block for block in old_blocks if block['hash'] not in new_hashes]
+    added = [block for block in new_blocks if block['hash'] not in old_hashes]
+    
+    modified = []
+    for new_block in list(added):
+        best_match, best_score = None, BLOCK_MATCH_THRESHOLD
+        new_shingles = _block_shingles(new_block['text'])
+        for old_block in removed:
+            if new_block['heading'] and old_block['heading'] == new_block['heading']:
+                best_match = old_block
+                break
+            old_shingles = _block_shingles(old_block['text'])
+            score = len(new_shingles & old_shingles) / len(new_shingles | old_shingles)
+            if score >= best_score:
+                best_match, best_score = old_block, score
+        if best_match is not None:
+            modified.append({'heading': new_block['heading'] or best_match['heading'],
+                             'old_text': best_match['text'], 'new_text': new_block['text']})
+            removed.remove(best_match)
+            added.remove(new_block)
+    
+    return {'added': added, 'removed': removed, 'modified': modified}
+
+# Near-duplicate detection
+SIMHASH_SHINGLE_SIZE = 3
+
+def simhash(text):
+    """64-bit SimHash of a text's word shingles, as 16 hex digits"""
+    words = re.findall(r"[a-z0-9']+", (text or '').lower())
+    shingles = {' '.join(words[i:i + SIMHASH_SHINGLE_SIZE])
+                for i in range(max(1, len(words) - SIMHASH_SHINGLE_SIZE + 1))}
+    # Each output bit is set when most shingle hashes have it set; counting
+    # down the columns of the binary strings keeps the loop out of Python
+    rows = [format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+            for shingle in shingles]
+    majority = len(rows) / 2
+    bits = ''.join('1' if column.count('1') > majority else '0' for column in map(''.join, zip(*rows)))
+    return f"{int(bits, 2):016x}"
+
+def simhash_distance(a, b):
+    """Number of differing bits between two simhash() fingerprints"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+class SnapshotStore:
+    """Compressed page bodies stored once per content_hash.
+    
+    content_snapshots and changes reference bodies by their content_hash
+    column; inline copies are only kept for rows written before the store
+    existed that could not be moved (e.g. a hash shared by two bodies).
+    """
+    
+    def __init__(self):
+        self.codec = 'zstd' if zstandard is not None else 'zlib'
+    
+    def encode(self, text):
+        data = (text or '').encode('utf-8')
+        if self.codec == 'zstd':
+            return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+        return 'zlib', zlib.compress(data, 9)
+    
+    def decode(self, codec, body):
+        if body is None:
+            return None
+        if codec == 'zstd':
+            if zstandard is None:
+                raise Exception("Snapshot is zstd-compressed but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(body).decode('utf-8')
+        if codec == 'zlib':
+            return zlib.decompress(body).decode('utf-8')
+        return body.decode('utf-8') if isinstance(body, bytes) else body
+    
+    def put(self, cursor, content_hash, text):
+        """Store a body inside the caller's transaction; existing hashes are left alone"""
+        codec, body = self.encode(text)
+        cursor.execute('''
+            INSERT OR IGNORE INTO content_store (hash, codec, body, size, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (content_hash, codec, body, len(text or ''), datetime.now().isoformat()))
+    
+    def get_many(self, cursor, hashes):
+        """Decoded bodies for the given hashes, skipping unknown ones"""
+        hashes = list({h for h in hashes if h})
+        bodies = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            cursor.execute(f'''
+                SELECT hash, codec, body FROM content_store
+                WHERE hash IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            for content_hash, codec, body in cursor.fetchall():
+                bodies[content_hash] = self.decode(codec, body)
+        return bodies
+    
+    def migrate_inline_content(self, batch_size=500):
+        """Move inline full_content / content columns into the store"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        moved = 0
+        for table, column in (('content_snapshots', 'full_content'), ('changes', 'content')):
+            last_id = 0
+            while True:
+                cursor.execute(f'''
+                    SELECT id, content_hash, {column} FROM {table}
+                    WHERE id > ? AND {column} IS NOT NULL AND content_hash IS NOT NULL
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                for _, content_hash, text in rows:
+                    self.put(cursor, content_hash, text)
+                stored = self.get_many(cursor, [row[1] for row in rows])
+                # Only drop the inline copy when the store holds exactly this body
+                movable = [(row_id,) for row_id, content_hash, text in rows if stored.get(content_hash) == text]
+                cursor.executemany(f'UPDATE {table} SET {column} = NULL WHERE id = ?', movable)
+                conn.commit()
+                moved += len(movable)
+        
+        if moved:
+            # One-off: hand the freed pages back to the filesystem
+            cursor.execute('VACUUM')
+            print(f"🗜️ Moved {moved} inline snapshot bodies into the compressed content store")
+        conn.close()
+        return moved
+
+class AnalysisQueue:
+    """Bounded priority queue of change records waiting for LLM analysis.
+    
+    Scans store each change with a cheap heuristic analysis and enqueue it
+    here; a small pool of worker threads replaces the heuristic with the
+    model's answer, most important-looking changes first. When the queue
+    is full, submit waits up to block_seconds and then gives up, leaving
+    the heuristic analysis in place.
+    
+    Pending rows name the process holding them (analysis_owner) and when
+    it last vouched for them (analysis_claimed_at); recover_stale takes
+    over rows whose owner stopped doing so, e.g. because it crashed.
+    """
+    
+    def __init__(self, ai, workers=6, max_size=200, block_seconds=10, max_attempts=3, stale_seconds=900):
+        self.ai = ai
+        self.owner = f'{socket.gethostname()}-{os.getpid()}'
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self.workers = workers
+        self.max_size = max_size
+        self.block_seconds = block_seconds
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self.in_flight = 0
+        self.counters = {'queued': 0, 'analyzed': 0, 'shed': 0, 'failed': 0, 'deferred': 0}
+    
+    def configure(self, settings):
+        """Refresh queue limits from the settings table"""
+        try:
+            self.workers = max(1, int(settings.get('ai_queue_workers', self.workers)))
+            self.max_size = max(1, int(settings.get('ai_queue_max_size', self.max_size)))
+            self.block_seconds = max(0.0, float(settings.get('ai_queue_block_seconds', self.block_seconds)))
+            self.max_attempts = max(1, int(settings.get('ai_queue_max_attempts', self.max_attempts)))
+            self.stale_seconds = max(60, int(settings.get('ai_queue_stale_seconds', self.stale_seconds)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid AI queue settings, keeping current limits: {e}")
+    
+    def _connect(self):
+        # Autocommit mode so claims can take the write lock up front with BEGIN IMMEDIATE
+        return sqlite3.connect('competitor_tracker.db', timeout=30, isolation_level=None)
+    
+    def _start_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, change_id, task, priority):
+        """Queue a stored change for analysis; False when shed under backpressure"""
+        deadline = time.monotonic() + self.block_seconds
+        with self._condition:
+            self._start_workers()
+            while len(self._heap) >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['shed'] += 1
+                    break
+                self._condition.wait(remaining)
+            else:
+                self._sequence += 1
+                heapq.heappush(self._heap, (-priority, self._sequence, change_id, task))
+                self.counters['queued'] += 1
+                self._condition.notify_all()
+                return True
+        
+        print(f"⚠️ AI analysis queue full, keeping heuristic analysis for change {change_id}")
+        self._mark(change_id, 'heuristic')
+        return False
+    
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                _, _, change_id, task = heapq.heappop(self._heap)
+                self.in_flight += 1
+                self._condition.notify_all()
+            try:
+                if not self.ai.available():
+                    self._defer(change_id, task)
+                    continue
+                if task['kind'] == 'feed':
+                    result = self.ai.analyze_feed_entry(task['entry'], task['competitor_name'], task['website'])
+                else:
+                    result = self.ai.analyze_change_item(task['item'])
+                if result.pop('fallback', False):
+                    # Ollama failed, so this is only the heuristic answer; try again once it recovers
+                    task['attempts'] = task.get('attempts', 0) + 1
+                    if task['attempts'] < self.max_attempts:
+                        self._defer(change_id, task)
+                    else:
+                        self._mark(change_id, 'heuristic')
+                    continue
+                self._store(change_id, result)
+                with self._condition:
+                    self.counters['analyzed'] += 1
+            except Exception as e:
+                print(f"❌ AI analysis of change {change_id} failed: {e}")
+                self._mark(change_id, 'heuristic')
+                with self._condition:
+                    self.counters['failed'] += 1
+            finally:
+                with self._condition:
+                    self.in_flight -= 1
+                    self._condition.notify_all()
+    
+    def _store(self, change_id, result):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        previous = conn.execute('''
+            SELECT competitor_id, competitor_name, detected_at, importance_score FROM changes WHERE id = ?
+        ''', (change_id,)).fetchone()
+        conn.execute('''
+            UPDATE changes SET analysis = ?, change_type = ?, importance_score = ?, news_title = ?,
+                news_excerpt = ?, source_links = ?, analysis_status = 'done', analysis_input = NULL,
+                analysis_owner = NULL, analysis_claimed_at = NULL
+            WHERE id = ?
+        ''', (result['analysis'], result['change_type'], result['importance_score'], result['news_title'],
+              result['news_excerpt'], result['source_links'], change_id))
+        if previous:
+            # The model's score replaces the heuristic one in the digest rollups too
+            record_digest_rollup(conn.cursor(), previous[0], previous[1], previous[2], result['importance_score'],
+                                 previous[3])
+        conn.commit()
+        conn.close()
+    
+    def _mark(self, change_id, status):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        conn.execute('''
+            UPDATE changes SET analysis_status = ?, analysis_input = NULL, analysis_owner = NULL,
+                analysis_claimed_at = NULL
+            WHERE id = ?
+        ''', (status, change_id))
+        conn.commit()
+        conn.close()
+    
+    def _defer(self, change_id, task):
+        """Keep the heuristic analysis and the input until Ollama is back"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        conn.execute('''
+            UPDATE changes SET analysis_status = 'deferred', analysis_input = ?, analysis_owner = NULL,
+                analysis_claimed_at = NULL
+            WHERE id = ?
+        ''', (json.dumps(task), change_id))
+        conn.commit()
+        conn.close()
+        with self._condition:
+            self.counters['deferred'] += 1
+    
+    def _claim(self, status, claimed_before=None):
+        """Atomically make this process the owner of matching rows and return them as pending"""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            if claimed_before is None:
+                cursor.execute('''
+                    SELECT id, analysis_input, importance_score FROM changes
+                    WHERE analysis_status = ? AND analysis_input IS NOT NULL
+                ''', (status,))
+            else:
+                cursor.execute('''
+                    SELECT id, analysis_input, importance_score FROM changes
+                    WHERE analysis_status = ? AND analysis_input IS NOT NULL
+                        AND (analysis_claimed_at IS NULL OR analysis_claimed_at < ?)
+                ''', (status, claimed_before))
+            claimed = cursor.fetchall()
+            cursor.executemany('''
+                UPDATE changes SET analysis_status = 'pending', analysis_owner = ?, analysis_claimed_at = ?
+                WHERE id = ?
+            ''', [(self.owner, now, change_id) for change_id, _, _ in claimed])
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        for change_id, task, priority in claimed:
+            self.submit(change_id, json.loads(task), priority or 0)
+        return len(claimed)
+    
+    def requeue_deferred(self):
+        """Re-queue changes analyzed while Ollama was unavailable"""
+        requeued = self._claim('deferred')
+        if requeued:
+            print(f"♻️ Ollama is back, re-queued {requeued} changes for AI analysis")
+        return requeued
+    
+    def recover_stale(self):
+        """Keep this process's pending rows fresh, then take over those nobody has vouched for lately"""
+        conn = self._connect()
+        conn.execute('''
+            UPDATE changes SET analysis_claimed_at = ?
+            WHERE analysis_status = 'pending' AND analysis_owner = ?
+        ''', (datetime.now().isoformat(), self.owner))
+        conn.close()
+        cutoff = (datetime.now() - timedelta(seconds=self.stale_seconds)).isoformat()
+        recovered = self._claim('pending', claimed_before=cutoff)
+        if recovered:
+            print(f"♻️ Re-queued {recovered} changes left pending by a stopped process")
+        return recovered
+    
+    def join(self, timeout=None):
+        """Wait until every queued change has been analyzed; False on timeout"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while self._heap or self.in_flight:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+    
+    def stats(self):
+        with self._condition:
+            stats = dict(self.counters)
+            stats.update(depth=len(self._heap), in_flight=self.in_flight, workers=self.workers,
+                         max_size=self.max_size)
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        stats['waiting_for_ollama'] = conn.execute(
+            "SELECT COUNT(*) FROM changes WHERE analysis_status = 'deferred'").fetchone()[0]
+        conn.close()
+        return stats
+
+DIGEST_PERIODS = {
+    'week': {'days': 7, 'title': 'Weekly Competitor News Digest', 'span': 'Week'},
+    'month': {'days': 30, 'title': 'Monthly Competitor News Digest', 'span': 'Month'}
+}
+
+def record_digest_rollup(cursor, competitor_id, competitor_name, detected_at, importance, previous_importance=None):
+    """Fold a new change, or a re-scored one, into its per-day digest rollup.
+    
+    Runs inside the caller's transaction so the rollup and the change
+    record commit together.
+    """
+    importance = importance or 0
+    if previous_importance is None:
+        deltas = (1, int(importance >= 7), importance)
+    else:
+        previous_importance = previous_importance or 0
+        deltas = (0, int(importance >= 7) - int(previous_importance >= 7), importance - previous_importance)
+    cursor.execute('''
+        INSERT INTO digest_rollups (day, competitor_id, competitor_name, changes, high_priority,
+                                    importance_total, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day, competitor_id) DO UPDATE SET
+            competitor_name = excluded.competitor_name,
+            changes = changes + excluded.changes,
+            high_priority = high_priority + excluded.high_priority,
+            importance_total = importance_total + excluded.importance_total,
+            updated_at = excluded.updated_at
+    ''', ((detected_at or '')[:10], competitor_id or 0, competitor_name or 'Unknown', *deltas, time.time()))
+
+class ChangeDigest:
+    """Materialized news digests for the summary, Slack and PDF endpoints.
+    
+    Every stored or re-analyzed change updates the per-day, per-competitor
+    rollups (record_digest_rollup). refresh() rebuilds a period's sections
+    from the rollups and the window's top stories, and only asks Ollama
+    to re-narrate a section when the facts it is written from changed;
+    everything else keeps its stored text. get() serves the stored digest
+    and refreshes it in the background when it is out of date.
+    """
+    
+    def __init__(self, ai, top_stories=5, alert_importance=8):
+        self.ai = ai
+        self.top_stories = top_stories
+        self.alert_importance = alert_importance
+        self.narrate = True
+        self.counters = {'refreshes': 0, 'narrated': 0, 'reused': 0}
+        self._lock = threading.Lock()
+        self._kick_lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+    
+    def configure(self, settings):
+        """Refresh digest options from the settings table"""
+        self.narrate = str(settings.get('digest_ai_narration', 'true')).lower() == 'true'
+        try:
+            self.top_stories = max(1, int(settings.get('digest_top_stories', self.top_stories)))
+            self.alert_importance = max(1, int(settings.get('digest_alert_importance', self.alert_importance)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid digest settings, keeping current values: {e}")
+    
+    def _window_start(self, period):
+        """First day (ISO date) covered by the period's rolling window"""
+        return (datetime.now().date() - timedelta(days=DIGEST_PERIODS[period]['days'] - 1)).isoformat()
+    
+    def get(self, period='week'):
+        """The stored digest for a period, built without narration the first time it is asked for"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        row = conn.execute('''
+            SELECT summary, changes_count, window_start, built_at, updated_at FROM digests WHERE period = ?
+        ''', (period,)).fetchone()
+        latest = conn.execute('SELECT MAX(updated_at) FROM digest_rollups').fetchone()[0] or 0
+        conn.close()
+        
+        if row is None:
+            digest = self.refresh(period, narrate=False)
+            self.kick()
+            return dict(digest, stale=self.narrate)
+        
+        stale = row[2] != self._window_start(period) or latest >= row[3]
+        if stale:
+            self.kick()
+        return {'summary': row[0], 'changes_count': row[1], 'updated_at': row[4], 'stale': stale}
+    
+    def invalidate(self):
+        """Force the next get() to refresh, e.g. after change records were deleted"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        conn.execute('UPDATE digests SET built_at = 0')
+        conn.commit()
+        conn.close()
+    
+    def kick(self):
+        """Refresh every period on a background thread, coalescing concurrent requests"""
+        with self._kick_lock:
+            self._pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._kick_lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            try:
+                self.refresh_all()
+            except Exception as e:
+                print(f"❌ Digest refresh failed: {e}")
+    
+    def refresh_all(self):
+        return {period: self.refresh(period) for period in DIGEST_PERIODS}
+    
+    def refresh(self, period='week', narrate=None):
+        """Rebuild one period's digest, re-narrating only the sections whose facts changed"""
+        narrate = self.narrate if narrate is None else narrate
+        with self._lock:
+            # Changes rolled up after this point make the digest stale again
+            built_at = time.time()
+            window_start = self._window_start(period)
+            conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+            cursor = conn.cursor()
+            facts = self._gather(cursor, window_start)
+            cursor.execute('SELECT section, fingerprint, content FROM digest_sections WHERE period = ?', (period,))
+            stored = {section: (fingerprint, content) for section, fingerprint, content in cursor.fetchall()}
+            conn.close()
             
-            for line in lines:
-                if line.startswith('CHANGE_TYPE:'):
-                    result['change_type'] = line.split(':', 1)[1].strip()
-                elif line.startswith('IMPORTANCE:'):
-                    try:
-                        result['importance_score'] = int(line.split(':', 1)[1].strip())
-                    except:
-                        result['importance_score'] = 5
-                elif line.startswith('NEWS_TITLE:'):
-                    result['news_title'] = line.split(':', 1)[1].strip()
-                elif line.startswith('NEWS_EXCERPT:'):
-                    result['news_excerpt'] = line.split(':', 1)[1].strip()
-                elif line.startswith('ANALYSIS:'):
-                    result['analysis'] = line.split(':', 1)[1].strip()
+            config = DIGEST_PERIODS[period]
+            sections = {}
+            if facts['changes_count']:
+                for name, heading, source, local_text, narrated in self._sections(facts, config):
+                    fingerprint = hashlib.md5(source.encode('utf-8')).hexdigest()
+                    if stored.get(name, (None,))[0] == fingerprint:
+                        sections[name] = (fingerprint, stored[name][1])
+                        self.counters['reused'] += 1
+                        continue
+                    content = local_text
+                    if narrated:
+                        # Text that was not written by the model is retried on the next refresh
+                        fingerprint = None
+                        if narrate:
+                            try:
+                                content = self.ai.narrate_digest_section(heading, source)
+                                fingerprint = hashlib.md5(source.encode('utf-8')).hexdigest()
+                                self.counters['narrated'] += 1
+                            except Exception as e:
+                                print(f"⚠️ Digest narration of {name} failed, using the local summary: {e}")
+                                content = local_text
+                    sections[name] = (fingerprint, content)
+                summary = self._assemble(config, {name: content for name, (_, content) in sections.items()})
+            else:
+                summary = f"No changes detected in the past {config['span'].lower()}."
             
-            return result
-                
-        except Exception as e:
-            print(f"Error parsing Ollama response: {e}")
-            return {
-                'change_type': "content_update",
-                'importance_score': 5,
-                'analysis': response[:200] if response else "Analysis failed",
-                'news_title': "Website Changes Detected",
-                'news_excerpt': "AI analysis completed",
-                'source_links': website
-            }
+            updated_at = datetime.now().isoformat()
+            conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM digest_sections WHERE period = ?', (period,))
+            cursor.executemany('''
+                INSERT INTO digest_sections (period, section, fingerprint, content, updated_at) VALUES (?, ?, ?, ?, ?)
+            ''', [(period, name, fingerprint, content, updated_at) for name, (fingerprint, content) in sections.items()])
+            cursor.execute('''
+                INSERT OR REPLACE INTO digests (period, summary, changes_count, window_start, built_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (period, summary, facts['changes_count'], window_start, built_at, updated_at))
+            conn.commit()
+            conn.close()
+            self.counters['refreshes'] += 1
+            return {'summary': summary, 'changes_count': facts['changes_count'], 'updated_at': updated_at,
+                    'stale': False}
+    
+    def _gather(self, cursor, window_start):
+        """Counts and per-competitor activity from the rollups, plus the window's top stories and alerts"""
+        cursor.execute('''
+            SELECT MAX(competitor_name), SUM(changes), SUM(high_priority), SUM(importance_total) FROM digest_rollups
+            WHERE day >= ? GROUP BY competitor_id HAVING SUM(changes) > 0
+            ORDER BY SUM(changes) DESC, MAX(competitor_name)
+        ''', (window_start,))
+        activity = [{'competitor': name, 'changes': changes, 'high_priority': high_priority,
+                     'avg_importance': round(total / changes, 1)}
+                    for name, changes, high_priority, total in cursor.fetchall()]
+        
+        story_columns = 'competitor_name, news_title, news_excerpt, importance_score, change_type, detected_at'
+        cursor.execute(f'''
+            SELECT {story_columns} FROM changes WHERE detected_at >= ?
+            ORDER BY importance_score DESC, detected_at DESC LIMIT ?
+        ''', (window_start, self.top_stories))
+        stories = [self._story(row) for row in cursor.fetchall()]
+        cursor.execute(f'''
+            SELECT {story_columns} FROM changes WHERE detected_at >= ? AND importance_score >= ?
+            ORDER BY detected_at DESC LIMIT ?
+        ''', (window_start, self.alert_importance, self.top_stories))
+        alerts = [self._story(row) for row in cursor.fetchall()]
+        
+        return {
+            'changes_count': sum(item['changes'] for item in activity),
+            'high_priority': sum(item['high_priority'] for item in activity),
+            'activity': activity,
+            'stories': stories,
+            'alerts': alerts
+        }
+    
+    def _story(self, row):
+        name, title, excerpt, importance, change_type, detected_at = row
+        return {
+            'competitor': name or 'Unknown',
+            'title': title or f"{name} Update",
+            'excerpt': excerpt or '',
+            'importance': importance or 0,
+            'type': (change_type or 'update').replace('_', ' ').title(),
+            'date': (detected_at or '')[:10]
+        }
+    
+    def _sections(self, facts, config):
+        """(name, heading, facts text, local text, narrated by the model) for each digest section"""
+        span = config['span'].lower()
+        stories, alerts, activity = facts['stories'], facts['alerts'], facts['activity']
+        
+        top_text = '\n'.join(f"• **{s['competitor']}**: {s['title']} ({s['importance']}/10)\n  _{s['excerpt'][:100]}_"
+                             for s in stories)
+        alert_text = '\n'.join(f"• **{s['competitor']}** ({s['date']}): {s['title']}" for s in alerts) \
+            or f"• No critical alerts this {span}"
+        activity_lines = [f"• **{item['competitor']}**: {item['changes']} updates, "
+                          f"{item['high_priority']} high priority" for item in activity[:8]]
+        if len(activity) > 8:
+            activity_lines.append(f"• {len(activity) - 8} more competitors with fewer updates")
+        
+        overview = (f"Period: last {config['days']} days\n"
+                    f"Total news items: {facts['changes_count']}\n"
+                    f"High priority updates: {facts['high_priority']}\n"
+                    f"Active competitors: {len(activity)}")
+        market_facts = overview + "\n\nMost active competitors:\n" + '\n'.join(
+            f"- {item['competitor']}: {item['changes']} updates ({item['high_priority']} high priority, "
+            f"average importance {item['avg_importance']}/10)" for item in activity[:8]
+        ) + "\n\nTop headlines:\n" + '\n'.join(
+            f"- {s['competitor']}: {s['title']} ({s['importance']}/10, {s['type']})" for s in stories
+        )
+        insight_facts = "Most important news:\n" + '\n\n'.join(
+            f"📰 {s['competitor']} - {s['date']}\nHeadline: {s['title']}\nSummary: {s['excerpt']}\n"
+            f"Priority: {s['importance']}/10 | Type: {s['type']}" for s in stories
+        ) + "\n\nCritical alerts:\n" + ('\n'.join(f"- {s['competitor']}: {s['title']}" for s in alerts) or '- none')
+        
+        market_text = (f"This {span} we tracked {facts['changes_count']} news items and updates across "
+                       f"{len(activity)} competitors. ")
+        if facts['high_priority'] > 3:
+            market_text += f"We detected {facts['high_priority']} high-priority developments requiring attention."
+        elif facts['high_priority']:
+            market_text += f"We identified {facts['high_priority']} important updates worth monitoring."
+        else:
+            market_text += "Most activity was routine updates and minor changes."
+        if facts['high_priority'] > 2:
+            insight_text = ("• High competitor activity suggests increased market competition\n"
+                            "• Monitor for potential market shifts and new opportunities\n")
+        else:
+            insight_text = ("• Stable competitive environment with routine updates\n"
+                            "• Good opportunity to focus on internal product development\n")
+        insight_text += "• Continue monitoring for emerging trends and strategic moves"
+        
+        return [
+            ('top_stories', 'Top Stories', top_text, top_text, False),
+            ('market_summary', 'Market Intelligence Summary', market_facts, market_text, True),
+            ('alerts', 'Priority Alerts', alert_text, alert_text, False),
+            ('activity', 'Competitor Activity Breakdown', '\n'.join(activity_lines), '\n'.join(activity_lines), False),
+            ('insights', 'Strategic Insights', insight_facts, insight_text, True)
+        ]
+    
+    def _assemble(self, config, content):
+        return (f"## 📰 {config['title']}\n\n"
+                f"### 🔥 Top Stories This {config['span']}\n{content['top_stories']}\n\n"
+                f"### 📊 Market Intelligence Summary\n{content['market_summary']}\n\n"
+                f"### 🚨 Priority Alerts\n{content['alerts']}\n\n"
+                f"### 📈 Competitor Activity Breakdown\n{content['activity']}\n\n"
+                f"### 💡 Strategic Insights\n{content['insights']}")
+    
+    def stats(self):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        digests = {period: {'changes_count': count, 'updated_at': updated_at}
+                   for period, count, updated_at in conn.execute(
+                       'SELECT period, changes_count, updated_at FROM digests').fetchall()}
+        conn.close()
+        return dict(self.counters, digests=digests)
 
 class CompetitorTracker:
     def __init__(self):
@@ -748,188 +2694,1497 @@ class CompetitorTracker:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         self.ai = OllamaAI()
+        self.analysis_queue = AnalysisQueue(self.ai)
+        self.digest = ChangeDigest(self.ai)
         self.pdf_generator = PDFGenerator()
+        self.extractor = get_extractor()
+        self.max_page_bytes = 5 * 1024 * 1024
+        self.allowed_content_types = {'text/html', 'application/xhtml+xml'}
+        self.request_timeout = 15
+        self.max_retries = 2
+        self.backoff_base = 1.0
+        self.backoff_max = 30.0
+        self.breaker = CircuitBreaker(scope='fetch')
+        self.store = SnapshotStore()
+        self.near_duplicates = True
+        self.near_duplicate_distance = 3
+        self.near_duplicate_lookback = 20
+        self._pool_size = None
+        self._mount_adapters(8)
+    
+    def _mount_adapters(self, pool_size):
+        """Size the connection pools to the scan concurrency"""
+        if pool_size == self._pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=max(10, pool_size), pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool_size = pool_size
+    
+    def configure(self, settings):
+        """Apply scraper settings from the settings table"""
+        self.ai.configure(settings)
+        self.analysis_queue.configure(settings)
+        self.digest.configure(settings)
+        resolved = get_extractor(settings.get('html_extractor', 'auto'))
+        if resolved.name != self.extractor.name:
+            print(f"🔧 HTML extraction backend: {resolved.name}")
+            self.extractor = resolved
+        
+        try:
+            self.max_page_bytes = max(1, int(settings.get('max_page_bytes', self.max_page_bytes)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid max_page_bytes setting, keeping {self.max_page_bytes}: {e}")
+        
+        self.near_duplicates = str(settings.get('near_duplicate_detection', 'true')).lower() == 'true'
+        try:
+            self.near_duplicate_distance = max(0, int(settings.get('near_duplicate_max_distance', self.near_duplicate_distance)))
+            self.near_duplicate_lookback = max(1, int(settings.get('near_duplicate_lookback', self.near_duplicate_lookback)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid near-duplicate settings, keeping current values: {e}")
+        
+        content_types = settings.get('allowed_content_types')
+        if content_types:
+            self.allowed_content_types = {t.strip().lower() for t in content_types.split(',') if t.strip()}
+        
+        try:
+            self.request_timeout = max(1.0, float(settings.get('fetch_timeout', self.request_timeout)))
+            self.max_retries = max(0, int(settings.get('fetch_max_retries', self.max_retries)))
+            self.breaker.failure_threshold = max(1, int(settings.get('breaker_failure_threshold', self.breaker.failure_threshold)))
+            self.breaker.reset_timeout = max(1.0, float(settings.get('breaker_reset_timeout', self.breaker.reset_timeout)))
+            self._mount_adapters(max(1, int(settings.get('scan_max_workers', self._pool_size))))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid fetch settings, keeping current values: {e}")
     
     def get_content_hash(self, content):
         """Generate hash for content comparison"""
         return hashlib.md5(content.encode('utf-8')).hexdigest()
     
-    def scrape_website(self, url):
-        """Enhanced website scraping with better content extraction"""
+    def scrape_website(self, url, validators=None):
+        """Enhanced website scraping with better content extraction.
+        
+        When validators from a previous scan are given, the request is made
+        conditional and a 304 returns early with 'not_modified' set.
+        """
+        try:
+            headers = {}
+            fetch_url = url
+            if validators:
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+                fetch_url = validators.get('final_url') or url
+            
+            response = self._fetch(fetch_url, headers)
+            try:
+                if response.status_code == 304:
+                    return {
+                        'url': url,
+                        'not_modified': True,
+                        'scraped_at': datetime.now().isoformat()
+                    }
+                
+                response.raise_for_status()
+                html = self._read_page_body(response)
+            finally:
+                response.close()
+            
+            extracted = self.extractor.extract(html)
+            clean_text = extracted['text']
+            
+            return {
+                'url': url,
+                'title': extracted['title'],
+                'content': clean_text[:5000],  # Increased limit for better analysis
+                'changelog_content': extracted['changelog_content'],
+                'content_hash': self.get_content_hash(clean_text),
+                'blocks': split_into_blocks(clean_text, extracted['headings']),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'final_url': response.url,
+                'scraped_at': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            return {
+                'url': url,
+                'error': str(e),
+                'scraped_at': datetime.now().isoformat()
+            }
+    
+    def _fetch(self, url, headers):
+        """GET with retries on 429/5xx and connection errors, guarded by a per-domain breaker"""
+        domain = urlparse(url).netloc.lower()
+        if not self.breaker.allow(domain):
+            raise Exception(f"Circuit open for {domain}, skipping until the next probe")
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.request_timeout, stream=True)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self.breaker.record_failure(domain, e)
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            except Exception as e:
+                self.breaker.record_failure(domain, e)
+                raise
+            
+            if response.status_code != 429 and response.status_code < 500:
+                self.breaker.record_success(domain)
+                return response
+            
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+            if attempt == self.max_retries or delay > self.backoff_max:
+                self.breaker.record_failure(domain, f"HTTP {response.status_code}")
+                return response
+            response.close()
+            time.sleep(delay)
+    
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def _retry_after(self, response):
+        """Seconds to wait from a Retry-After header, or None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value.strip())
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _read_page_body(self, response, allowed_content_types=None):
+        """Stream an HTML body, aborting early on non-HTML or oversized responses"""
+        allowed_content_types = allowed_content_types or self.allowed_content_types
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in allowed_content_types:
+            raise ValueError(f"Unsupported content type: {content_type}")
+        
+        declared_length = response.headers.get('Content-Length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > self.max_page_bytes:
+            raise ValueError(f"Page too large: {declared_length} bytes (limit {self.max_page_bytes})")
+        
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            received += len(chunk)
+            if received > self.max_page_bytes:
+                raise ValueError(f"Page too large: over {self.max_page_bytes} bytes")
+            chunks.append(chunk)
+        
+        return b''.join(chunks)
+    
+    def analyze_changes_with_ai(self, competitor_id, current_data):
+        """Enhanced change analysis with AI and database storage"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        
+        # Get competitor info
+        cursor.execute('SELECT name, website FROM competitors WHERE id = ?', (competitor_id,))
+        competitor = cursor.fetchone()
+        if not competitor:
+            conn.close()
+            return None
+        
+        competitor_name, website = competitor
+        
+        # Get last content snapshot
+        cursor.execute('''
+            SELECT s.full_content, s.content_hash, s.blocks, cs.codec, cs.body
+            FROM content_snapshots s LEFT JOIN content_store cs ON cs.hash = s.content_hash
+            WHERE s.competitor_id = ? 
+            ORDER BY s.scraped_at DESC LIMIT 1
+        ''', (competitor_id,))
+        
+        last_snapshot = cursor.fetchone()
+        previous_content = ""
+        if last_snapshot:
+            previous_content = last_snapshot[0]
+            if previous_content is None:
+                previous_content = self.store.decode(last_snapshot[3], last_snapshot[4]) or ""
+        
+        # No-change fast path: identical content only bumps the heartbeat
+        if last_snapshot and last_snapshot[1] == current_data.get('content_hash'):
+            cursor.execute('''
+                UPDATE competitors SET last_checked = ?, etag = ?, last_modified = ?, final_url = ?,
+                    unchanged_scans = COALESCE(unchanged_scans, 0) + 1
+                WHERE id = ?
+            ''', (current_data['scraped_at'], current_data.get('etag'), current_data.get('last_modified'),
+                  current_data.get('final_url'), competitor_id))
+            conn.commit()
+            conn.close()
+            return {
+                'competitor_id': competitor_id,
+                'competitor_name': competitor_name,
+                'content_hash': current_data['content_hash'],
+                'checked_at': current_data['scraped_at'],
+                'unchanged': True
+            }
+        
+        # Near-duplicate fast path: a rotating banner or A/B variant we have
+        # already seen reuses that snapshot's analysis instead of adding a change.
+        # No snapshot is stored either, so a flapping page doesn't add a row per
+        # scan; the previous snapshot stays the baseline for the next diff.
+        fingerprint = simhash(current_data.get('content'))
+        if self.near_duplicates and last_snapshot and previous_content and current_data.get('content'):
+            duplicate = self._find_near_duplicate(cursor, competitor_id, current_data, fingerprint, last_snapshot[1])
+            if duplicate:
+                cursor.execute('''
+                    UPDATE competitors SET last_checked = ?, etag = ?, last_modified = ?, final_url = ?,
+                        unchanged_scans = COALESCE(unchanged_scans, 0) + 1
+                    WHERE id = ?
+                ''', (current_data['scraped_at'], current_data.get('etag'), current_data.get('last_modified'),
+                      current_data.get('final_url'), competitor_id))
+                conn.commit()
+                conn.close()
+                print(f"♻️ {competitor_name}: near-duplicate of an earlier snapshot "
+                      f"({duplicate['distance']} bits apart), reusing its analysis")
+                return {
+                    'competitor_id': competitor_id,
+                    'competitor_name': competitor_name,
+                    'content_hash': current_data['content_hash'],
+                    'checked_at': current_data['scraped_at'],
+                    'unchanged': True,
+                    'near_duplicate': duplicate
+                }
+        
+        # Section-level delta so the prompt only carries what actually changed
+        block_changes = None
+        if last_snapshot and last_snapshot[2] and current_data.get('blocks') is not None:
+            block_changes = diff_blocks(json.loads(last_snapshot[2]), current_data['blocks'])
+        
+        # Real changes get a heuristic analysis now and the LLM's answer later
+        # from the analysis queue, so scans never wait on the model. Changes
+        # the local classifier rates as trivial keep the heuristic result.
+        analysis_task = None
+        analysis_status = 'done'
+        if previous_content and current_data.get('content'):
+            ai_result = self.ai.classifier.classify(previous_content, current_data['content'],
+                                                    competitor_name, website, block_changes)
+            if ai_result.pop('escalate'):
+                analysis_task = {'kind': 'change', 'item': self.ai.build_change_item(
+                    previous_content, current_data['content'], competitor_name, website, block_changes
+                )}
+                analysis_status = 'pending'
+            else:
+                analysis_status = 'heuristic'
+        elif current_data.get('content'):
+            ai_result = self.ai.analyze_content_changes(previous_content, current_data['content'],
+                                                        competitor_name, website)
+        else:
+            ai_result = {
+                'analysis': "Failed to scrape content",
+                'change_type': "error",
+                'importance_score': 1,
+                'news_title': f"Scan Error for {competitor_name}",
+                'news_excerpt': "Unable to retrieve website content",
+                'source_links': website
+            }
+        
+        self._save_snapshot(cursor, competitor_id, current_data, fingerprint)
+        
+        # Save enhanced change record
+        change_record = {
+            'competitor_id': competitor_id,
+            'competitor_name': competitor_name,
+            'content': current_data['content'],
+            'content_hash': current_data['content_hash'],
+            'changelog_content': current_data.get('changelog_content', ''),
+            'analysis': ai_result['analysis'],
+            'change_type': ai_result['change_type'],
+            'importance_score': ai_result['importance_score'],
+            'news_title': ai_result['news_title'],
+            'news_excerpt': ai_result['news_excerpt'],
+            'source_links': ai_result['source_links'],
+            'detected_at': current_data['scraped_at'],
+            'url': website,
+            'analysis_status': analysis_status
+        }
+        
+        cursor.execute('''
+            INSERT INTO changes (
+                competitor_id, competitor_name, content, content_hash, 
+                changelog_content, analysis, detected_at, url, change_type,
+                importance_score, news_title, news_excerpt, source_links,
+                analysis_status, analysis_input, analysis_owner, analysis_claimed_at
+            ) VALUES (?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            change_record['competitor_id'], change_record['competitor_name'],
+            change_record['content_hash'],
+            change_record['changelog_content'], change_record['analysis'],
+            change_record['detected_at'], change_record['url'],
+            change_record['change_type'], change_record['importance_score'],
+            change_record['news_title'], change_record['news_excerpt'],
+            change_record['source_links'], change_record['analysis_status'],
+            json.dumps(analysis_task) if analysis_task else None,
+            self.analysis_queue.owner if analysis_task else None,
+            datetime.now().isoformat() if analysis_task else None
+        ))
+        change_record['id'] = cursor.lastrowid
+        record_digest_rollup(cursor, competitor_id, competitor_name, change_record['detected_at'],
+                             change_record['importance_score'])
+        
+        # Update competitor last_checked and validators for the next conditional fetch
+        cursor.execute('''
+            UPDATE competitors SET last_checked = ?, etag = ?, last_modified = ?, final_url = ?,
+                unchanged_scans = 0
+            WHERE id = ?
+        ''', (current_data['scraped_at'], current_data.get('etag'), current_data.get('last_modified'),
+              current_data.get('final_url'), competitor_id))
+        
+        conn.commit()
+        conn.close()
+        
+        if analysis_task and not self.analysis_queue.submit(change_record['id'], analysis_task,
+                                                            change_record['importance_score']):
+            change_record['analysis_status'] = 'heuristic'
+        return change_record
+    
+    def _save_snapshot(self, cursor, competitor_id, current_data, fingerprint):
+        """Save the current snapshot; the body itself lives in the content store"""
+        self.store.put(cursor, current_data['content_hash'], current_data['content'])
+        cursor.execute('''
+            INSERT INTO content_snapshots (competitor_id, content_hash, full_content, scraped_at, blocks, simhash)
+            VALUES (?, ?, NULL, ?, ?, ?)
+        ''', (competitor_id, current_data['content_hash'], current_data['scraped_at'],
+              json.dumps(current_data['blocks']) if current_data.get('blocks') is not None else None,
+              fingerprint))
+    
+    def _find_near_duplicate(self, cursor, competitor_id, current_data, fingerprint, previous_hash):
+        """Earlier snapshot the new content nearly duplicates, with the change that analyzed it.
+        
+        The previous snapshot is skipped: it is the baseline this change is
+        diffed against. A candidate only counts when the classifier rates
+        the difference from it as trivial, so a real edit (e.g. a new price)
+        on top of a familiar variant is still reported.
+        """
+        cursor.execute('''
+            SELECT content_hash, simhash FROM content_snapshots
+            WHERE competitor_id = ? AND simhash IS NOT NULL
+            ORDER BY scraped_at DESC LIMIT ?
+        ''', (competitor_id, self.near_duplicate_lookback))
+        candidates = {}
+        for content_hash, candidate in cursor.fetchall():
+            if content_hash != previous_hash and content_hash not in candidates:
+                distance = simhash_distance(fingerprint, candidate)
+                if distance <= self.near_duplicate_distance:
+                    candidates[content_hash] = distance
+        
+        for content_hash, distance in sorted(candidates.items(), key=lambda c: c[1]):
+            earlier = self.store.get_many(cursor, [content_hash]).get(content_hash)
+            if earlier is None or self.ai.classifier.score(earlier, current_data['content'])['score'] >= self.ai.classifier.threshold:
+                continue
+            cursor.execute('''
+                SELECT id, analysis, change_type, importance_score, news_title FROM changes
+                WHERE competitor_id = ? AND content_hash = ?
+                ORDER BY detected_at DESC LIMIT 1
+            ''', (competitor_id, content_hash))
+            change = cursor.fetchone()
+            return {
+                'content_hash': content_hash,
+                'distance': distance,
+                'change_id': change[0] if change else None,
+                'analysis': change[1] if change else None,
+                'change_type': change[2] if change else None,
+                'importance_score': change[3] if change else None,
+                'news_title': change[4] if change else None
+            }
+        return None
+    
+    def record_feed_entries(self, competitor_id, entries, checked_at):
+        """Store one change record per new feed entry"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, website FROM competitors WHERE id = ?', (competitor_id,))
+        competitor = cursor.fetchone()
+        conn.close()
+        if not competitor:
+            return []
+        
+        competitor_name, website = competitor
+        
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        change_records = []
+        analysis_tasks = []
+        for entry in entries:
+            # Heuristic analysis now, the LLM's answer later from the analysis queue
+            ai_result = self.ai._fallback_feed_entry_analysis(entry, competitor_name, entry['link'] or website)
+            analysis_task = {'kind': 'feed', 'entry': entry, 'competitor_name': competitor_name, 'website': website}
+            change_record = {
+                'competitor_id': competitor_id,
+                'competitor_name': competitor_name,
+                'content': entry['summary'][:5000],
+                'content_hash': self.get_content_hash(entry['guid']),
+                'changelog_content': entry['summary'][:2000],
+                'analysis': ai_result['analysis'],
+                'change_type': ai_result['change_type'],
+                'importance_score': ai_result['importance_score'],
+                'news_title': ai_result['news_title'],
+                'news_excerpt': ai_result['news_excerpt'],
+                'source_links': ai_result['source_links'],
+                'detected_at': checked_at,
+                'url': entry['link'] or website,
+                'analysis_status': 'pending'
+            }
+            self.store.put(cursor, change_record['content_hash'], change_record['content'])
+            cursor.execute('''
+                INSERT INTO changes (
+                    competitor_id, competitor_name, content, content_hash, 
+                    changelog_content, analysis, detected_at, url, change_type,
+                    importance_score, news_title, news_excerpt, source_links,
+                    analysis_status, analysis_input, analysis_owner, analysis_claimed_at
+                ) VALUES (?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                change_record['competitor_id'], change_record['competitor_name'],
+                change_record['content_hash'],
+                change_record['changelog_content'], change_record['analysis'],
+                change_record['detected_at'], change_record['url'],
+                change_record['change_type'], change_record['importance_score'],
+                change_record['news_title'], change_record['news_excerpt'],
+                change_record['source_links'], change_record['analysis_status'],
+                json.dumps(analysis_task), self.analysis_queue.owner, checked_at
+            ))
+            change_record['id'] = cursor.lastrowid
+            record_digest_rollup(cursor, competitor_id, competitor_name, checked_at, change_record['importance_score'])
+            change_records.append(change_record)
+            analysis_tasks.append((change_record, analysis_task))
+        
+        cursor.execute('''
+            UPDATE competitors SET last_checked = ? WHERE id = ?
+        ''', (checked_at, competitor_id))
+        conn.commit()
+        conn.close()
+        
+        for change_record, analysis_task in analysis_tasks:
+            if not self.analysis_queue.submit(change_record['id'], analysis_task, change_record['importance_score']):
+                change_record['analysis_status'] = 'heuristic'
+        return change_records
+    
+    def record_not_modified(self, competitor_id, current_data):
+        """Mark a competitor as checked after a 304 response, bumping the heartbeat counter"""
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE competitors SET last_checked = ?, unchanged_scans = COALESCE(unchanged_scans, 0) + 1
+            WHERE id = ?
+        ''', (current_data['scraped_at'], competitor_id))
+        conn.commit()
+        conn.close()
+
+# Feed-first polling
+FEED_CONTENT_TYPES = {
+    'application/rss+xml', 'application/atom+xml', 'application/rdf+xml',
+    'application/xml', 'text/xml'
+}
+FEED_CANDIDATE_PATHS = ['feed', 'rss.xml', 'atom.xml', 'feed.xml', 'index.xml']
+FEED_REDISCOVERY_DAYS = 7
+FEED_SEEN_LIMIT = 500
+FEED_ENTRY_LIMIT = 10
+SITEMAP_PAGE_LIMIT = 5
+FEED_PAGE_SCAN_HOURS = 24
+
+def _xml_name(element):
+    """Tag name without its XML namespace"""
+    return element.tag.rsplit('}', 1)[-1] if isinstance(element.tag, str) else ''
+
+def _xml_child_text(element, name):
+    for child in element:
+        if _xml_name(child) == name:
+            return (child.text or '').strip()
+    return ''
+
+def _parse_feed_date(value):
+    """Parse RSS (RFC 822) or Atom/sitemap (ISO 8601) dates into aware datetimes"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def parse_feed(body):
+    """Parse an RSS, RDF or Atom document, or a sitemap, into (feed_type, entries)"""
+    root = ElementTree.fromstring(body)
+    root_name = _xml_name(root)
+    entries = []
+    
+    if root_name in ('urlset', 'sitemapindex'):
+        for node in root:
+            if _xml_name(node) in ('url', 'sitemap'):
+                entries.append({
+                    'link': _xml_child_text(node, 'loc'),
+                    'lastmod': _xml_child_text(node, 'lastmod'),
+                    'is_sitemap': _xml_name(node) == 'sitemap'
+                })
+        return 'sitemap', entries
+    
+    if root_name == 'feed':
+        for node in root:
+            if _xml_name(node) != 'entry':
+                continue
+            link = ''
+            for child in node:
+                if _xml_name(child) == 'link' and child.get('rel', 'alternate') == 'alternate':
+                    link = child.get('href', '')
+                    break
+            entries.append({
+                'guid': _xml_child_text(node, 'id') or link,
+                'title': _xml_child_text(node, 'title'),
+                'link': link,
+                'published': _xml_child_text(node, 'updated') or _xml_child_text(node, 'published'),
+                'summary': _xml_child_text(node, 'summary') or _xml_child_text(node, 'content')
+            })
+        return 'atom', entries
+    
+    if root_name in ('rss', 'RDF'):
+        for node in root.iter():
+            if _xml_name(node) != 'item':
+                continue
+            link = _xml_child_text(node, 'link')
+            entries.append({
+                'guid': _xml_child_text(node, 'guid') or link or _xml_child_text(node, 'title'),
+                'title': _xml_child_text(node, 'title'),
+                'link': link,
+                'published': _xml_child_text(node, 'pubDate') or _xml_child_text(node, 'date'),
+                'summary': _xml_child_text(node, 'description')
+            })
+        return 'rss', entries
+    
+    raise ValueError(f"Not a feed or sitemap: <{root_name}>")
+
+class FeedMonitor:
+    """Discovers RSS/Atom feeds or sitemaps per competitor and polls them before full-page scrapes.
+    
+    Every fetch goes through `pace(url)` first, so discovery and sitemap
+    polls keep to the same per-domain request interval as page scans.
+    Competitors with a feed still get a full-page scan every
+    page_scan_hours, since pricing or homepage changes never show up in
+    a feed.
+    """
+    
+    def __init__(self, tracker, pace=None, page_scan_hours=FEED_PAGE_SCAN_HOURS):
+        self.tracker = tracker
+        self.pace = pace or (lambda url: None)
+        self.page_scan_hours = page_scan_hours
+    
+    def configure(self, settings):
+        try:
+            self.page_scan_hours = max(0.0, float(settings.get('feed_page_scan_hours', self.page_scan_hours)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid feed_page_scan_hours setting, keeping {self.page_scan_hours}: {e}")
+    
+    def poll(self, competitor):
+        """Return entries that are new since the last poll, or None when there is no usable feed"""
+        state = json.loads(competitor.get('feed_state') or '{}')
+        feed_url, feed_type = competitor.get('feed_url'), competitor.get('feed_type')
+        
+        if not feed_type or (feed_type == 'none' and self._rediscovery_due(state)):
+            feed_url, feed_type = self.discover(competitor)
+            state = {'discovered_at': datetime.now().isoformat(), 'page_scanned_at': state.get('page_scanned_at')}
+            self._save_state(competitor['id'], feed_url, feed_type, state)
+            if feed_url:
+                print(f"📡 Using {feed_type} feed for {competitor['name']}: {feed_url}")
+        
+        if not feed_url or feed_type == 'none':
+            return None
+        if feed_type == 'sitemap' and not self._sitemap_scope(competitor):
+            # Without a changelog path, a lastmod bump anywhere on the site would count as news
+            return None
+        
+        try:
+            _, entries = parse_feed(self._fetch_xml(feed_url))
+            if feed_type == 'sitemap':
+                new_entries = self._new_sitemap_entries(competitor, entries, state)
+            else:
+                new_entries = self._new_feed_entries(entries, state)
+        except Exception as e:
+            print(f"⚠️ Feed poll failed for {competitor['name']}, falling back to page scan: {e}")
+            return None
+        
+        self._save_state(competitor['id'], feed_url, feed_type, state)
+        return new_entries
+    
+    def discover(self, competitor):
+        """Find a feed via <link rel=alternate>, common feed paths, then sitemap.xml.
+        
+        The sitemap is only considered when a changelog_url gives it a path scope.
+        """
+        page_url = competitor.get('changelog_url') or competitor['website']
+        candidates = []
+        
+        try:
+            self.pace(page_url)
+            response = self.tracker._fetch(page_url, {})
+            try:
+                response.raise_for_status()
+                soup = BeautifulSoup(self.tracker._read_page_body(response), 'html.parser')
+            finally:
+                response.close()
+            for link in soup.find_all('link', href=True):
+                rel = ' '.join(link.get('rel', [])).lower()
+                if 'alternate' in rel and link.get('type', '').lower() in FEED_CONTENT_TYPES:
+                    candidates.append(urljoin(page_url, link['href']))
+        except Exception as e:
+            print(f"⚠️ Feed discovery could not read {page_url}: {e}")
+        
+        bases = [page_url if page_url.endswith('/') else page_url + '/', urljoin(competitor['website'], '/')]
+        for base in dict.fromkeys(bases):
+            candidates.extend(urljoin(base, path) for path in FEED_CANDIDATE_PATHS)
+        if self._sitemap_scope(competitor):
+            candidates.append(urljoin(competitor['website'], '/sitemap.xml'))
+        
+        for candidate in dict.fromkeys(candidates):
+            try:
+                feed_type, entries = parse_feed(self._fetch_xml(candidate))
+            except Exception:
+                continue
+            # A sitemap without lastmod dates cannot tell us what changed
+            if feed_type == 'sitemap' and not any(entry['lastmod'] for entry in entries):
+                continue
+            return candidate, feed_type
+        
+        return None, 'none'
+    
+    def _sitemap_scope(self, competitor):
+        """Path prefix sitemap URLs must fall under; empty when the competitor has none"""
+        return urlparse(competitor.get('changelog_url') or '').path.rstrip('/')
+    
+    def page_scan_due(self, competitor):
+        """Whether a competitor polled through its feed is due a full-page scan as well"""
+        if not self.page_scan_hours:
+            return False
+        scanned_at = json.loads(competitor.get('feed_state') or '{}').get('page_scanned_at')
+        if not scanned_at:
+            return True
+        return datetime.now() - datetime.fromisoformat(scanned_at) > timedelta(hours=self.page_scan_hours)
+    
+    def mark_page_scanned(self, competitor_id):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT feed_state FROM competitors WHERE id = ?', (competitor_id,))
+        row = cursor.fetchone()
+        state = json.loads(row[0] or '{}') if row else {}
+        state['page_scanned_at'] = datetime.now().isoformat()
+        cursor.execute('UPDATE competitors SET feed_state = ? WHERE id = ?', (json.dumps(state), competitor_id))
+        conn.commit()
+        conn.close()
+    
+    def _fetch_xml(self, url):
+        self.pace(url)
+        response = self.tracker._fetch(url, {})
+        try:
+            response.raise_for_status()
+            return self.tracker._read_page_body(response, FEED_CONTENT_TYPES | {'text/plain'})
+        finally:
+            response.close()
+    
+    def _rediscovery_due(self, state):
+        discovered_at = state.get('discovered_at')
+        if not discovered_at:
+            return True
+        return datetime.now() - datetime.fromisoformat(discovered_at) > timedelta(days=FEED_REDISCOVERY_DAYS)
+    
+    def _new_feed_entries(self, entries, state):
+        """Entries whose GUID has not been seen; the first poll only records a baseline"""
+        first_poll = 'seen' not in state
+        seen = state.get('seen', [])
+        seen_set = set(seen)
+        new_entries = [entry for entry in entries if entry['guid'] and entry['guid'] not in seen_set]
+        
+        state['seen'] = ([entry['guid'] for entry in new_entries] + seen)[:FEED_SEEN_LIMIT]
+        for entry in new_entries:
+            entry['summary'] = clean_page_text(re.sub(r'<[^>]+>', ' ', entry['summary']))
+        return [] if first_poll else new_entries[:FEED_ENTRY_LIMIT]
+    
+    def _new_sitemap_entries(self, competitor, entries, state, depth=0):
+        """Sitemap URLs under the changelog path with a lastmod newer than the last poll"""
+        first_poll = 'lastmod' not in state
+        last_seen = _parse_feed_date(state.get('lastmod'))
+        scope = self._sitemap_scope(competitor)
+        
+        fresh = []
+        newest = last_seen
+        for entry in entries:
+            lastmod = _parse_feed_date(entry['lastmod'])
+            if lastmod is None or (last_seen and lastmod <= last_seen):
+                continue
+            if entry['is_sitemap']:
+                if depth == 0:
+                    try:
+                        _, child_entries = parse_feed(self._fetch_xml(entry['link']))
+                        child_state = dict(state)
+                        fresh.extend(self._new_sitemap_entries(competitor, child_entries, child_state, depth + 1))
+                        newest = max(filter(None, [newest, _parse_feed_date(child_state.get('lastmod'))]), default=None)
+                    except Exception as e:
+                        print(f"⚠️ Could not read child sitemap {entry['link']}: {e}")
+                continue
+            if not urlparse(entry['link']).path.startswith(scope):
+                continue
+            fresh.append((lastmod, entry))
+            newest = max(filter(None, [newest, lastmod]))
+        
+        if newest:
+            state['lastmod'] = newest.isoformat()
+        elif first_poll:
+            state['lastmod'] = datetime.now(timezone.utc).isoformat()
+        if depth:
+            return fresh
+        if first_poll:
+            return []
+        
+        # Fetch only the newest changed pages
+        fresh.sort(key=lambda item: item[0], reverse=True)
+        new_entries = []
+        for lastmod, entry in fresh[:SITEMAP_PAGE_LIMIT]:
+            self.pace(entry['link'])
+            page = self.tracker.scrape_website(entry['link'])
+            if page.get('error'):
+                print(f"⚠️ Could not fetch sitemap page {entry['link']}: {page['error']}")
+                continue
+            new_entries.append({
+                'guid': f"{entry['link']}#{entry['lastmod']}",
+                'title': page.get('title') or entry['link'],
+                'link': entry['link'],
+                'published': entry['lastmod'],
+                'summary': page.get('changelog_content') or page.get('content', '')
+            })
+        return new_entries
+    
+    def _save_state(self, competitor_id, feed_url, feed_type, state):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE competitors SET feed_url = ?, feed_type = ?, feed_state = ? WHERE id = ?
+        ''', (feed_url, feed_type, json.dumps(state), competitor_id))
+        conn.commit()
+        conn.close()
+
+class ScanEngine:
+    """Bounded-concurrency scan runner with per-domain politeness"""
+
+    def __init__(self, tracker, max_workers=8, per_domain_limit=1, domain_interval=2.0):
+        self.tracker = tracker
+        self.feed_monitor = FeedMonitor(tracker, pace=self.pace)
+        self.max_workers = max_workers
+        self.per_domain_limit = per_domain_limit
+        self.domain_interval = domain_interval
+        self._lock = threading.Lock()
+        self._cycle_lock = threading.Lock()
+        self._domain_slots = {}
+        self._domain_next_start = {}
+
+    def configure(self, settings):
+        """Refresh concurrency limits from the settings table"""
+        try:
+            max_workers = max(1, int(settings.get('scan_max_workers', self.max_workers)))
+            per_domain_limit = max(1, int(settings.get('scan_per_domain_limit', self.per_domain_limit)))
+            domain_interval = max(0.0, float(settings.get('scan_domain_interval', self.domain_interval)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid scan concurrency settings, keeping current limits: {e}")
+            return
+
+        self.tracker.configure(settings)
+        self.feed_monitor.configure(settings)
+
+        with self._lock:
+            if per_domain_limit != self.per_domain_limit:
+                self._domain_slots = {}
+            self.max_workers = max_workers
+            self.per_domain_limit = per_domain_limit
+            self.domain_interval = domain_interval
+
+    def _get_domain(self, url):
+        """Politeness key for a URL"""
+        return urlparse(url).netloc.lower()
+
+    def _acquire_domain(self, domain):
+        """Wait for a free slot on the domain"""
+        with self._lock:
+            slot = self._domain_slots.get(domain)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_domain_limit)
+                self._domain_slots[domain] = slot
+        slot.acquire()
+        return slot
+
+    def pace(self, url):
+        """Wait until the URL's domain may take another request under its minimum interval"""
+        domain = self._get_domain(url)
+        # Reserve the next start time so parallel slots on one host stay spaced out
+        with self._lock:
+            start_at = max(time.monotonic(), self._domain_next_start.get(domain, 0))
+            self._domain_next_start[domain] = start_at + self.domain_interval
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def scan_competitor(self, competitor):
+        """Poll the competitor's feed, and scrape and analyze its website when it has none or is due a full scan"""
+        slot = self._acquire_domain(self._get_domain(competitor['website']))
+        current_data = None
+        try:
+            feed_entries = self.feed_monitor.poll(competitor)
+            if feed_entries is None or self.feed_monitor.page_scan_due(competitor):
+                self.pace(competitor['website'])
+                current_data = self.tracker.scrape_website(competitor['website'], validators=competitor)
+                if feed_entries is not None:
+                    self.feed_monitor.mark_page_scanned(competitor['id'])
+        finally:
+            slot.release()
+
+        if feed_entries is not None:
+            checked_at = datetime.now().isoformat()
+            change_records = []
+            if feed_entries:
+                change_records = self.tracker.record_feed_entries(competitor['id'], feed_entries, checked_at)
+            if current_data is not None:
+                page_result = self._record_page(competitor, current_data)
+                if page_result.get('error'):
+                    print(f"⚠️ Full-page scan of {competitor['name']} failed: {page_result['error']}")
+                elif page_result['change']:
+                    change_records.append(page_result['change'])
+            if not change_records:
+                if current_data is None:
+                    self.tracker.record_not_modified(competitor['id'], {'scraped_at': checked_at})
+                return {'success': True, 'competitor': competitor['name'], 'change': None, 'unchanged': True}
+            top_change = max(change_records, key=lambda c: c['importance_score'], default=None)
+            return {'success': True, 'competitor': competitor['name'], 'change': top_change, 'changes': change_records}
+
+        return self._record_page(competitor, current_data)
+
+    def _record_page(self, competitor, current_data):
+        """Store and analyze a scraped page, returning the scan result"""
+        if current_data.get('error'):
+            return {'error': current_data['error'], 'competitor': competitor['name']}
+
+        if current_data.get('not_modified'):
+            self.tracker.record_not_modified(competitor['id'], current_data)
+            return {'success': True, 'competitor': competitor['name'], 'change': None, 'not_modified': True}
+
+        # Analysis runs outside the domain slot so the next fetch can start
+        change_record = self.tracker.analyze_changes_with_ai(competitor['id'], current_data)
+        if change_record and change_record.get('unchanged'):
+            return {'success': True, 'competitor': competitor['name'], 'change': None, 'unchanged': True}
+        return {'success': True, 'competitor': competitor['name'], 'change': change_record}
+
+    def _safe_scan(self, competitor):
+        try:
+            return self.scan_competitor(competitor)
+        except Exception as e:
+            print(f"Error scanning {competitor['name']}: {e}")
+            return {'error': str(e), 'competitor': competitor['name']}
+
+    def scan_all(self, competitors, wait=True):
+        """Scan competitors concurrently, returning results in input order.
+
+        Returns None without scanning when wait is False and another cycle
+        is still running.
+        """
+        if not self._cycle_lock.acquire(blocking=wait):
+            return None
+
+        try:
+            self.configure(get_settings())
+            results = [None] * len(competitors)
+            if not competitors:
+                return results
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(competitors))) as executor:
+                futures = {executor.submit(self._safe_scan, competitor): index
+                           for index, competitor in enumerate(competitors)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            return results
+        finally:
+            self._cycle_lock.release()
+
+class ScanJobQueue:
+    """SQLite-backed queue of scan jobs shared by the web app and worker processes"""
+    
+    def __init__(self, job_timeout=900, max_attempts=3):
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+    
+    def configure(self, settings):
+        """Refresh job timeout and retry limits from the settings table"""
+        try:
+            self.job_timeout = max(1, int(settings.get('scan_job_timeout', self.job_timeout)))
+            self.max_attempts = max(1, int(settings.get('scan_job_max_attempts', self.max_attempts)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid scan job settings, keeping current limits: {e}")
+    
+    def _connect(self):
+        # Autocommit mode so claims can take the write lock up front with BEGIN IMMEDIATE
+        return sqlite3.connect('competitor_tracker.db', timeout=30, isolation_level=None)
+    
+    def enqueue(self, competitor_id, source='manual'):
+        """Queue a scan, reusing any job already pending for the competitor"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id FROM scan_jobs
+                WHERE competitor_id = ? AND status IN ('queued', 'running')
+                ORDER BY id LIMIT 1
+            ''', (competitor_id,))
+            existing = cursor.fetchone()
+            if existing:
+                job_id = existing[0]
+            else:
+                cursor.execute('''
+                    INSERT INTO scan_jobs (competitor_id, status, source, created_at)
+                    VALUES (?, 'queued', ?, ?)
+                ''', (competitor_id, source, datetime.now().isoformat()))
+                job_id = cursor.lastrowid
+            cursor.execute('COMMIT')
+            return job_id
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    
+    def claim(self, worker_id):
+        """Atomically take the oldest queued job, or return None when the queue is empty"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute("SELECT id FROM scan_jobs WHERE status = 'queued' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('COMMIT')
+                return None
+            cursor.execute('''
+                UPDATE scan_jobs
+                SET status = 'running', worker_id = ?, started_at = ?, attempts = attempts + 1
+                WHERE id = ?
+            ''', (worker_id, datetime.now().isoformat(), row[0]))
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return self.get(row[0])
+    
+    def complete(self, job_id, result):
+        self._finish(job_id, 'done', result=json.dumps(result, default=str))
+    
+    def fail(self, job_id, error):
+        self._finish(job_id, 'failed', error=str(error))
+    
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE scan_jobs SET status = ?, result = ?, error = ?, finished_at = ?
+            WHERE id = ?
+        ''', (status, result, error, datetime.now().isoformat(), job_id))
+        conn.close()
+    
+    def requeue_stale(self):
+        """Return jobs from crashed workers to the queue, failing those out of attempts"""
+        cutoff = (datetime.now() - timedelta(seconds=self.job_timeout)).isoformat()
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                UPDATE scan_jobs SET status = 'failed', error = 'Worker timed out', finished_at = ?
+                WHERE status = 'running' AND started_at < ? AND attempts >= ?
+            ''', (datetime.now().isoformat(), cutoff, self.max_attempts))
+            cursor.execute('''
+                UPDATE scan_jobs SET status = 'queued', worker_id = NULL, started_at = NULL
+                WHERE status = 'running' AND started_at < ?
+            ''', (cutoff,))
+            requeued = cursor.rowcount
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        if requeued:
+            print(f"♻️ Requeued {requeued} stale scan jobs")
+        return requeued
+    
+    def get(self, job_id):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, competitor_id, status, source, attempts, worker_id, result, error,
+                   created_at, started_at, finished_at
+            FROM scan_jobs WHERE id = ?
+        ''', (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'competitor_id': row[1],
+            'status': row[2],
+            'source': row[3],
+            'attempts': row[4],
+            'worker_id': row[5],
+            'result': json.loads(row[6]) if row[6] else None,
+            'error': row[7],
+            'created_at': row[8],
+            'started_at': row[9],
+            'finished_at': row[10]
+        }
+
+    def create_batch(self, competitor_ids, source='manual'):
+        """Queue scans for several competitors under one id the UI can track"""
+        job_ids = [self.enqueue(competitor_id, source=source) for competitor_id in competitor_ids]
+        batch_id = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute('INSERT INTO scan_batches (id, job_ids, created_at) VALUES (?, ?, ?)',
+                     (batch_id, json.dumps(job_ids), datetime.now().isoformat()))
+        conn.close()
+        return batch_id
+    
+    def get_batch(self, batch_id):
+        """Batch progress with per-competitor job states, or None if unknown"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT job_ids, created_at FROM scan_batches WHERE id = ?', (batch_id,))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return None
+        job_ids = json.loads(row[0])
+        jobs = {}
+        if job_ids:
+            placeholders = ','.join('?' * len(job_ids))
+            cursor.execute(f'''
+                SELECT j.id, j.competitor_id, c.name, j.status, j.result, j.error, j.started_at, j.finished_at
+                FROM scan_jobs j LEFT JOIN competitors c ON c.id = j.competitor_id
+                WHERE j.id IN ({placeholders})
+            ''', job_ids)
+            for job in cursor.fetchall():
+                jobs[job[0]] = {
+                    'id': job[0],
+                    'competitor_id': job[1],
+                    'competitor': job[2],
+                    'status': job[3],
+                    'result': json.loads(job[4]) if job[4] else None,
+                    'error': job[5],
+                    'started_at': job[6],
+                    'finished_at': job[7]
+                }
+        conn.close()
+        
+        ordered = [jobs[job_id] for job_id in job_ids if job_id in jobs]
+        finished = sum(1 for job in ordered if job['status'] in ('done', 'failed'))
+        if finished == len(ordered):
+            status = 'done'
+        elif finished or any(job['status'] == 'running' for job in ordered):
+            status = 'running'
+        else:
+            status = 'queued'
+        return {
+            'id': batch_id,
+            'status': status,
+            'total': len(ordered),
+            'finished': finished,
+            'failed': sum(1 for job in ordered if job['status'] == 'failed'),
+            'created_at': row[1],
+            'jobs': ordered
+        }
+
+class LocalScanRunner:
+    """Drains the scan job queue on background threads when no worker processes are running"""
+    
+    def __init__(self, scan_engine, job_queue):
+        self.scan_engine = scan_engine
+        self.job_queue = job_queue
+        self.worker_id = f'web-{os.getpid()}'
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+    
+    def kick(self):
+        """Make sure queued jobs get picked up"""
+        with self._lock:
+            self._pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._drain()
+            with self._lock:
+                # Only give up the thread once the pool has shut down, so a kick
+                # can never start a second pool while this one still runs jobs
+                if not self._pending:
+                    self._thread = None
+                    return
+    
+    def _drain(self):
+        """Run queued jobs until a claim comes back empty with no kick in between"""
+        settings = get_settings()
+        self.scan_engine.configure(settings)
+        self.job_queue.configure(settings)
+        self.job_queue.requeue_stale()
+        slots = threading.BoundedSemaphore(self.scan_engine.max_workers)
+        with ThreadPoolExecutor(max_workers=self.scan_engine.max_workers) as executor:
+            while True:
+                with self._lock:
+                    self._pending = False
+                while True:
+                    slots.acquire()
+                    job = self.job_queue.claim(self.worker_id)
+                    if job is None:
+                        slots.release()
+                        break
+                    executor.submit(self._run_job, job, slots)
+                with self._lock:
+                    # A kick that raced with the empty claim means new work arrived
+                    if not self._pending:
+                        return
+    
+    def _run_job(self, job, slots):
+        try:
+            run_scan_job(job)
+        finally:
+            slots.release()
+
+class AdaptiveScheduler:
+    """Per-competitor scan times driven by a priority queue and observed change rate"""
+    
+    def __init__(self, scan_engine, job_queue, min_interval=5 * 60, max_interval=24 * 60 * 60,
+                 history_days=30, jitter=0.1):
+        self.scan_engine = scan_engine
+        self.job_queue = job_queue
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.history_days = history_days
+        self.jitter = jitter
+        self._queue = []
+        self._next_scan = {}
+    
+    def configure(self, settings):
+        """Refresh interval bounds from the settings table"""
         try:
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                element.decompose()
-            
-            # Extract main content
-            main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main'))
-            if main_content:
-                text = main_content.get_text()
-            else:
-                text = soup.get_text()
-            
-            # Clean text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            clean_text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Look for changelog/release notes
-            changelog_content = self._extract_changelog_content(soup, clean_text)
-            
-            return {
-                'url': url,
-                'title': soup.title.string if soup.title else 'No title',
-                'content': clean_text[:5000],  # Increased limit for better analysis
-                'changelog_content': changelog_content,
-                'content_hash': self.get_content_hash(clean_text),
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            return {
-                'url': url,
-                'error': str(e),
-                'scraped_at': datetime.now().isoformat()
-            }
+            min_interval = max(1.0, float(settings.get('scan_min_interval_minutes', self.min_interval / 60))) * 60
+            max_interval = max(1.0, float(settings.get('scan_max_interval_minutes', self.max_interval / 60))) * 60
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid scan interval settings, keeping current bounds: {e}")
+            return
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max(min_interval, max_interval)
     
-    def _extract_changelog_content(self, soup, text):
-        """Enhanced changelog extraction"""
-        changelog_indicators = [
-            'changelog', 'release notes', 'what\'s new', 'updates', 
-            'version', 'releases', 'news', 'announcements', 'blog'
-        ]
-        
-        # Look for dedicated changelog sections
-        for indicator in changelog_indicators:
-            changelog_section = soup.find(['div', 'section'],
-                                        class_=re.compile(indicator, re.I))
-            if changelog_section:
-                return changelog_section.get_text()[:2000]
-        
-        # Fallback to text search
-        changelog_content = ""
-        for indicator in changelog_indicators:
-            if indicator.lower() in text.lower():
-                pattern = rf'.{{0,400}}{re.escape(indicator)}.{{0,1000}}'
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                changelog_content += ' '.join(matches)
-        
-        return changelog_content[:2000]
+    def interval_for(self, change_count):
+        """Scan about twice per expected change, bounded and jittered"""
+        if change_count:
+            interval = self.history_days * 24 * 60 * 60 / change_count / 2
+        else:
+            interval = self.max_interval
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.max_interval, max(self.min_interval, interval))
     
-    def analyze_changes_with_ai(self, competitor_id, current_data):
-        """Enhanced change analysis with AI and database storage"""
+    def _change_counts(self):
+        """Real changes per competitor within the history window"""
+        since = (datetime.now() - timedelta(days=self.history_days)).isoformat()
         conn = sqlite3.connect('competitor_tracker.db')
         cursor = conn.cursor()
-        
-        # Get competitor info
-        cursor.execute('SELECT name, website FROM competitors WHERE id = ?', (competitor_id,))
-        competitor = cursor.fetchone()
-        if not competitor:
-            conn.close()
-            return None
-        
-        competitor_name, website = competitor
-        
-        # Get last content snapshot
         cursor.execute('''
-            SELECT full_content FROM content_snapshots 
-            WHERE competitor_id = ? 
-            ORDER BY scraped_at DESC LIMIT 1
-        ''', (competitor_id,))
+            SELECT competitor_id, COUNT(*) FROM changes
+            WHERE detected_at > ? AND change_type NOT IN ('first_scan', 'error')
+            GROUP BY competitor_id
+        ''', (since,))
+        counts = dict(cursor.fetchall())
+        conn.close()
+        return counts
+    
+    def _schedule(self, competitor_id, next_scan_at):
+        self._next_scan[competitor_id] = next_scan_at
+        heapq.heappush(self._queue, (next_scan_at, competitor_id))
+    
+    def _sync(self, competitors):
+        """Queue newly added competitors, resuming any persisted next-scan time"""
+        for competitor in competitors:
+            if competitor['id'] in self._next_scan:
+                continue
+            next_scan_at = time.time()
+            if competitor.get('next_scan_at'):
+                try:
+                    next_scan_at = datetime.fromisoformat(competitor['next_scan_at']).timestamp()
+                except ValueError:
+                    pass
+            self._schedule(competitor['id'], next_scan_at)
+    
+    def _pop_due(self, now):
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_scan_at, competitor_id = heapq.heappop(self._queue)
+            # Skip entries superseded by a later reschedule
+            if self._next_scan.get(competitor_id) == next_scan_at:
+                del self._next_scan[competitor_id]
+                due.append(competitor_id)
+        return due
+    
+    def _persist(self, competitor_ids):
+        conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE competitors SET next_scan_at = ? WHERE id = ?', [
+            (datetime.fromtimestamp(self._next_scan[competitor_id]).isoformat(), competitor_id)
+            for competitor_id in competitor_ids if competitor_id in self._next_scan
+        ])
+        conn.commit()
+        conn.close()
+    
+    def run_due(self):
+        """Scan every competitor whose next-scan time has passed, then reschedule them"""
+        settings = get_settings()
+        if settings.get('auto_scan_enabled') != 'true':
+            return []
+        self.configure(settings)
         
-        last_snapshot = cursor.fetchone()
-        previous_content = last_snapshot[0] if last_snapshot else ""
+        competitors = {competitor['id']: competitor for competitor in get_competitors()}
+        self._sync(competitors.values())
+        due = [competitors[competitor_id] for competitor_id in self._pop_due(time.time())
+               if competitor_id in competitors]
+        if not due:
+            return []
         
-        # Save current snapshot
-        cursor.execute('''
-            INSERT INTO content_snapshots (competitor_id, content_hash, full_content, scraped_at)
-            VALUES (?, ?, ?, ?)
-        ''', (competitor_id, current_data['content_hash'], current_data['content'], current_data['scraped_at']))
-        
-        # AI Analysis
-        if current_data.get('content'):
-            ai_result = self.ai.analyze_content_changes(
-                previous_content, current_data['content'], competitor_name, website
-            )
+        if settings.get('scan_mode') == 'queue':
+            # Worker processes pick these up; see worker.py
+            for competitor in due:
+                self.job_queue.enqueue(competitor['id'], source='scheduler')
+            print(f"📥 Queued {len(due)} due competitors for scan workers at {datetime.now()}")
+            results = []
         else:
-            ai_result = {
-                'analysis': "Failed to scrape content",
-                'change_type': "error",
-                'importance_score': 1,
-                'news_title': f"Scan Error for {competitor_name}",
-                'news_excerpt': "Unable to retrieve website content",
-                'source_links': website
-            }
-        
-        # Save enhanced change record
-        change_record = {
-            'competitor_id': competitor_id,
-            'competitor_name': competitor_name,
-            'content': current_data['content'],
-            'content_hash': current_data['content_hash'],
-            'changelog_content': current_data.get('changelog_content', ''),
-            'analysis': ai_result['analysis'],
-            'change_type': ai_result['change_type'],
-            'importance_score': ai_result['importance_score'],
-            'news_title': ai_result['news_title'],
-            'news_excerpt': ai_result['news_excerpt'],
-            'source_links': ai_result['source_links'],
-            'detected_at': current_data['scraped_at'],
-            'url': website
-        }
-        
-        cursor.execute('''
-            INSERT INTO changes (
-                competitor_id, competitor_name, content, content_hash, 
-                changelog_content, analysis, detected_at, url, change_type,
-                importance_score, news_title, news_excerpt, source_links
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            change_record['competitor_id'], change_record['competitor_name'],
-            change_record['content'], change_record['content_hash'],
-            change_record['changelog_content'], change_record['analysis'],
-            change_record['detected_at'], change_record['url'],
-            change_record['change_type'], change_record['importance_score'],
-            change_record['news_title'], change_record['news_excerpt'],
-            change_record['source_links']
-        ))
+            print(f"🤖 Auto-scanning {len(due)} due competitors at {datetime.now()}")
+            results = self.scan_engine.scan_all(due, wait=False)
+        if results is None:
+            print("⏭️ Previous scan cycle still running, retrying due competitors shortly")
+            for competitor in due:
+                self._schedule(competitor['id'], time.time() + 60)
+            return []
         
-        # Update competitor last_checked
+        counts = self._change_counts()
+        for competitor in due:
+            self._schedule(competitor['id'], time.time() + self.interval_for(counts.get(competitor['id'], 0)))
+        self._persist([competitor['id'] for competitor in due])
+        return results
+
+class SnapshotCompactor:
+    """Retention policy for snapshots and changes, applied in small chunks.
+    
+    Change-bearing snapshots (those a changes row was recorded from) are
+    always kept, as are the last keep_last snapshots per competitor.
+    Other snapshots are thinned to the last one of each day and dropped
+    entirely once older than change_days. Changes older than change_days
+    are dropped, then bodies nothing references anymore, and the freed
+    pages are returned with incremental VACUUM.
+    """
+    
+    def __init__(self, keep_last=20, change_days=365, chunk_size=500, interval_hours=6):
+        self.keep_last = keep_last
+        self.change_days = change_days
+        self.chunk_size = chunk_size
+        self.interval_hours = interval_hours
+        self.last_run = None
+        self._lock = threading.Lock()
+    
+    def configure(self, settings):
+        """Refresh the retention policy from the settings table"""
+        try:
+            self.keep_last = max(1, int(settings.get('retention_keep_last_snapshots', self.keep_last)))
+            self.change_days = max(0, int(settings.get('retention_change_days', self.change_days)))
+            self.chunk_size = max(1, int(settings.get('compaction_chunk_size', self.chunk_size)))
+            self.interval_hours = max(0.0, float(settings.get('compaction_interval_hours', self.interval_hours)))
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Invalid retention settings, keeping current policy: {e}")
+    
+    def _expired_snapshot_ids(self, cursor):
+        cutoff = (datetime.now() - timedelta(days=self.change_days)).isoformat() if self.change_days else ''
         cursor.execute('''
-            UPDATE competitors SET last_checked = ? WHERE id = ?
-        ''', (current_data['scraped_at'], competitor_id))
-        
-        conn.commit()
-        conn.close()
-        
-        return change_record
+            SELECT id FROM (
+                SELECT s.id, s.scraped_at,
+                    EXISTS (
+                        SELECT 1 FROM changes c
+                        WHERE c.content_hash = s.content_hash AND c.competitor_id = s.competitor_id
+                          AND c.detected_at = s.scraped_at
+                    ) AS change_bearing,
+                    ROW_NUMBER() OVER (PARTITION BY s.competitor_id ORDER BY s.scraped_at DESC, s.id DESC) AS recency,
+                    ROW_NUMBER() OVER (PARTITION BY s.competitor_id, substr(s.scraped_at, 1, 10)
+                                       ORDER BY s.scraped_at DESC, s.id DESC) AS day_rank
+                FROM content_snapshots s
+            )
+            WHERE NOT change_bearing AND recency > ? AND (day_rank > 1 OR scraped_at < ?)
+        ''', (self.keep_last, cutoff))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _expired_change_ids(self, cursor):
+        if not self.change_days:
+            return []
+        cutoff = (datetime.now() - timedelta(days=self.change_days)).isoformat()
+        cursor.execute('SELECT id FROM changes WHERE detected_at < ?', (cutoff,))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _delete_in_chunks(self, conn, table, ids):
+        """Delete by id, committing between chunks so scans can write in the gaps"""
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            conn.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            conn.commit()
+            time.sleep(0.05)
+        return len(ids)
+    
+    def _delete_orphaned_bodies(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('SELECT hash FROM content_store')
+        hashes = [row[0] for row in cursor.fetchall()]
+        deleted = 0
+        for start in range(0, len(hashes), self.chunk_size):
+            chunk = hashes[start:start + self.chunk_size]
+            # Re-check references in the same statement; a scan may have reused a body meanwhile
+            cursor.execute(f'''
+                DELETE FROM content_store
+                WHERE hash IN ({','.join('?' * len(chunk))})
+                  AND hash NOT IN (SELECT content_hash FROM content_snapshots WHERE content_hash IS NOT NULL)
+                  AND hash NOT IN (SELECT content_hash FROM changes WHERE content_hash IS NOT NULL)
+            ''', chunk)
+            deleted += cursor.rowcount
+            conn.commit()
+        return deleted
+    
+    def _incremental_vacuum(self, conn):
+        freed = remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while remaining:
+            conn.execute(f'PRAGMA incremental_vacuum({self.chunk_size})').fetchall()
+            previous, remaining = remaining, conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= previous:
+                break
+            time.sleep(0.05)
+        return freed - remaining
+    
+    def run(self):
+        """Apply the retention policy once; returns None if a run is already in progress"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self.configure(get_settings())
+            conn = sqlite3.connect('competitor_tracker.db', timeout=30)
+            cursor = conn.cursor()
+            stats = {
+                'snapshots': self._delete_in_chunks(conn, 'content_snapshots', self._expired_snapshot_ids(cursor)),
+                'changes': self._delete_in_chunks(conn, 'changes', self._expired_change_ids(cursor)),
+                'bodies': self._delete_orphaned_bodies(conn)
+            }
+            stats['pages_freed'] = self._incremental_vacuum(conn)
+            conn.close()
+            self.last_run = time.time()
+            print(f"🧹 Compaction removed {stats['snapshots']} snapshots, {stats['changes']} changes, "
+                  f"{stats['bodies']} bodies; freed {stats['pages_freed']} pages")
+            return stats
+        finally:
+            self._lock.release()
+    
+    def run_if_due(self):
+        """Start a background compaction when the configured interval has passed"""
+        self.configure(get_settings())
+        if not self.interval_hours:
+            return False
+        if self.last_run and time.time() - self.last_run < self.interval_hours * 3600:
+            return False
+        threading.Thread(target=self.run, daemon=True).start()
+        return True
 
 # Initialize tracker
 tracker = CompetitorTracker()
+tracker.store.migrate_inline_content()
+scan_engine = ScanEngine(tracker)
+scan_jobs = ScanJobQueue()
+scan_scheduler = AdaptiveScheduler(scan_engine, scan_jobs)
+local_scan_runner = LocalScanRunner(scan_engine, scan_jobs)
+snapshot_compactor = SnapshotCompactor()
 
 # Database helper functions with backward compatibility
+def _competitor_from_row(row):
+    """Map a competitors row to a dict with backward compatibility"""
+    return {
+        'id': row[0], 'name': row[1], 'website': row[2],
+        'changelog_url': row[3] if len(row) > 3 else '',
+        'added_at': row[4] if len(row) > 4 else '',
+        'last_checked': row[5] if len(row) > 5 else None,
+        'status': row[6] if len(row) > 6 else 'active',
+        'etag': row[7] if len(row) > 7 else None,
+        'last_modified': row[8] if len(row) > 8 else None,
+        'final_url': row[9] if len(row) > 9 else None,
+        'unchanged_scans': row[10] if len(row) > 10 else 0,
+        'feed_url': row[11] if len(row) > 11 else None,
+        'feed_type': row[12] if len(row) > 12 else None,
+        'feed_state': row[13] if len(row) > 13 else None,
+        'next_scan_at': row[14] if len(row) > 14 else None
+    }
+
 def get_competitors():
     """Get all competitors from database"""
     conn = sqlite3.connect('competitor_tracker.db')
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM competitors ORDER BY name')
-    competitors = []
-    for row in cursor.fetchall():
-        competitors.append({
-            'id': row[0], 'name': row[1], 'website': row[2],
-            'changelog_url': row[3] if len(row) > 3 else '',
-            'added_at': row[4] if len(row) > 4 else '',
-            'last_checked': row[5] if len(row) > 5 else None,
-            'status': row[6] if len(row) > 6 else 'active'
-        })
+    competitors = [_competitor_from_row(row) for row in cursor.fetchall()]
     conn.close()
     return competitors
 
+def get_competitor(competitor_id):
+    """Get a single competitor from database"""
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM competitors WHERE id = ?', (competitor_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return _competitor_from_row(row) if row else None
+
+def run_scan_job(job):
+    """Scan a claimed job's competitor and record the outcome on the job"""
+    competitor = get_competitor(job['competitor_id'])
+    if not competitor:
+        scan_jobs.fail(job['id'], 'Competitor not found')
+        return
+    
+    try:
+        result = scan_engine.scan_competitor(competitor)
+    except Exception as e:
+        result = {'error': str(e), 'competitor': competitor['name']}
+    
+    if result.get('error'):
+        print(f"❌ Scan job {job['id']} ({competitor['name']}) failed: {result['error']}")
+        scan_jobs.fail(job['id'], result['error'])
+    else:
+        print(f"✅ Scan job {job['id']} ({competitor['name']}) done")
+        scan_jobs.complete(job['id'], result)
+
+def start_scan_batch(competitor_ids):
+    """Queue scans and, unless dedicated workers are configured, run them in this process"""
+    batch_id = scan_jobs.create_batch(competitor_ids)
+    if get_settings().get('scan_mode') != 'queue':
+        local_scan_runner.kick()
+    return batch_id
+
 def get_recent_changes(limit=50):
     """Get recent changes from database with backward compatibility"""
     conn = sqlite3.connect('competitor_tracker.db')
@@ -963,10 +4218,19 @@ def get_recent_changes(limit=50):
             # New fields with fallback
             'news_title': row[12] if len(row) > 12 else f"Update from {row[2] if len(row) > 2 else 'Unknown'}",
             'news_excerpt': row[13] if len(row) > 13 else (row[6] if len(row) > 6 else 'No details available')[:100],
-            'source_links': row[14] if len(row) > 14 else (row[9] if len(row) > 9 else '')
+            'source_links': row[14] if len(row) > 14 else (row[9] if len(row) > 9 else ''),
+            'analysis_status': row[15] if len(row) > 15 else 'done'
         }
         changes.append(change)
     
+    # Bodies moved to the content store are resolved in one lookup
+    missing = [change['content_hash'] for change in changes if change['content'] is None]
+    if missing:
+        bodies = tracker.store.get_many(cursor, missing)
+        for change in changes:
+            if change['content'] is None:
+                change['content'] = bodies.get(change['content_hash'], '')
+    
     conn.close()
     return changes
 
@@ -985,7 +4249,57 @@ def get_settings():
         'slack_webhook': '',
         'notion_token': '',
         'scan_frequency': '5min',
-        'auto_scan_enabled': 'true'
+        'auto_scan_enabled': 'true',
+        'scan_max_workers': '8',
+        'scan_per_domain_limit': '1',
+        'scan_domain_interval': '2',
+        'html_extractor': 'auto',
+        'max_page_bytes': str(5 * 1024 * 1024),
+        'allowed_content_types': 'text/html,application/xhtml+xml',
+        'fetch_timeout': '15',
+        'fetch_max_retries': '2',
+        'breaker_failure_threshold': '3',
+        'breaker_reset_timeout': '600',
+        'scan_min_interval_minutes': '5',
+        'scan_max_interval_minutes': '1440',
+        'scan_mode': 'inline',
+        'scan_job_timeout': '900',
+        'scan_job_max_attempts': '3',
+        'retention_keep_last_snapshots': '20',
+        'retention_change_days': '365',
+        'compaction_chunk_size': '500',
+        'compaction_interval_hours': '6',
+        'ollama_backend': 'http',
+        'ollama_url': os.environ.get('OLLAMA_HOST', 'http://localhost:11434'),
+        'ollama_model': 'llama3',
+        'ollama_keep_alive': '30m',
+        'ollama_timeout': '120',
+        'llm_cache_enabled': 'true',
+        'llm_cache_ttl_hours': '24',
+        'llm_cache_memory_entries': '256',
+        'llm_cache_max_rows': '5000',
+        'ai_batch_size': '6',
+        'ai_batch_window': '1.5',
+        'ai_batch_max_tokens': '3000',
+        'ai_queue_workers': '6',
+        'ai_queue_max_size': '200',
+        'ai_queue_block_seconds': '10',
+        'ai_pre_classifier': 'true',
+        'ai_escalation_threshold': '4',
+        'ai_change_prompt_tokens': '800',
+        'ai_report_prompt_tokens': '2500',
+        'ollama_breaker_threshold': '2',
+        'ollama_breaker_reset_seconds': '60',
+        'ollama_probe_timeout': '3',
+        'ai_queue_max_attempts': '3',
+        'ai_queue_stale_seconds': '900',
+        'near_duplicate_detection': 'true',
+        'near_duplicate_max_distance': '3',
+        'near_duplicate_lookback': '20',
+        'feed_page_scan_hours': '24',
+        'digest_ai_narration': 'true',
+        'digest_top_stories': '5',
+        'digest_alert_importance': '8'
     }
     
     for key, value in default_settings.items():
@@ -1080,7 +4394,10 @@ def dashboard():
         return render_template('page1.html',
                              competitors=competitors,
                              changes=changes,
-                            settings=settings)
+                            settings=settings,
+                            breaker_states=tracker.breaker.snapshot(),
+                            ai_health=tracker.ai.health(),
+                            analysis_queue=tracker.analysis_queue.stats())
     except Exception as e:
         print(f"Error in dashboard route: {e}")
         return f"Error loading dashboard: {e}", 500
@@ -1300,55 +4617,16 @@ def generate_competitive_insights():
             return jsonify({'error': 'Company profile not found. Please set up your company profile first.'}), 400
         
         # Get recent competitor changes (last 30 days)
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        conn = sqlite3.connect('competitor_tracker.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM changes 
-            WHERE datetime(detected_at) > datetime(?)
-            ORDER BY importance_score DESC, detected_at DESC
-        ''', (month_ago.isoformat(),))
-        
-        recent_changes = []
-        for row in cursor.fetchall():
-            change = {
-                'competitor_name': row[2] if len(row) > 2 else 'Unknown',
-                'analysis': row[6] if len(row) > 6 else 'No analysis',
-                'detected_at': row[8] if len(row) > 8 else '',
-                'change_type': row[10] if len(row) > 10 else 'unknown',
-                'importance_score': row[11] if len(row) > 11 else 5,
-                'news_title': row[12] if len(row) > 12 else 'Update',
-                'news_excerpt': row[13] if len(row) > 13 else ''
-            }
-            recent_changes.append(change)
+        recent_changes = get_changes_since(datetime.now() - timedelta(days=30))
         
         # Generate AI insights with industry-specific research
         try:
             insights = tracker.ai.generate_competitive_insights(company_profile, recent_changes)
-            
-            # Save insights to database
-            cursor.execute('''
-                INSERT INTO competitive_insights (
-                    competitor_id, insight_type, insight_content, impact_level, 
-                    recommendation, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                0,  # General insight, not competitor-specific
-                'competitive_analysis',
-                insights,
-                'high',
-                'Strategic recommendations included in analysis',
-                datetime.now().isoformat()
-            ))
-            conn.commit()
-            
+            save_competitive_insights(insights)
         except Exception as e:
             print(f"AI insights generation failed: {e}")
             insights = f"Competitive analysis of {len(recent_changes)} competitor changes detected in the last 30 days."
         
-        conn.close()
-        
         return jsonify({
             'insights': insights,
             'changes_analyzed': len(recent_changes),
@@ -1357,6 +4635,50 @@ def generate_competitive_insights():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate_competitive_insights/stream')
+def stream_competitive_insights():
+    """Server-Sent Events version of /generate_competitive_insights, forwarding tokens as Ollama writes them"""
+    try:
+        company_profile = get_company_profile()
+        if not company_profile:
+            return jsonify({'error': 'Company profile not found. Please set up your company profile first.'}), 400
+        recent_changes = get_changes_since(datetime.now() - timedelta(days=30))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        yield sse_message({'type': 'meta', 'changes_analyzed': len(recent_changes),
+                           'company_name': company_profile.get('name', 'Your Company')})
+        for kind, text in tracker.ai.stream_competitive_insights(company_profile, recent_changes):
+            if kind == 'done':
+                try:
+                    save_competitive_insights(text)
+                except Exception as e:
+                    print(f"AI insights could not be saved: {e}")
+            yield sse_message({'type': kind, 'text': text})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def save_competitive_insights(insights):
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO competitive_insights (
+            competitor_id, insight_type, insight_content, impact_level, 
+            recommendation, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?)
+    ''', (
+        0,  # General insight, not competitor-specific
+        'competitive_analysis',
+        insights,
+        'high',
+        'Strategic recommendations included in analysis',
+        datetime.now().isoformat()
+    ))
+    conn.commit()
+    conn.close()
+
 @app.route('/remove_competitor/<int:competitor_id>', methods=['DELETE'])
 def remove_competitor(competitor_id):
     try:
@@ -1364,12 +4686,14 @@ def remove_competitor(competitor_id):
         cursor = conn.cursor()
         
         # Remove competitor and related data
+        cursor.execute('DELETE FROM digest_rollups WHERE competitor_id = ?', (competitor_id,))
         cursor.execute('DELETE FROM competitors WHERE id = ?', (competitor_id,))
         cursor.execute('DELETE FROM changes WHERE competitor_id = ?', (competitor_id,))
         cursor.execute('DELETE FROM content_snapshots WHERE competitor_id = ?', (competitor_id,))
         
         conn.commit()
         conn.close()
+        tracker.digest.invalidate()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1378,30 +4702,13 @@ def remove_competitor(competitor_id):
 @app.route('/scan_competitor/<int:competitor_id>')
 def scan_competitor(competitor_id):
     try:
-        conn = sqlite3.connect('competitor_tracker.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT website FROM competitors WHERE id = ?', (competitor_id,))
-        result = cursor.fetchone()
-        conn.close()
+        competitor = get_competitor(competitor_id)
         
-        if not result:
+        if not competitor:
             return jsonify({'error': 'Competitor not found'}), 404
         
-        website = result[0]
-        
-        # Scrape current content
-        current_data = tracker.scrape_website(website)
-        
-        if current_data.get('error'):
-            return jsonify({'error': current_data['error']})
-        
-        # Analyze changes with AI
-        change_record = tracker.analyze_changes_with_ai(competitor_id, current_data)
-        
-        if change_record:
-            return jsonify({'success': True, 'change': change_record})
-        else:
-            return jsonify({'error': 'Failed to analyze changes'})
+        job_id = start_scan_batch([competitor['id']])
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1409,117 +4716,113 @@ def scan_competitor(competitor_id):
 def scan_all():
     try:
         competitors = get_competitors()
-        results = []
-        
-        for competitor in competitors: 
-            try:
-                # Scrape website
-                current_data = tracker.scrape_website(competitor['website'])
-                
-                if current_data.get('error'):
-                    results.append({'error': current_data['error'], 'competitor': competitor['name']})
-                    continue
-                
-                # Analyze with AI
-                change_record = tracker.analyze_changes_with_ai(competitor['id'], current_data)
-                results.append({'success': True, 'competitor': competitor['name'], 'change': change_record})
-                
-            except Exception as e:
-                results.append({'error': str(e), 'competitor': competitor['name']})
+        job_id = start_scan_batch([competitor['id'] for competitor in competitors])
         
-        return jsonify({'results': results})
+        return jsonify({'success': True, 'job_id': job_id, 'total': len(competitors)}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>')
+def scan_job_status(job_id):
+    try:
+        batch = scan_jobs.get_batch(job_id)
+        if not batch:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(batch)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def sse_message(payload):
+    return f"data: {json.dumps(payload, default=str)}\n\n"
+
+# A progress stream holds a server thread, so it gives up after a while and
+# leaves the rest to the client's polling fallback
+SCAN_EVENTS_MAX_SECONDS = 300
+SCAN_EVENTS_UNCLAIMED_SECONDS = 15
+
+@app.route('/jobs/<job_id>/events')
+def scan_job_events(job_id):
+    """Server-Sent Events stream of scan progress.
+    
+    Closed once every competitor is done, after SCAN_EVENTS_MAX_SECONDS,
+    or when no job of the batch has been claimed for
+    SCAN_EVENTS_UNCLAIMED_SECONDS (e.g. queue mode with no worker.py
+    running); the client then falls back to polling /jobs/<id>.
+    """
+    if not scan_jobs.get_batch(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        last_state = None
+        started = last_progress = time.monotonic()
+        while True:
+            batch = scan_jobs.get_batch(job_id)
+            state = [(job['id'], job['status']) for job in batch['jobs']]
+            now = time.monotonic()
+            if state != last_state:
+                last_state = state
+                last_progress = now
+                yield sse_message(batch)
+            if batch['status'] == 'done':
+                return
+            if now - started > SCAN_EVENTS_MAX_SECONDS:
+                return
+            if batch['status'] == 'queued' and now - last_progress > SCAN_EVENTS_UNCLAIMED_SECONDS:
+                return
+            time.sleep(1)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/generate_summary')
 def generate_summary():
+    """The materialized weekly digest; refreshed in the background when new changes arrived"""
     try:
-        # Get changes from last week
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        conn = sqlite3.connect('competitor_tracker.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM changes 
-            WHERE datetime(detected_at) > datetime(?)
-            ORDER BY importance_score DESC, detected_at DESC
-        ''', (week_ago.isoformat(),))
-        
-        recent_changes = []
-        for row in cursor.fetchall():
-            change = {
-                'id': row[0] if len(row) > 0 else 0,
-                'competitor_id': row[1] if len(row) > 1 else 0,
-                'competitor_name': row[2] if len(row) > 2 else 'Unknown',
-                'analysis': row[6] if len(row) > 6 else 'No analysis',
-                'detected_at': row[8] if len(row) > 8 else '',
-                'url': row[9] if len(row) > 9 else '',
-                'change_type': row[10] if len(row) > 10 else 'unknown',
-                'importance_score': row[11] if len(row) > 11 else 5,
-                'news_title': row[12] if len(row) > 12 else f"Update from {row[2] if len(row) > 2 else 'Unknown'}",
-                'news_excerpt': row[13] if len(row) > 13 else '',
-                'source_links': row[14] if len(row) > 14 else ''
-            }
-            recent_changes.append(change)
-        
-        conn.close()
-        
-        if not recent_changes:
-            return jsonify({'summary': 'No changes detected in the past week.', 'changes_count': 0})
-        
-        # Generate AI summary
-        try:
-            ai_summary = tracker.ai.generate_weekly_summary(recent_changes)
-        except Exception as e:
-            print(f"AI summary failed: {e}")
-            ai_summary = f"Weekly Summary: {len(recent_changes)} changes detected across competitors."
-        
-        return jsonify({
-            'summary': ai_summary, 
-            'changes_count': len(recent_changes),
-            'changes_data': recent_changes
-        })
+        return jsonify(tracker.digest.get('week'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/digest_stats')
+def digest_stats():
+    return jsonify(tracker.digest.stats())
+
+def get_changes_since(since):
+    """Changes detected after `since`, most important first, for summaries and insights"""
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM changes 
+        WHERE datetime(detected_at) > datetime(?)
+        ORDER BY importance_score DESC, detected_at DESC
+    ''', (since.isoformat(),))
+    
+    changes = []
+    for row in cursor.fetchall():
+        change = {
+            'id': row[0] if len(row) > 0 else 0,
+            'competitor_id': row[1] if len(row) > 1 else 0,
+            'competitor_name': row[2] if len(row) > 2 else 'Unknown',
+            'analysis': row[6] if len(row) > 6 else 'No analysis',
+            'detected_at': row[8] if len(row) > 8 else '',
+            'url': row[9] if len(row) > 9 else '',
+            'change_type': row[10] if len(row) > 10 else 'unknown',
+            'importance_score': row[11] if len(row) > 11 else 5,
+            'news_title': row[12] if len(row) > 12 else f"Update from {row[2] if len(row) > 2 else 'Unknown'}",
+            'news_excerpt': row[13] if len(row) > 13 else '',
+            'source_links': row[14] if len(row) > 14 else ''
+        }
+        changes.append(change)
+    
+    conn.close()
+    return changes
+
 @app.route('/generate_pdf_report')
 def generate_pdf_report():
     """Generate comprehensive PDF report"""
     try:
-        # Get recent changes (last 30 days for comprehensive report)
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        conn = sqlite3.connect('competitor_tracker.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM changes 
-            WHERE datetime(detected_at) > datetime(?)
-            ORDER BY importance_score DESC, detected_at DESC
-        ''', (month_ago.isoformat(),))
-        
-        changes_data = []
-        for row in cursor.fetchall():
-            change = {
-                'id': row[0] if len(row) > 0 else 0,
-                'competitor_name': row[2] if len(row) > 2 else 'Unknown',
-                'analysis': row[6] if len(row) > 6 else 'No analysis',
-                'detected_at': row[8] if len(row) > 8 else '',
-                'url': row[9] if len(row) > 9 else '',
-                'change_type': row[10] if len(row) > 10 else 'unknown',
-                'importance_score': row[11] if len(row) > 11 else 5,
-                'news_title': row[12] if len(row) > 12 else f"Update from {row[2] if len(row) > 2 else 'Unknown'}",
-                'news_excerpt': row[13] if len(row) > 13 else '',
-                'source_links': row[14] if len(row) > 14 else ''
-            }
-            changes_data.append(change)
-        
-        conn.close()
-        
-        # Generate AI summary for the report
-        try:
-            ai_summary = tracker.ai.generate_weekly_summary(changes_data)
-        except:
-            ai_summary = f"Comprehensive analysis of {len(changes_data)} competitor changes detected in the last 30 days."
+        # Recent changes (last 30 days for comprehensive report) and the materialized monthly digest
+        changes_data = get_changes_since(datetime.now() - timedelta(days=30))
+        ai_summary = tracker.digest.get('month')['summary']
         
         # Generate PDF
         pdf_buffer = tracker.pdf_generator.generate_comprehensive_report(changes_data, ai_summary)
@@ -1563,12 +4866,25 @@ def manage_settings():
             conn.commit()
             conn.close()
             
+            tracker.configure(get_settings())
             return jsonify({'success': True})
         
         return jsonify(get_settings())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/llm_cache_stats')
+def llm_cache_stats():
+    return jsonify(tracker.ai.cache.stats())
+
+@app.route('/analysis_queue_stats')
+def analysis_queue_stats():
+    return jsonify(tracker.analysis_queue.stats())
+
+@app.route('/ai_health')
+def ai_health():
+    return jsonify(dict(tracker.ai.health(), queue=tracker.analysis_queue.stats()))
+
 @app.route('/send_to_slack', methods=['POST'])
 def send_to_slack():
     try:
@@ -1577,8 +4893,7 @@ def send_to_slack():
         if not settings.get('slack_webhook'):
             return jsonify({'error': 'Slack webhook not configured'}), 400
         
-        summary_response = generate_summary()
-        summary_data = summary_response.get_json()
+        summary_data = tracker.digest.get('week')
         
         slack_payload = {
             'text': '📰 Weekly Competitor News Digest',
@@ -1609,41 +4924,74 @@ def send_to_slack():
         return jsonify({'error': str(e)}), 500
 
 def run_scheduled_scans():
-    """Background task for scheduled scanning every 5 minutes"""
+    """Background task that checks for due competitor scans"""
     while True:
         schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        time.sleep(30)
 
-def auto_scan_all():
-    """Auto scan function for scheduler"""
-    print(f"🤖 Auto-scanning all competitors at {datetime.now()}")
+def auto_scan_due():
+    """Auto scan function for scheduler: scans only competitors that are due"""
     try:
-        competitors = get_competitors()
-        for competitor in competitors: 
-            try:
-                current_data = tracker.scrape_website(competitor['website'])
-                if not current_data.get('error'):
-                    tracker.analyze_changes_with_ai(competitor['id'], current_data)
-                time.sleep(2)  # Small delay between scans
-            except Exception as e:
-                print(f"Error scanning {competitor['name']}: {e}")
-        print(f"✅ Auto-scan completed at {datetime.now()}")
+        results = scan_scheduler.run_due()
+        for result in results:
+            if result.get('error'):
+                print(f"Error scanning {result['competitor']}: {result['error']}")
+        if results:
+            print(f"✅ Auto-scan completed at {datetime.now()}")
     except Exception as e:
         print(f"❌ Auto-scan failed: {e}")
 
-# Schedule scans every 5 minutes
-schedule.every(5).minutes.do(auto_scan_all)
+def auto_compact():
+    """Kick off snapshot retention in the background when it is due"""
+    try:
+        snapshot_compactor.run_if_due()
+    except Exception as e:
+        print(f"❌ Compaction failed: {e}")
+
+def refresh_digests():
+    """Keep the digests current as their windows roll over and retry sections Ollama could not narrate"""
+    try:
+        tracker.digest.kick()
+    except Exception as e:
+        print(f"❌ Digest refresh failed: {e}")
+
+def check_ollama_health():
+    """Probe Ollama; once it answers, re-queue analyses made while it was down"""
+    try:
+        if tracker.ai.probe():
+            tracker.analysis_queue.requeue_deferred()
+    except Exception as e:
+        print(f"❌ Ollama health check failed: {e}")
+
+def recover_stale_analyses():
+    """Vouch for this process's queued analyses and pick up those a stopped process left behind"""
+    try:
+        tracker.analysis_queue.recover_stale()
+    except Exception as e:
+        print(f"❌ Analysis recovery failed: {e}")
+
+# Check the scan queue every minute; each competitor has its own interval
+schedule.every(1).minutes.do(auto_scan_due)
+schedule.every(1).minutes.do(check_ollama_health)
+schedule.every(1).minutes.do(recover_stale_analyses)
+schedule.every(30).minutes.do(auto_compact)
+schedule.every(10).minutes.do(refresh_digests)
+
+tracker.configure(get_settings())
 
-# Start background scheduler
-scheduler_thread = threading.Thread(target=run_scheduled_scans, daemon=True)
-scheduler_thread.start()
+# Start background scheduler (tooling that imports the app can opt out)
+if os.environ.get('TRACKTIVE_DISABLE_SCHEDULER') != '1':
+    scheduler_thread = threading.Thread(target=run_scheduled_scans, daemon=True)
+    scheduler_thread.start()
 
 if __name__ == '__main__':
     print("🚀 Starting AI-Powered Competitor Tracker...")   
     print("📊 Database initialized and migrated")
-    print("🧠 Ollama AI integration ready")
+    print(f"🧠 Ollama AI integration ready ({tracker.ai.backend} backend, model {tracker.ai.model})")
+    tracker.ai.warm_up_async()
+    tracker.analysis_queue.recover_stale()
     print("📄 PDF report generation enabled")
-    print("⏰ Auto-scanning every 5 minutes")
+    print("⏰ Adaptive auto-scanning (per-competitor intervals)")
     print("🔍 Enhanced monitoring system active")
     print("🆚 Company comparison feature enabled")
     print("🌐 Server starting on http://localhost:5000")
@@ -0,0 +1,91 @@
+"""Parity check and throughput benchmark for the HTML extraction backends.
+
+Runs every backend over the recorded corpus in benchmarks/corpus, verifies
+that each one produces the same content and changelog_content as the
+BeautifulSoup reference, then reports pages per second.
+
+    python benchmarks/extraction_benchmark.py --repeat 20 --inflate 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Importing the app creates and migrates competitor_tracker.db in the working
+# directory; keep that away from the real database
+os.chdir(tempfile.mkdtemp())
+import app  # noqa: E402
+
+def load_corpus(inflate=0):
+    """Load every recorded page, optionally padded with filler markup"""
+    pages = []
+    for root, _, files in os.walk(CORPUS_DIR):
+        for filename in sorted(files):
+            if not filename.endswith('.html'):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                html = f.read()
+            if inflate:
+                # Mimic heavy marketing pages: lots of markup the parser still has to walk
+                filler = b'<div class="promo"><p>Limited offer: <b>save</b> on annual plans.</p></div>\n' * inflate
+                html = html.replace(b'</body>', filler + b'</body>')
+            pages.append((os.path.relpath(path, CORPUS_DIR), html))
+    return sorted(pages)
+
+def check_parity(pages, reference, candidate):
+    """Return the pages where candidate output differs from the reference"""
+    mismatches = []
+    for name, html in pages:
+        expected = reference.extract(html)
+        actual = candidate.extract(html)
+        for field in ('text', 'changelog_content', 'title', 'headings'):
+            if expected[field] != actual[field]:
+                mismatches.append((name, field))
+    return mismatches
+
+def measure(extractor, pages, repeat):
+    """Pages per second for one backend"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            extractor.extract(html)
+    elapsed = time.perf_counter() - start
+    return (len(pages) * repeat) / elapsed if elapsed else float('inf')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the corpus per backend')
+    parser.add_argument('--inflate', type=int, default=0, help='filler blocks appended to each page')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.inflate)
+    avg_kb = sum(len(html) for _, html in pages) / len(pages) / 1024
+    print(f"📚 {len(pages)} pages, {avg_kb:.1f} KB average")
+
+    reference = app.BeautifulSoupExtractor()
+    failed = False
+    for name, extractor_class in app.HTML_EXTRACTORS.items():
+        if name == app.LxmlExtractor.name and app.lxml_html is None:
+            print(f"⏭️  {name}: not installed")
+            continue
+        extractor = extractor_class()
+        mismatches = check_parity(pages, reference, extractor)
+        if mismatches:
+            failed = True
+            for page, field in mismatches:
+                print(f"❌ {name}: {field} differs on {page}")
+        rate = measure(extractor, pages, args.repeat)
+        print(f"⚡ {name:<14} {rate:8.1f} pages/sec")
+
+    if failed:
+        sys.exit(1)
+    print("✅ All backends match the BeautifulSoup reference")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Local stand-in for the Ollama HTTP API.
+
+Answers /api/generate with canned text (a single line for digest
+section prompts), or canned JSON when the request carries a format
+schema (one entry per item for batched analysis prompts), after a
+configurable delay, and lists one model on /api/tags. Requests with
+"stream": true get the text back as newline-delimited JSON chunks, one
+word at a time. Point the app at it to run without a model installed:
+
+    python benchmarks/ollama_stub.py --port 11434 --latency 200
+
+With --bench it instead measures per-call overhead of the app's Ollama
+client against the stub.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANALYSIS = {
+    'change_type': 'feature_update',
+    'importance': 6,
+    'news_title': 'Competitor ships a product update',
+    'news_excerpt': 'New capabilities were added to the product.',
+    'analysis': 'The page gained new feature announcements.'
+}
+
+STUB_TEXT = """## 📰 Weekly Competitor News Digest
+
+### 🔥 Top Stories This Week
+• Competitors shipped routine product updates.
+
+### 💡 Strategic Insights
+• Continue monitoring for pricing changes."""
+
+STUB_SECTION = "• Competitors shipped routine product updates; continue monitoring for pricing changes."
+
+class OllamaStub:
+    """Threaded HTTP server speaking the parts of the Ollama API the app uses"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, model='llama3', token_ms=0):
+        self.latency = latency_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.model = model
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def answer(self, request):
+        """Canned response text shaped like what the request asked for"""
+        schema = request.get('format')
+        if not schema:
+            # Digest sections are narrated one at a time
+            return STUB_SECTION if request['prompt'].startswith('You are a business news analyst writing one section') else STUB_TEXT
+        if 'items' in schema.get('properties', {}):
+            # Batched analysis: one entry per "=== ITEM n" section in the prompt
+            count = len(re.findall(r'^=== ITEM \d+:', request['prompt'], re.M))
+            return json.dumps({'items': [dict(STUB_ANALYSIS, item=n) for n in range(1, count + 1)]})
+        return json.dumps(STUB_ANALYSIS)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self._send_json({'models': [{'name': f'{stub.model}:latest'}]})
+                else:
+                    self._send_json({'error': 'not found'}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if self.path != '/api/generate':
+                    self._send_json({'error': 'not found'}, status=404)
+                    return
+                with stub._lock:
+                    stub.requests += 1
+
+                # An empty prompt only loads the model
+                if not request.get('prompt'):
+                    self._send_json({'model': request.get('model'), 'response': '', 'done': True,
+                                     'done_reason': 'load'})
+                    return
+
+                time.sleep(stub.latency)
+                text = stub.answer(request)
+                if request.get('stream'):
+                    self._stream(request.get('model'), text)
+                else:
+                    # A blocking call waits for the model to write every word
+                    time.sleep(stub.token_delay * len(text.split()))
+                    self._send_json({'model': request.get('model'), 'response': text, 'done': True})
+
+            def _stream(self, model, text):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                pieces = [{'model': model, 'response': word, 'done': False}
+                          for word in re.findall(r'\S+\s*', text)]
+                pieces.append({'model': model, 'response': '', 'done': True})
+                for number, piece in enumerate(pieces):
+                    if number and stub.token_delay:
+                        time.sleep(stub.token_delay)
+                    line = json.dumps(piece).encode('utf-8') + b'\n'
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def bench(calls):
+    """Median per-call overhead of the pooled client vs a fresh connection per call"""
+    os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import tempfile
+    os.chdir(tempfile.mkdtemp())
+    import app
+    import requests
+
+    stub = OllamaStub().start()
+    ai = app.OllamaAI()
+    ai.base_url = stub.base_url
+    ai.cache.enabled = False
+    ai.warm_up()
+
+    def measure(call):
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    pooled = measure(lambda: ai._call_ollama('ping', schema=app.ANALYSIS_SCHEMA))
+    fresh = measure(lambda: requests.post(f'{stub.base_url}/api/generate',
+                                          json={'model': ai.model, 'prompt': 'ping'}).json())
+    stub.stop()
+    print(f"⚡ pooled session: {pooled:.2f} ms/call, new connection per call: {fresh:.2f} ms/call "
+          f"(median of {calls})")
+
+    # Time to first visible text for a digest-sized answer, blocking vs streamed
+    stub = OllamaStub(latency_ms=100, token_ms=20).start()
+    ai.base_url = stub.base_url
+    start = time.perf_counter()
+    ai._call_ollama('digest')
+    blocking = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    stream = ai._stream_ollama('digest')
+    next(stream)
+    first_token = (time.perf_counter() - start) * 1000
+    list(stream)
+    streamed = (time.perf_counter() - start) * 1000
+    stub.stop()
+    print(f"🌊 digest text: blocking call shows it after {blocking:.0f} ms, "
+          f"streaming shows the first words after {first_token:.0f} ms (complete at {streamed:.0f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0, help='delay per generate call (ms)')
+    parser.add_argument('--token-latency', type=float, default=0, help='delay between streamed words (ms)')
+    parser.add_argument('--bench', type=int, metavar='CALLS', help='measure client overhead instead of serving')
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+        return
+
+    stub = OllamaStub(args.host, args.port, args.latency, token_ms=args.token_latency)
+    print(f"🧪 Ollama stub listening on {stub.base_url}")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Offline end-to-end replay of the scan pipeline against the recorded corpus.
+
+Serves every site in benchmarks/corpus from a local HTTP server, moving each
+site to its next recorded version (v1.html, v2.html, ...) every round, and
+drives CompetitorTracker.scrape_website and analyze_changes_with_ai against
+it, with benchmarks/ollama_stub.py standing in for the Ollama server, then
+waits for the analysis queue to drain and refreshes the weekly digest. Runs
+in a scratch directory, so the real database is never touched and no
+network access is needed.
+
+    python benchmarks/replay_benchmark.py --rounds 6 --latency 20 --error-rate 0.05
+"""
+import argparse
+import hashlib
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ollama_stub import OllamaStub
+
+os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'corpus')
+sys.path.insert(0, REPO_ROOT)
+
+def load_versions():
+    """{site: [html of v1, v2, ...]} from the recorded corpus"""
+    sites = {}
+    for site in sorted(os.listdir(CORPUS_DIR)):
+        site_dir = os.path.join(CORPUS_DIR, site)
+        if not os.path.isdir(site_dir):
+            continue
+        names = sorted((f for f in os.listdir(site_dir) if f.endswith('.html')),
+                       key=lambda f: int(f[1:-5]) if f[1:-5].isdigit() else 0)
+        versions = []
+        for name in names:
+            with open(os.path.join(site_dir, name), 'rb') as f:
+                versions.append(f.read())
+        if versions:
+            sites[site] = versions
+    return sites
+
+class CorpusServer:
+    """Local HTTP server for the corpus with injected latency, errors and page padding"""
+
+    def __init__(self, sites, latency_ms=0, jitter_ms=0, error_rate=0.0, inflate=0, etags=True, seed=0, flap=False):
+        self.sites = sites
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.filler = b'<div class="promo"><p>Limited offer: <b>save</b> on annual plans.</p></div>\n' * inflate
+        self.etags = etags
+        self.flap = flap
+        self.round = 0
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def page(self, site):
+        """Body and ETag of the site's version for the current round"""
+        versions = self.sites[site]
+        index = min(self.round, len(versions) - 1)
+        if self.flap and self.round >= len(versions) and len(versions) > 1:
+            # Past the last version, flip between the last two like an A/B test
+            index = len(versions) - 1 - (self.round - len(versions) + 1) % 2
+        body = versions[index]
+        if self.filler:
+            body = body.replace(b'</body>', self.filler + b'</body>')
+        return body, '"' + hashlib.md5(body).hexdigest() + '"'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    fail = server._random.random() < server.error_rate
+                    delay = server.latency + server._random.uniform(0, server.jitter)
+                time.sleep(delay)
+
+                site = self.path.strip('/').split('/')[0]
+                if fail:
+                    self.send_error(503)
+                    return
+                if site not in server.sites:
+                    self.send_error(404)
+                    return
+
+                body, etag = server.page(site)
+                if server.etags and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if server.etags:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def scan_once(app, competitor_id, timings, outcomes, lock):
+    """One scrape + analyze pass for a competitor, recording per-stage timings"""
+    competitor = app.get_competitor(competitor_id)
+    start = time.perf_counter()
+    current_data = app.tracker.scrape_website(competitor['website'], validators=competitor)
+    scraped = time.perf_counter()
+
+    if current_data.get('error'):
+        outcome = 'error'
+    elif current_data.get('not_modified'):
+        app.tracker.record_not_modified(competitor_id, current_data)
+        outcome = 'not_modified'
+    else:
+        change_record = app.tracker.analyze_changes_with_ai(competitor_id, current_data)
+        outcome = 'unchanged' if change_record and change_record.get('unchanged') else 'changed'
+    finished = time.perf_counter()
+
+    with lock:
+        timings['scrape'].append((scraped - start) * 1000)
+        if outcome in ('changed', 'unchanged'):
+            timings['analyze'].append((finished - scraped) * 1000)
+        timings['end_to_end'].append((finished - start) * 1000)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=6, help='scan passes; sites advance one version per round')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent scans per round')
+    parser.add_argument('--latency', type=float, default=20, help='server latency per request (ms)')
+    parser.add_argument('--jitter', type=float, default=10, help='extra random server latency (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--inflate', type=int, default=0, help='filler blocks appended to each page')
+    parser.add_argument('--llm-latency', type=float, default=50, help='stub Ollama latency per call (ms)')
+    parser.add_argument('--no-etag', action='store_true', help='disable ETags so the content-hash gate is exercised')
+    parser.add_argument('--flap', action='store_true', help='after the last version, flip between the last two')
+    parser.add_argument('--extractor', default='auto', help='html_extractor setting to use')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sites = load_versions()
+    server = CorpusServer(sites, args.latency, args.jitter, args.error_rate, args.inflate,
+                          etags=not args.no_etag, seed=args.seed, flap=args.flap)
+    server.start()
+    ollama = OllamaStub(latency_ms=args.llm_latency).start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        import app  # noqa: E402 - creates a fresh database in the scratch directory
+
+        app.tracker.configure({'html_extractor': args.extractor, 'scan_max_workers': str(args.workers)})
+        app.tracker.backoff_base = 0.05
+        app.tracker.backoff_max = 0.5
+        app.tracker.ai.configure({'ollama_backend': 'http', 'ollama_url': ollama.base_url})
+
+        conn = app.sqlite3.connect('competitor_tracker.db')
+        competitor_ids = []
+        for site in sites:
+            cursor = conn.execute('INSERT INTO competitors (name, website, added_at) VALUES (?, ?, ?)',
+                                  (site, f'{server.base_url}/{site}/', datetime.now().isoformat()))
+            competitor_ids.append(cursor.lastrowid)
+        conn.commit()
+        conn.close()
+
+        timings = {'scrape': [], 'analyze': [], 'end_to_end': []}
+        outcomes = {}
+        lock = threading.Lock()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for round_number in range(args.rounds):
+                server.round = round_number
+                list(executor.map(lambda cid: scan_once(app, cid, timings, outcomes, lock), competitor_ids))
+        scanned = time.perf_counter() - start
+        app.tracker.analysis_queue.join()
+        elapsed = time.perf_counter() - start
+        refresh_start = time.perf_counter()
+        digest = app.tracker.digest.refresh('week')
+        refreshed = time.perf_counter()
+        app.tracker.digest.get('week')
+        served = time.perf_counter()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        server.stop()
+        ollama.stop()
+        extractor = app.tracker.extractor.name
+        conn = app.sqlite3.connect('competitor_tracker.db')
+        statuses = dict(conn.execute('''
+            SELECT analysis_status, COUNT(*) FROM changes WHERE change_type != 'first_scan' GROUP BY analysis_status
+        ''').fetchall())
+        conn.close()
+
+    scans = len(timings['end_to_end'])
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"📚 {len(sites)} sites x {args.rounds} rounds, {server.requests} HTTP requests, "
+          f"{ollama.requests} LLM calls, extractor {extractor}")
+    print(f"⚡ {scans / scanned:.1f} pages/sec ({scans} scans in {scanned:.2f}s, "
+          f"AI analysis drained at {elapsed:.2f}s)")
+    print(f"{'stage':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage, samples in timings.items():
+        mean = statistics.mean(samples) if samples else 0.0
+        print(f"{stage:<12}{len(samples):>8}{percentile(samples, 50):>10.1f}{percentile(samples, 99):>10.1f}{mean:>10.1f}")
+    print("📊 outcomes: " + ', '.join(f"{name}={count}" for name, count in sorted(outcomes.items())))
+    print("🧮 change analysis: " + ', '.join(f"{status}={count}" for status, count in sorted(statuses.items())))
+    print(f"📰 weekly digest: {digest['changes_count']} changes, refreshed in {(refreshed - refresh_start) * 1000:.1f} ms, "
+          f"served in {(served - refreshed) * 1000:.2f} ms")
+    print(f"🧠 memory peak: {traced_peak / 1024 / 1024:.1f} MiB traced, {max_rss / 1024:.1f} MiB max RSS")
+
+if __name__ == '__main__':
+    main()
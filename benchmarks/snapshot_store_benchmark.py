@@ -0,0 +1,158 @@
+"""DB size and read latency before/after moving snapshots into the content store.
+
+Builds a database in a scratch directory the way the old code filled it
+(one inline snapshot and one inline change row per scan), measures it,
+then imports the app so its migration moves every body into the
+compressed content store, and measures again.
+
+    python benchmarks/snapshot_store_benchmark.py --competitors 20 --scans 288
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'corpus')
+sys.path.insert(0, REPO_ROOT)
+
+def load_page_texts():
+    """Visible text of every recorded page, cut to the 5000 chars the scraper keeps"""
+    texts = []
+    for root, _, files in os.walk(CORPUS_DIR):
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                with open(os.path.join(root, filename), 'rb') as f:
+                    soup = BeautifulSoup(f.read(), 'html.parser')
+                texts.append(' '.join(soup.get_text().split())[:5000])
+    return texts
+
+def build_legacy_db(competitors, scans, change_every):
+    """Fill competitor_tracker.db in the current directory with inline bodies"""
+    texts = load_page_texts()
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE competitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, website TEXT NOT NULL,
+            changelog_url TEXT, added_at TEXT, last_checked TEXT, status TEXT DEFAULT 'active'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, competitor_id INTEGER, competitor_name TEXT,
+            content TEXT, content_hash TEXT, changelog_content TEXT, analysis TEXT, ai_summary TEXT,
+            detected_at TEXT, url TEXT, change_type TEXT, importance_score INTEGER DEFAULT 5,
+            news_title TEXT, news_excerpt TEXT, source_links TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE content_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, competitor_id INTEGER, content_hash TEXT,
+            full_content TEXT, scraped_at TEXT
+        )
+    ''')
+
+    start = datetime(2026, 1, 1)
+    for competitor_id in range(1, competitors + 1):
+        name = f'Competitor {competitor_id}'
+        cursor.execute('INSERT INTO competitors (id, name, website, added_at) VALUES (?, ?, ?, ?)',
+                       (competitor_id, name, f'https://competitor{competitor_id}.example', start.isoformat()))
+        base = texts[competitor_id % len(texts)]
+        for scan in range(scans):
+            # The page only really changes every change_every scans
+            version = scan // change_every
+            content = f'{name} release {version}. {base}'[:5000]
+            content_hash = f'{competitor_id}-{version}'
+            scraped_at = (start + timedelta(minutes=5 * scan)).isoformat()
+            cursor.execute('''
+                INSERT INTO content_snapshots (competitor_id, content_hash, full_content, scraped_at)
+                VALUES (?, ?, ?, ?)
+            ''', (competitor_id, content_hash, content, scraped_at))
+            cursor.execute('''
+                INSERT INTO changes (competitor_id, competitor_name, content, content_hash, analysis,
+                                     detected_at, url, change_type, news_title)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (competitor_id, name, content, content_hash, 'Routine update', scraped_at,
+                  f'https://competitor{competitor_id}.example', 'content', f'Update from {name}'))
+    conn.commit()
+    conn.close()
+
+def timed(fn, repeat):
+    """Median milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def legacy_reads(competitors, repeat):
+    def latest_snapshots():
+        conn = sqlite3.connect('competitor_tracker.db')
+        for competitor_id in range(1, competitors + 1):
+            conn.execute('''
+                SELECT full_content FROM content_snapshots WHERE competitor_id = ?
+                ORDER BY scraped_at DESC LIMIT 1
+            ''', (competitor_id,)).fetchone()
+        conn.close()
+
+    def recent_changes():
+        conn = sqlite3.connect('competitor_tracker.db')
+        conn.execute('SELECT * FROM changes ORDER BY detected_at DESC LIMIT 100').fetchall()
+        conn.close()
+
+    return timed(latest_snapshots, repeat), timed(recent_changes, repeat)
+
+def store_reads(app, competitors, repeat):
+    def latest_snapshots():
+        conn = sqlite3.connect('competitor_tracker.db')
+        for competitor_id in range(1, competitors + 1):
+            row = conn.execute('''
+                SELECT s.full_content, cs.codec, cs.body
+                FROM content_snapshots s LEFT JOIN content_store cs ON cs.hash = s.content_hash
+                WHERE s.competitor_id = ? ORDER BY s.scraped_at DESC LIMIT 1
+            ''', (competitor_id,)).fetchone()
+            if row[0] is None:
+                app.tracker.store.decode(row[1], row[2])
+        conn.close()
+
+    return timed(latest_snapshots, repeat), timed(lambda: app.get_recent_changes(100), repeat)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--competitors', type=int, default=20)
+    parser.add_argument('--scans', type=int, default=288, help='scans per competitor (288 = one day at 5 min)')
+    parser.add_argument('--change-every', type=int, default=24, help='scans between real page changes')
+    parser.add_argument('--repeat', type=int, default=50, help='timed repetitions per read')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        build_legacy_db(args.competitors, args.scans, args.change_every)
+        size_before = os.path.getsize('competitor_tracker.db')
+        latest_before, recent_before = legacy_reads(args.competitors, args.repeat)
+
+        start = time.perf_counter()
+        import app  # noqa: E402 - runs init_db and the content store migration
+        migration_seconds = time.perf_counter() - start
+        size_after = os.path.getsize('competitor_tracker.db')
+        latest_after, recent_after = store_reads(app, args.competitors, args.repeat)
+        codec = app.tracker.store.codec
+
+    rows = args.competitors * args.scans
+    print(f"{rows} snapshot rows + {rows} change rows, codec {codec}, migration {migration_seconds:.2f}s")
+    print(f"{'':24}{'before':>12}{'after':>12}")
+    print(f"{'DB size (KiB)':24}{size_before / 1024:>12.0f}{size_after / 1024:>12.0f}")
+    print(f"{'latest snapshots (ms)':24}{latest_before:>12.2f}{latest_after:>12.2f}")
+    print(f"{'recent 100 changes (ms)':24}{recent_before:>12.2f}{recent_after:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -48,6 +48,92 @@ function hideLoading() {
   overlay.style.display = "none"
 }
 
+function setLoadingText(message) {
+  const overlay = document.getElementById("loadingOverlay")
+  const loadingText = document.getElementById("loadingText")
+
+  // Real progress replaces the simulated step messages
+  if (overlay && overlay.dataset.messageInterval) {
+    clearInterval(Number.parseInt(overlay.dataset.messageInterval))
+  }
+  if (loadingText) {
+    loadingText.textContent = message
+  }
+}
+
+// Follow a background scan job until every competitor in it has finished
+function watchScanJob(jobId, onProgress) {
+  if (!window.EventSource) {
+    return pollScanJob(jobId, onProgress)
+  }
+
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`/jobs/${jobId}/events`)
+    source.onmessage = (event) => {
+      const job = JSON.parse(event.data)
+      onProgress(job)
+      if (job.status === "done") {
+        source.close()
+        resolve(job)
+      }
+    }
+    source.onerror = () => {
+      // Fall back to polling if the stream drops (e.g. behind a buffering proxy)
+      // or the server closes it because no worker has picked the jobs up yet
+      source.close()
+      pollScanJob(jobId, onProgress).then(resolve, reject)
+    }
+  })
+}
+
+async function pollScanJob(jobId, onProgress) {
+  while (true) {
+    const response = await fetch(`/jobs/${jobId}`)
+    const job = await response.json()
+    if (job.error) {
+      throw new Error(job.error)
+    }
+    onProgress(job)
+    if (job.status === "done") {
+      return job
+    }
+    await new Promise((resolve) => setTimeout(resolve, 2000))
+  }
+}
+
+// Stream AI-written text from a Server-Sent Events endpoint. Resolves with the
+// final text; rejects if the stream fails so the caller can fall back to the
+// blocking JSON endpoint.
+function streamAIText(url, { onMeta, onToken }) {
+  return new Promise((resolve, reject) => {
+    if (!window.EventSource) {
+      reject(new Error("Streaming not supported"))
+      return
+    }
+
+    const source = new EventSource(url)
+    source.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      if (message.type === "meta" && onMeta) {
+        onMeta(message)
+      } else if (message.type === "token" && onToken) {
+        onToken(message.text)
+      } else if (message.type === "done") {
+        source.close()
+        resolve(message.text)
+      }
+    }
+    source.onerror = () => {
+      source.close()
+      reject(new Error("AI stream unavailable"))
+    }
+  })
+}
+
+function scanJobResult(job) {
+  return job.result || { error: job.error || "Unknown error", competitor: job.competitor }
+}
+
 function showNotification(message, type = "success") {
   // Remove existing notifications
   const existingNotifications = document.querySelectorAll(".notification")
@@ -444,41 +530,42 @@ function initializeForm() {
 async function generateCompetitiveInsights() {
   showLoading("🧠 Generating AI competitive insights with industry research...")
 
-  try {
-    const response = await fetch("/generate_competitive_insights")
-    const result = await response.json()
+  let output = null
+  const startOutput = (meta) => {
+    output = showInsightsOutput(meta.changes_analyzed, meta.company_name)
+  }
 
-    if (result.insights) {
-      const insightsOutput = document.getElementById("competitiveInsights")
-      if (insightsOutput) {
-        insightsOutput.innerHTML = `
-          <div class="insights-content">
-            <div class="insights-header">
-              <h4>🤖 AI Competitive Analysis</h4>
-              <p>Industry-specific analysis of ${result.changes_analyzed} competitor changes for ${result.company_name}</p>
-            </div>
-            <div class="insights-text">
-              <div style="white-space: pre-wrap; font-family: inherit; line-height: 1.6; background: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #667eea;">${result.insights}</div>
-            </div>
-            <div class="insights-actions">
-              <button onclick="copyToClipboard(\`${result.insights.replace(/`/g, "\\`")}\`)" class="btn btn-small btn-primary">
-                <span class="btn-icon">📋</span>Copy Analysis
-              </button>
-              <button onclick="exportComparisonReport()" class="btn btn-small btn-secondary">
-                <span class="btn-icon">📄</span>Export Report
-              </button>
-            </div>
-          </div>
-        `
+  try {
+    let insights
+    let changesAnalyzed = 0
+    try {
+      insights = await streamAIText("/generate_competitive_insights/stream", {
+        onMeta: (meta) => {
+          changesAnalyzed = meta.changes_analyzed
+          startOutput(meta)
+        },
+        onToken: (text) => {
+          // Show the analysis as soon as the first words arrive
+          hideLoading()
+          if (output) output.textContent += text
+        },
+      })
+    } catch (streamError) {
+      const response = await fetch("/generate_competitive_insights")
+      const result = await response.json()
+      if (!result.insights) {
+        throw new Error(result.error || "Failed to generate insights")
       }
-
-      showNotification(
-        `🧠 AI insights generated with industry research covering ${result.changes_analyzed} competitor changes!`,
-        "success",
-      )
-    } else {
-      showNotification("Error: " + (result.error || "Failed to generate insights"), "error")
+      insights = result.insights
+      changesAnalyzed = result.changes_analyzed
+      startOutput(result)
     }
+
+    if (output) output.textContent = insights
+    showNotification(
+      `🧠 AI insights generated with industry research covering ${changesAnalyzed} competitor changes!`,
+      "success",
+    )
   } catch (error) {
     showNotification("Error generating insights: " + error.message, "error")
   } finally {
@@ -486,6 +573,33 @@ async function generateCompetitiveInsights() {
   }
 }
 
+// Render the insights panel; returns the element holding the analysis text
+function showInsightsOutput(changesAnalyzed, companyName) {
+  const insightsOutput = document.getElementById("competitiveInsights")
+  if (!insightsOutput) return null
+
+  insightsOutput.innerHTML = `
+    <div class="insights-content">
+      <div class="insights-header">
+        <h4>🤖 AI Competitive Analysis</h4>
+        <p>Industry-specific analysis of ${changesAnalyzed} competitor changes for ${companyName}</p>
+      </div>
+      <div class="insights-text">
+        <div style="white-space: pre-wrap; font-family: inherit; line-height: 1.6; background: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #667eea;"></div>
+      </div>
+      <div class="insights-actions">
+        <button onclick="copyToClipboard(this.closest('.insights-content').querySelector('.insights-text div').textContent)" class="btn btn-small btn-primary">
+          <span class="btn-icon">📋</span>Copy Analysis
+        </button>
+        <button onclick="exportComparisonReport()" class="btn btn-small btn-secondary">
+          <span class="btn-icon">📄</span>Export Report
+        </button>
+      </div>
+    </div>
+  `
+  return insightsOutput.querySelector(".insights-text div")
+}
+
 // Filtering Functions
 function applyFilters() {
   const timeFilter = document.getElementById("timeFilter")?.value || "all"
@@ -677,9 +791,22 @@ async function scanCompetitor(competitorId) {
 
   try {
     const response = await fetch(`/scan_competitor/${competitorId}`)
-    const result = await response.json()
+    const started = await response.json()
+    if (!started.job_id) {
+      throw new Error(started.error || "Could not start scan")
+    }
 
-    if (result.success && result.change) {
+    const job = await watchScanJob(started.job_id, (progress) => {
+      const current = progress.jobs[0]
+      if (current && current.status === "running") {
+        setLoadingText(`🧠 Scanning ${current.competitor}...`)
+      }
+    })
+    const result = scanJobResult(job.jobs[0] || {})
+
+    if (result.success && (result.not_modified || result.unchanged)) {
+      showNotification("✅ No changes since the last scan", "success")
+    } else if (result.success && result.change) {
       const change = result.change
       let message = `🤖 AI Analysis Complete!`
 
@@ -723,14 +850,18 @@ async function scanAllCompetitors() {
 
   try {
     const response = await fetch("/scan_all")
-    const result = await response.json()
+    const started = await response.json()
+
+    if (started.job_id) {
+      const job = await watchScanJob(started.job_id, (progress) => {
+        setLoadingText(`🌐 Scanned ${progress.finished}/${progress.total} competitors...`)
+      })
 
-    if (result.results) {
       let successCount = 0
       let errorCount = 0
       let highPriorityChanges = 0
 
-      result.results.forEach((r) => {
+      job.jobs.map(scanJobResult).forEach((r) => {
         if (r.success) {
           successCount++
           if (r.change && r.change.importance_score >= 7) {
@@ -757,7 +888,7 @@ async function scanAllCompetitors() {
         location.reload()
       }, 3000)
     } else {
-      showNotification("🤖 Scan failed: " + (result.error || "Unknown error"), "error")
+      showNotification("🤖 Scan failed: " + (started.error || "Unknown error"), "error")
     }
   } catch (error) {
     showNotification("🤖 AI scan error: " + error.message, "error")
@@ -769,22 +900,22 @@ async function scanAllCompetitors() {
 
 // Enhanced summary generation
 async function generateSummary() {
-  showLoading("📰 AI generating comprehensive news digest...")
+  showLoading("📰 Loading competitor news digest...")
 
   try {
     const response = await fetch("/generate_summary")
     const result = await response.json()
+    if (result.error) {
+      throw new Error(result.error)
+    }
 
     if (result.summary) {
-      const summaryOutput = document.getElementById("summaryOutput")
-      if (summaryOutput) {
-        summaryOutput.innerHTML = `<pre style="white-space: pre-wrap; font-family: inherit;">${result.summary}</pre>`
-        summaryOutput.scrollIntoView({ behavior: "smooth" })
-      } else {
-        showAISummaryModal(result.summary, result.changes_count)
-      }
+      showSummaryOutput(result.changes_count).textContent = result.summary
 
-      const message = `📰 News digest generated covering ${result.changes_count} competitor updates!`
+      let message = `📰 News digest covering ${result.changes_count} competitor updates!`
+      if (result.stale) {
+        message += " Newer updates are being added in the background."
+      }
       showNotification(message, "success")
     } else {
       showNotification("📰 No competitor news to analyze this week", "info")
@@ -796,7 +927,19 @@ async function generateSummary() {
   }
 }
 
-function showAISummaryModal(summary, changesCount) {
+// Show the digest in the page's summary panel, or in a modal when the page has
+// none; returns the element holding the digest text
+function showSummaryOutput(changesCount) {
+  const summaryOutput = document.getElementById("summaryOutput")
+  if (summaryOutput) {
+    summaryOutput.innerHTML = `<pre style="white-space: pre-wrap; font-family: inherit;"></pre>`
+    summaryOutput.scrollIntoView({ behavior: "smooth" })
+    return summaryOutput.querySelector("pre")
+  }
+  return showAISummaryModal(changesCount)
+}
+
+function showAISummaryModal(changesCount) {
   const modal = document.createElement("div")
   modal.className = "modal"
   modal.style.display = "block"
@@ -809,9 +952,9 @@ function showAISummaryModal(summary, changesCount) {
         <p>AI-powered business intelligence covering ${changesCount} competitor updates</p>
       </div>
       <div style="padding: 2rem;">
-        <div class="summary-output" style="background: #f7fafc; padding: 1.5rem; border-radius: 10px; white-space: pre-wrap; font-family: 'Inter', sans-serif; line-height: 1.6; max-height: 500px; overflow-y: auto;">${summary}</div>
+        <div class="summary-output" style="background: #f7fafc; padding: 1.5rem; border-radius: 10px; white-space: pre-wrap; font-family: 'Inter', sans-serif; line-height: 1.6; max-height: 500px; overflow-y: auto;"></div>
         <div class="form-actions" style="margin-top: 2rem;">
-          <button onclick="copyToClipboard(\`${summary.replace(/`/g, "\\`")}\`)" class="btn btn-primary">
+          <button onclick="copyToClipboard(this.closest('.modal').querySelector('.summary-output').textContent)" class="btn btn-primary">
             <span class="btn-icon">📋</span>Copy News Digest
           </button>
           <button onclick="generatePDFReport()" class="btn btn-pdf">
@@ -827,6 +970,7 @@ function showAISummaryModal(summary, changesCount) {
   `
 
   document.body.appendChild(modal)
+  return modal.querySelector(".summary-output")
 }
 
 // Enhanced PDF Report Generation
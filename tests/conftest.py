@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The app module, imported with its database in a scratch directory"""
+    os.chdir(tmp_path_factory.mktemp('db'))
+    import app
+    return app
+
+@pytest.fixture
+def ollama_stub():
+    """The benchmark Ollama stand-in, serving on an ephemeral port"""
+    from ollama_stub import OllamaStub
+    stub = OllamaStub().start()
+    yield stub
+    stub.stop()
@@ -0,0 +1,68 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+def make_queue(app_module, owner):
+    queue = app_module.AnalysisQueue(ai=None)
+    queue.owner = owner
+    queue.submitted = []
+    queue.submit = lambda change_id, task, priority: queue.submitted.append(change_id) or True
+    return queue
+
+def add_changes(statuses):
+    """Insert changes awaiting analysis as (status, owner, claimed_at) and return their ids"""
+    conn = sqlite3.connect('competitor_tracker.db')
+    # Start from a clean slate: only these rows are waiting for analysis
+    conn.execute("UPDATE changes SET analysis_status = 'done', analysis_input = NULL "
+                 "WHERE analysis_status IN ('pending', 'deferred')")
+    ids = []
+    for status, owner, claimed_at in statuses:
+        ids.append(conn.execute('''
+            INSERT INTO changes (competitor_name, importance_score, analysis_status, analysis_input,
+                analysis_owner, analysis_claimed_at)
+            VALUES ('Claims', 5, ?, ?, ?, ?)
+        ''', (status, json.dumps({'kind': 'change'}), owner, claimed_at)).lastrowid)
+    conn.commit()
+    conn.close()
+    return ids
+
+def owners(ids):
+    conn = sqlite3.connect('competitor_tracker.db')
+    rows = dict(conn.execute(f"SELECT id, analysis_owner FROM changes WHERE id IN ({','.join('?' * len(ids))})",
+                             ids).fetchall())
+    conn.close()
+    return [rows[change_id] for change_id in ids]
+
+def test_deferred_changes_are_claimed_once_across_queues(app_module):
+    ids = add_changes([('deferred', None, None)] * 20)
+    queues = [make_queue(app_module, f'host-{n}') for n in range(4)]
+    threads = [threading.Thread(target=queue.requeue_deferred) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    submitted = [change_id for queue in queues for change_id in queue.submitted]
+    assert sorted(submitted) == ids
+    claimed_by = {change_id: queue.owner for queue in queues for change_id in queue.submitted}
+    assert owners(ids) == [claimed_by[change_id] for change_id in ids]
+
+def test_only_stale_pending_changes_are_recovered(app_module):
+    long_ago = (datetime.now() - timedelta(hours=1)).isoformat()
+    recent = datetime.now().isoformat()
+    crashed, live, legacy, own = add_changes([
+        ('pending', 'crashed-host', long_ago),
+        ('pending', 'live-host', recent),
+        ('pending', None, None),
+        ('pending', 'this-host', long_ago),
+    ])
+    queue = make_queue(app_module, 'this-host')
+    
+    assert queue.recover_stale() == 2
+    assert sorted(queue.submitted) == sorted([crashed, legacy])
+    assert owners([crashed, live, legacy, own]) == ['this-host', 'live-host', 'this-host', 'this-host']
+    
+    # Its own rows were vouched for, so another process leaves them alone
+    other = make_queue(app_module, 'other-host')
+    assert other.recover_stale() == 0
@@ -0,0 +1,21 @@
+def test_scoped_breaker_state_is_shared_through_the_database(app_module):
+    worker = app_module.CircuitBreaker(failure_threshold=1, scope='test-fetch')
+    web = app_module.CircuitBreaker(scope='test-fetch')
+    
+    worker.record_failure('flaky.example', 'HTTP 503')
+    
+    # The web process never fetched from the host but still sees what the worker saw
+    [circuit] = web.snapshot()
+    assert circuit['key'] == 'flaky.example'
+    assert circuit['state'] == 'open'
+    assert circuit['failures'] == 1
+    assert circuit['last_error'] == 'HTTP 503'
+    assert circuit['retry_at']
+    
+    worker.record_success('flaky.example')
+    assert web.snapshot()[0]['state'] == 'closed'
+
+def test_healthy_hosts_are_not_written(app_module):
+    breaker = app_module.CircuitBreaker(scope='test-healthy')
+    breaker.record_success('fine.example')
+    assert breaker.snapshot() == []
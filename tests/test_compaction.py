@@ -0,0 +1,43 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+def add_snapshot(cursor, competitor_id, content_hash, scraped_at, change=False):
+    cursor.execute('''
+        INSERT INTO content_snapshots (competitor_id, content_hash, scraped_at) VALUES (?, ?, ?)
+    ''', (competitor_id, content_hash, scraped_at))
+    if change:
+        cursor.execute('''
+            INSERT INTO changes (competitor_id, competitor_name, content_hash, detected_at, change_type)
+            VALUES (?, 'Flapper', ?, ?, 'content')
+        ''', (competitor_id, content_hash, scraped_at))
+
+def test_compaction_removes_snapshots_beyond_keep_last(app_module):
+    competitor_id = 9001
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    # A page flapping between two variants, one snapshot per scan; only the first two scans were changes
+    for scan in range(40):
+        scraped_at = (start + timedelta(minutes=5 * scan)).isoformat()
+        add_snapshot(cursor, competitor_id, 'ab'[scan % 2], scraped_at, change=scan < 2)
+    # Snapshots older than the retention window go even when they were the last of their day
+    for days_ago in (400, 401):
+        add_snapshot(cursor, competitor_id, 'old', (start - timedelta(days=days_ago)).isoformat())
+    cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('retention_keep_last_snapshots', '2')")
+    conn.commit()
+    
+    try:
+        stats = app_module.SnapshotCompactor().run()
+    finally:
+        conn.execute("DELETE FROM settings WHERE key = 'retention_keep_last_snapshots'")
+        conn.commit()
+    
+    remaining = conn.execute('''
+        SELECT scraped_at FROM content_snapshots WHERE competitor_id = ? ORDER BY scraped_at
+    ''', (competitor_id,)).fetchall()
+    conn.close()
+    
+    kept = [row[0] for row in remaining]
+    assert stats['snapshots'] == 42 - len(kept)
+    # The two change-bearing snapshots and the two newest survive
+    assert kept == [(start + timedelta(minutes=5 * scan)).isoformat() for scan in (0, 1, 38, 39)]
@@ -0,0 +1,48 @@
+import sqlite3
+from datetime import datetime
+
+def add_competitor_with_change(app_module, name, importance):
+    conn = sqlite3.connect('competitor_tracker.db')
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO competitors (name, website) VALUES (?, 'https://example.com')", (name,))
+    competitor_id = cursor.lastrowid
+    detected_at = datetime.now().isoformat()
+    cursor.execute('''
+        INSERT INTO changes (competitor_id, competitor_name, detected_at, importance_score, news_title)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (competitor_id, name, detected_at, importance, f'{name} update'))
+    app_module.record_digest_rollup(cursor, competitor_id, name, detected_at, importance)
+    conn.commit()
+    conn.close()
+    return competitor_id
+
+def rollups(competitor_id):
+    conn = sqlite3.connect('competitor_tracker.db')
+    rows = conn.execute('''
+        SELECT changes, high_priority, importance_total FROM digest_rollups WHERE competitor_id = ?
+    ''', (competitor_id,)).fetchall()
+    conn.close()
+    return rows
+
+def test_removing_a_competitor_keeps_rollups_of_another_with_the_same_name(app_module):
+    kept = add_competitor_with_change(app_module, 'Twin Corp', 8)
+    removed = add_competitor_with_change(app_module, 'Twin Corp', 4)
+    
+    response = app_module.app.test_client().delete(f'/remove_competitor/{removed}')
+    
+    assert response.get_json() == {'success': True}
+    assert rollups(removed) == []
+    assert rollups(kept) == [(1, 1, 8)]
+
+def test_rescoring_a_change_moves_it_between_priorities(app_module):
+    competitor_id = add_competitor_with_change(app_module, 'Rescored Inc', 4)
+    conn = sqlite3.connect('competitor_tracker.db')
+    change_id = conn.execute('SELECT id FROM changes WHERE competitor_id = ?', (competitor_id,)).fetchone()[0]
+    conn.close()
+    
+    app_module.tracker.analysis_queue._store(change_id, {
+        'analysis': 'New pricing tier', 'change_type': 'pricing_change', 'importance_score': 9,
+        'news_title': 'New tier', 'news_excerpt': 'A new tier launched', 'source_links': ''
+    })
+    
+    assert rollups(competitor_id) == [(1, 1, 9)]
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus')
+
+def corpus_pages():
+    pages = []
+    for root, _, files in os.walk(CORPUS_DIR):
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                pages.append(os.path.relpath(os.path.join(root, filename), CORPUS_DIR))
+    return sorted(pages)
+
+@pytest.mark.parametrize('page', corpus_pages())
+def test_lxml_matches_beautifulsoup(app_module, page):
+    if app_module.lxml_html is None:
+        pytest.skip('lxml not installed')
+    with open(os.path.join(CORPUS_DIR, page), 'rb') as f:
+        html = f.read()
+    expected = app_module.BeautifulSoupExtractor().extract(html)
+    actual = app_module.LxmlExtractor().extract(html)
+    for field in ('text', 'changelog_content', 'title', 'headings'):
+        assert actual[field] == expected[field], field
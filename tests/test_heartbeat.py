@@ -0,0 +1,16 @@
+import sqlite3
+from datetime import datetime
+
+def test_not_modified_scans_count_as_unchanged(app_module):
+    conn = sqlite3.connect('competitor_tracker.db')
+    competitor_id = conn.execute("INSERT INTO competitors (name, website) VALUES ('Cached', 'https://example.com')").lastrowid
+    conn.commit()
+    
+    for _ in range(2):
+        app_module.tracker.record_not_modified(competitor_id, {'scraped_at': datetime.now().isoformat()})
+    
+    unchanged_scans, last_checked = conn.execute(
+        'SELECT unchanged_scans, last_checked FROM competitors WHERE id = ?', (competitor_id,)).fetchone()
+    conn.close()
+    assert unchanged_scans == 2
+    assert last_checked
@@ -0,0 +1,31 @@
+import time
+
+def tripped_ai(app_module):
+    ai = app_module.OllamaAI()
+    ai.backend = 'http'
+    ai.cache.enabled = False
+    ai.breaker.reset_timeout = 0.05
+    ai.breaker.trip(app_module.OLLAMA_CIRCUIT, 'model not loaded')
+    return ai
+
+def test_available_once_the_reset_timeout_passes(app_module):
+    ai = tripped_ai(app_module)
+    assert not ai.available()
+    time.sleep(0.06)
+    assert ai.available()
+    # Checking does not use up the single half-open probe call
+    assert ai.available()
+    assert ai.breaker.allow(app_module.OLLAMA_CIRCUIT)
+    assert not ai.available()
+
+def test_abandoned_stream_releases_the_probe_slot(app_module):
+    ai = tripped_ai(app_module)
+    ai._stream_ollama_http = lambda prompt: iter(['first ', 'second'])
+    time.sleep(0.06)
+    
+    stream = ai._stream_ollama('prompt')
+    assert next(stream) == 'first '
+    stream.close()  # client disconnected
+    
+    assert ai.breaker.state(app_module.OLLAMA_CIRCUIT) == 'closed'
+    assert ai.available()
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from ollama_stub import STUB_ANALYSIS, STUB_TEXT
+
+def stub_ai(app_module, stub):
+    ai = app_module.OllamaAI()
+    ai.configure({'ollama_backend': 'http', 'ollama_url': stub.base_url})
+    ai.cache.enabled = False
+    ai.breaker.scope = None  # keep this test's failures out of the shared circuits table
+    return ai
+
+def test_schema_call_returns_json(app_module, ollama_stub):
+    ai = stub_ai(app_module, ollama_stub)
+    response = ai._call_ollama('Analyze this change', schema=app_module.ANALYSIS_SCHEMA)
+    assert json.loads(response) == STUB_ANALYSIS
+    assert ollama_stub.requests == 1
+
+def test_stream_yields_ndjson_pieces(app_module, ollama_stub):
+    ai = stub_ai(app_module, ollama_stub)
+    pieces = list(ai._stream_ollama('Write the weekly digest'))
+    assert len(pieces) > 1
+    assert ''.join(pieces).strip() == STUB_TEXT
+    assert ai.breaker.state(app_module.OLLAMA_CIRCUIT) == 'closed'
+
+def test_http_errors_open_the_circuit(app_module, ollama_stub):
+    ai = stub_ai(app_module, ollama_stub)
+    ai.base_url = f'{ollama_stub.base_url}/missing'
+    for _ in range(ai.breaker.failure_threshold):
+        with pytest.raises(Exception, match='HTTP 404'):
+            ai._call_ollama('Analyze this change')
+    assert ai.breaker.state(app_module.OLLAMA_CIRCUIT) == 'open'
+    
+    # Once open, calls fail fast without reaching the server
+    ai.base_url = ollama_stub.base_url
+    with pytest.raises(Exception, match='circuit open'):
+        ai._call_ollama('Analyze this change')
+    assert ollama_stub.requests == 0
+
+def test_unparseable_answers_are_not_cached(app_module, ollama_stub):
+    ai = stub_ai(app_module, ollama_stub)
+    ai.cache.enabled = True
+    entry = {'title': 'Launch week', 'summary': 'New features', 'link': 'https://example.com/unparseable'}
+    answer = ollama_stub.answer
+    ollama_stub.answer = lambda request: 'Sorry, I cannot help with that.'
+    
+    result = ai.analyze_feed_entry(entry, 'Example', 'https://example.com')
+    assert result.get('fallback')
+    
+    # The retry reaches the model again instead of replaying the bad answer
+    ollama_stub.answer = answer
+    result = ai.analyze_feed_entry(entry, 'Example', 'https://example.com')
+    assert not result.get('fallback')
+    assert result['news_title'] == STUB_ANALYSIS['news_title']
+    assert ollama_stub.requests == 2
+    
+    # ...and that good answer is served from the cache
+    ai.analyze_feed_entry(entry, 'Example', 'https://example.com')
+    assert ollama_stub.requests == 2
@@ -0,0 +1,29 @@
+import pytest
+
+@pytest.mark.parametrize('tokens', [-5, 0, 1, 2, 3, 10, 100])
+def test_truncate_to_tokens_stays_within_budget(app_module, tokens):
+    text = 'word ' * 200
+    truncated = app_module.truncate_to_tokens(text, tokens)
+    assert len(truncated) < len(text)
+    assert app_module.estimate_tokens(truncated) <= max(1, tokens)
+
+def test_truncate_to_tokens_without_room_returns_nothing(app_module):
+    assert app_module.truncate_to_tokens('a long piece of text', 1) == ''
+    assert app_module.truncate_to_tokens('a long piece of text', 0) == ''
+
+def test_truncate_to_tokens_keeps_short_text(app_module):
+    assert app_module.truncate_to_tokens('short', 10) == 'short'
+
+def test_pack_prompt_entries_keeps_most_important_in_display_order(app_module):
+    entries = [(1, 'low ' * 50), (9, 'high ' * 50), (5, 'mid ' * 50)]
+    kept, dropped = app_module.pack_prompt_entries(entries, 140)
+    assert dropped == 1
+    assert [text.split()[0] for text in kept] == ['high', 'mid']
+    assert sum(app_module.estimate_tokens(text) + 1 for text in kept) <= 140
+
+def test_pack_prompt_entries_truncates_when_a_useful_amount_is_left(app_module):
+    entries = [(9, 'high ' * 50), (5, 'mid ' * 50)]
+    # The first entry costs 63 tokens plus one per separator
+    kept, dropped = app_module.pack_prompt_entries(entries, 64 + 1 + app_module.PROMPT_MIN_ENTRY_TOKENS)
+    assert dropped == 0
+    assert kept[1].endswith('…')
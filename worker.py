@@ -0,0 +1,64 @@
+"""Standalone scan worker.
+
+Claims jobs from the scan_jobs table, scrapes and analyzes the competitor,
+and records the result. Run several of these next to the web server (with
+the ``scan_mode`` setting set to ``queue``) to spread scans across cores:
+
+    python worker.py
+    python worker.py --once     # drain the queue and exit
+"""
+import argparse
+import os
+import socket
+import time
+
+# The worker drives scans itself; keep the in-process scheduler off
+os.environ.setdefault('TRACKTIVE_DISABLE_SCHEDULER', '1')
+
+from app import check_ollama_health, get_settings, recover_stale_analyses, run_scan_job, scan_engine, scan_jobs
+
+# The web server's scheduler runs these every minute; workers do it themselves
+OLLAMA_PROBE_INTERVAL = 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a Tracktive scan worker')
+    parser.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='exit once the queue is empty')
+    args = parser.parse_args()
+
+    print(f"👷 Scan worker {args.worker_id} started")
+    scan_engine.configure(get_settings())
+    scan_engine.tracker.ai.warm_up()
+    last_probe = time.monotonic()
+    while True:
+        if time.monotonic() - last_probe >= OLLAMA_PROBE_INTERVAL:
+            # Closes the circuit and re-queues deferred analyses once the model is back
+            check_ollama_health()
+            # Keeps this worker's queued analyses claimed and adopts those of crashed processes
+            recover_stale_analyses()
+            last_probe = time.monotonic()
+        settings = get_settings()
+        scan_engine.configure(settings)
+        scan_jobs.configure(settings)
+        scan_jobs.requeue_stale()
+
+        job = scan_jobs.claim(args.worker_id)
+        if job:
+            run_scan_job(job)
+            continue
+        if args.once:
+            break
+        time.sleep(args.poll_interval)
+    # Finish the LLM analyses this worker's scans queued before exiting
+    scan_engine.tracker.analysis_queue.join()
+    print(f"👋 Scan worker {args.worker_id} stopped")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass